@@ -0,0 +1,595 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Benchmark the metagen scripts on synthetic NCBI-style inputs:
+#   - generate nt (fasta.gz), nodes/names/merged/delnodes dumps,
+#     accession2taxid, centrifuge per-read output and kreport
+#     at a given scale (number of nt sequences)
+#   - run filterNT2, updateTaxID2, ntSumm, simReads, and centSumm3
+#     end-to-end, collecting per-phase timings (metaProf)
+#   - check outputs against golden results (md5 digests or
+#     line counts) and wall times against baseline timings
+#     (within a tolerance), or save both with --update; the
+#     reference results (benchmark.json) are committed
+#   - check that the simulated reads, classified (with
+#     centrifugeStub.py) against shards of nt and merged by
+#     mergeCent.py, match those classified against all of nt
+
+import sys
+import os
+import gzip
+import json
+import math
+import random
+import hashlib
+import subprocess
+import time
+import metaProf
+import centKreport
+
+TIME_SLACK = 0.25  # s; timing differences ignored (short stages)
+
+def gzWrite(f, s):
+  '''
+  Write a str to a gzip file (python2 or 3).
+  '''
+  if bytes is str:
+    f.write(s)
+  else:
+    f.write(s.encode())
+
+class SynthRandom(random.Random):
+  '''
+  SynthRandom: random.Random with choice() and randint()
+    derived from random(), so the synthetic inputs (and
+    golden results) are the same under python2 and 3.
+  '''
+  def randint(self, a, b):
+    return a + int(self.random() * (b - a + 1))
+
+  def choice(self, seq):
+    return seq[int(self.random() * len(seq))]
+
+class SynthTax:
+  '''
+  SynthTax: a synthetic NCBI-style taxonomy, with
+    nodes (taxon, parent, rank), names, leaf taxa
+    that sequences are assigned to (with weights
+    for sequencing effort), and merged/deleted IDs.
+  '''
+  def __init__(self):
+    self.nodes = []
+    self.names = {}
+    self.leaves = []
+    self.weights = []
+    self.merged = {}
+    self.deleted = []
+
+  def add(self, taxon, parent, rank, name):
+    self.nodes.append((taxon, parent, rank))
+    self.names[taxon] = name
+    return taxon
+
+def makeTaxonomy(rng, numSpecies):
+  '''
+  Generate a random taxonomy with the given
+    number of species.
+  '''
+  tax = SynthTax()
+  tax.add(1, 1, 'no rank', 'root')
+  tax.add(131567, 1, 'no rank', 'cellular organisms')
+  tax.add(12908, 1, 'no rank', 'unclassified sequences')
+  tax.add(28384, 1, 'no rank', 'other sequences')
+  tax.add(81077, 28384, 'no rank', 'artificial sequences')
+  tax.add(32630, 81077, 'species', 'synthetic construct')
+  kingdoms = [tax.add(2, 131567, 'superkingdom', 'Bacteria'),
+    tax.add(2157, 131567, 'superkingdom', 'Archaea'),
+    tax.add(2759, 131567, 'superkingdom', 'Eukaryota'),
+    tax.add(10239, 1, 'superkingdom', 'Viruses')]
+  kWeights = [0.6, 0.05, 0.25, 0.1]
+  ranks = ['kingdom', 'phylum', 'class', 'order', 'family', 'genus']
+  child = {}      # (parent, rank) -> list of children
+  nextID = [100000]
+
+  def newNode(parent, rank):
+    taxon = nextID[0]
+    nextID[0] += rng.randint(1, 5)
+    name = '%s%d' % (rank.capitalize(), taxon)
+    if rank == 'species':
+      name = 'Genus%d species%d' % (parent, taxon)
+    tax.add(taxon, parent, rank, name)
+    child.setdefault((parent, rank), []).append(taxon)
+    return taxon
+
+  for i in range(numSpecies):
+    # choose superkingdom, then walk down the ranks,
+    #   reusing existing clades most of the time
+    r = rng.random()
+    k = 0
+    while r > kWeights[k] and k < len(kWeights) - 1:
+      r -= kWeights[k]
+      k += 1
+    node = kingdoms[k]
+    for rank in ranks:
+      if rank == 'kingdom' and node != 2759:
+        continue
+      opts = child.get((node, rank), [])
+      if opts and rng.random() < 0.8:
+        node = rng.choice(opts)
+      else:
+        if rank == 'family' and rng.random() < 0.2:
+          # skip a major level via a non-canonical node
+          node = newNode(node, 'subfamily')
+        node = newNode(node, rank)
+    species = newNode(node, 'species')
+
+    # leaves for sequences: species, strains, some genera
+    w = 1.0 / (i + 1) ** 1.1
+    tax.leaves.append(species)
+    tax.weights.append(w)
+    if rng.random() < 0.3:
+      tax.leaves.append(newNode(species, 'no rank'))
+      tax.weights.append(w / 2)
+    if rng.random() < 0.05:
+      tax.leaves.append(node)
+      tax.weights.append(w / 4)
+
+  # merged/deleted IDs
+  for i in range(max(1, numSpecies // 20)):
+    tax.merged[900000 + i] = rng.choice(tax.leaves)
+    tax.deleted.append(950000 + i)
+  tax.nodes.sort()
+  return tax
+
+def writeTaxonomy(tax, d):
+  '''
+  Write nodes.dmp, names.dmp, merged.dmp, delnodes.dmp,
+    and the taxonomy tree (as from centrifuge-inspect).
+  '''
+  f = open(os.path.join(d, 'nodes.dmp'), 'w')
+  f2 = open(os.path.join(d, 'nt.tree.tmp'), 'w')
+  for taxon, parent, rank in tax.nodes:
+    f.write('%d\t|\t%d\t|\t%s\t|\t\t|\n' % (taxon, parent, rank))
+    f2.write('%d\t|\t%d\t|\t%s\n' % (taxon, parent, rank))
+  f.close()
+  f2.close()
+  f = open(os.path.join(d, 'names.dmp'), 'w')
+  for taxon, parent, rank in tax.nodes:
+    f.write('%d\t|\t%s\t|\t\t|\tscientific name\t|\n' \
+      % (taxon, tax.names[taxon]))
+  f.close()
+  f = open(os.path.join(d, 'merged.dmp'), 'w')
+  for taxon in sorted(tax.merged):
+    f.write('%d\t|\t%d\t|\n' % (taxon, tax.merged[taxon]))
+  f.close()
+  f = open(os.path.join(d, 'delnodes.dmp'), 'w')
+  for taxon in tax.deleted:
+    f.write('%d\t|\n' % taxon)
+  f.close()
+
+def cumulative(weights):
+  '''
+  Cumulative sums of weights (for weighted choice).
+  '''
+  cum = []
+  total = 0.0
+  for w in weights:
+    total += w
+    cum.append(total)
+  return cum
+
+def weightedChoice(rng, items, cum):
+  '''
+  Choose an item according to cumulative weights.
+  '''
+  import bisect
+  return items[bisect.bisect_left(cum, rng.random() * cum[-1])]
+
+def makeNT(rng, tax, filename, numSeqs, maxLen):
+  '''
+  Generate nt (gzip-compressed fasta) with a log-normal
+    length distribution, plus some pure-N and short seqs.
+    Return list of (accession, taxon, length).
+  '''
+  pool = ''.join(rng.choice('ACGT') for i in range(1 << 16))
+  pool = pool * 16
+  cum = cumulative(tax.weights)
+  seqs = []
+  f = gzip.open(filename, 'wb')
+  for i in range(numSeqs):
+    acc = '%s%06d.%d' % (rng.choice(['AB', 'AC', 'CP', 'KY', 'MF']),
+      i, rng.choice([1, 1, 1, 2]))
+    taxon = weightedChoice(rng, tax.leaves, cum)
+    length = int(math.exp(rng.gauss(math.log(1200), 1.3)))
+    length = max(5, min(length, maxLen))
+    r = rng.random()
+    if r < 0.01:
+      seq = 'N' * length
+    else:
+      seq = ''
+      while len(seq) < length:
+        pos = rng.randint(0, len(pool) - 1)
+        seq += pool[pos:pos+length-len(seq)]
+      if r < 0.05:
+        # insert a run of Ns
+        pos = rng.randint(0, length - 1)
+        seq = seq[:pos] + 'N' * min(20, length - pos) + seq[pos+20:]
+    gzWrite(f, '>%s Synthetic sequence %d\n' % (acc, i))
+    gzWrite(f, ''.join(seq[j:j+80] + '\n' for j in range(0, length, 80)))
+    seqs.append((acc, taxon, length))
+  f.close()
+  return seqs
+
+def makeAcc(rng, tax, seqs, filename):
+  '''
+  Generate an accession2taxid file (with some merged
+    and deleted taxIDs, and accessions not in nt).
+  '''
+  merged = sorted(tax.merged)
+  f = gzip.open(filename, 'wb')
+  gzWrite(f, 'accession\taccession.version\ttaxid\tgi\n')
+  rows = [(acc, taxon) for acc, taxon, length in seqs]
+  for i in range(len(seqs) // 5):
+    rows.append(('ZZ%06d.1' % i, rng.choice(tax.leaves)))
+  rows.sort()
+  for acc, taxon in rows:
+    r = rng.random()
+    if r < 0.01:
+      taxon = rng.choice(merged)
+    elif r < 0.02:
+      taxon = rng.choice(tax.deleted)
+    gzWrite(f, '%s\t%s\t%d\t%d\n' % (acc.split('.')[0], acc, taxon,
+      rng.randint(1, 10 ** 9)))
+  f.close()
+
+def makeReads(rng, tax, seqs, filename, numReads):
+  '''
+  Generate centrifuge per-read output: reads from
+    a skewed abundance profile, with multi-hits
+    to sequences of other taxa and some unclassified.
+  '''
+  parent = {}
+  for taxon, par, rank in tax.nodes:
+    parent[taxon] = par
+  byTaxon = {}
+  for acc, taxon, length in seqs:
+    byTaxon.setdefault(taxon, []).append(acc)
+  taxa = sorted(byTaxon)
+  weights = [rng.random() ** 4 for t in taxa]
+  cum = cumulative(weights)
+  f = open(filename, 'w')
+  f.write('readID\tseqID\ttaxID\tscore\t2ndBestScore\thitLength\t' \
+    + 'queryLength\tnumMatches\n')
+  for i in range(numReads):
+    read = 'read%d' % i
+    if rng.random() < 0.1:
+      f.write('%s\tunclassified\t0\t0\t0\t0\t150\t1\n' % read)
+      continue
+    taxon = weightedChoice(rng, taxa, cum)
+    hits = [taxon]
+    n = rng.choice([1, 1, 1, 1, 2, 3])
+    for j in range(n - 1):
+      hits.append(weightedChoice(rng, taxa, cum))
+    score = rng.randint(100, 20000)
+    for t in hits:
+      if rng.random() < 0.05:
+        # generic assignment
+        seqID = 'species'
+        t = parent.get(t, t)
+      else:
+        seqID = rng.choice(byTaxon[t])
+      f.write('%s\t%s\t%d\t%d\t0\t%d\t150\t%d\n' % (read, seqID, t,
+        score, rng.randint(30, 150), n))
+  f.close()
+
+def makeKreport(d, readsFile, filename):
+  '''
+  Produce the kraken-style report of the per-read output.
+  '''
+  tax = centKreport.loadTaxonomy(os.path.join(d, 'nodes.dmp'),
+    os.path.join(d, 'names.dmp'))
+  agg = centKreport.Aggregate()
+  f = open(readsFile)
+  centKreport.parseReads(f, agg)
+  f.close()
+  f = open(filename, 'w')
+  centKreport.printReport(f, agg, tax)
+  f.close()
+
+def generate(d, numSeqs, numReads, seed, maxLen):
+  '''
+  Generate all synthetic inputs. Return the
+    taxon chosen for read simulation.
+  '''
+  rng = SynthRandom(seed)
+  tax = makeTaxonomy(rng, max(10, numSeqs // 20))
+  writeTaxonomy(tax, d)
+  seqs = makeNT(rng, tax, os.path.join(d, 'nt.gz'), numSeqs, maxLen)
+  makeAcc(rng, tax, seqs, os.path.join(d, 'nucl_gb.accession2taxid.gz'))
+  makeReads(rng, tax, seqs, os.path.join(d, 'sample.out'), numReads)
+  makeKreport(d, os.path.join(d, 'sample.out'),
+    os.path.join(d, 'sample.raw'))
+
+  # simulate reads from the best-represented species
+  counts = {}
+  for acc, taxon, length in seqs:
+    if length >= 500:
+      counts[taxon] = counts.get(taxon, 0) + 1
+  return str(max(sorted(counts), key=lambda t: counts[t]))
+
+def digest(filename, check):
+  '''
+  Summarize an output file: md5 of its (uncompressed)
+    contents, or its number of lines.
+  '''
+  if filename[-3:] == '.gz':
+    f = gzip.open(filename, 'rb')
+  else:
+    f = open(filename, 'rb')
+  if check == 'lines':
+    res = 'lines:%d' % sum(1 for line in f)
+  else:
+    m = hashlib.md5()
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+      m.update(chunk)
+    res = 'md5:' + m.hexdigest()
+  f.close()
+  return res
+
+def stages(d, taxon):
+  '''
+  List of benchmark stages: name, script, args,
+    and outputs to check (file, check type).
+  '''
+  p = lambda x: os.path.join(d, x)
+  return [
+    ('filterNT2', 'filterNT2.py', [p('nt.gz'), p('nt.fa'), '30'],
+      [(p('nt.fa'), 'md5')]),
+    ('updateTaxID2', 'updateTaxID2.py', [p('merged.dmp'),
+      p('delnodes.dmp'), p('acc2taxid.txt'),
+      p('nucl_gb.accession2taxid.gz')],
+      [(p('acc2taxid.txt'), 'md5')]),
+    ('ntSumm', 'ntSumm.py', [p('acc2taxid.txt'), p('nt.tree.tmp'),
+      p('nt.fa'), p('nt.tree')],
+      [(p('nt.tree'), 'md5')]),
+    ('simReads', 'simReads.py', [p('acc2taxid.txt'), taxon, p('nt.fa'),
+      '300', '100', '10000', p('sim.R1.fastq.gz'), p('sim.R2.fastq.gz')],
+      [(p('sim.R1.fastq.gz'), 'lines'), (p('sim.R2.fastq.gz'), 'lines')]),
+    ('centSumm3', 'centSumm3.py', [p('sample.raw'), p('nt.tree'),
+      p('sample.html'), '20', 'bench', 'synthetic'],
+      [(p('sample.html'), 'md5')]),
+  ]
+
+def runStage(python, d, name, script, args):
+  '''
+  Run one stage, with profiling. Return result dict.
+  '''
+  base = os.path.dirname(os.path.abspath(__file__))
+  profFile = os.path.join(d, name + '.prof.json')
+  if os.path.exists(profFile):
+    os.remove(profFile)
+  cmd = [python, os.path.join(base, script)] + args + ['--prof', profFile]
+  start = time.time()
+  proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+    stderr=subprocess.PIPE)
+  out, err = proc.communicate()
+  res = {'stage': name, 'wall': round(time.time() - start, 6),
+    'returncode': proc.returncode}
+  if proc.returncode:
+    res['stderr'] = err.decode('utf-8', 'replace')[-2000:]
+  elif os.path.exists(profFile):
+    f = open(profFile)
+    res['prof'] = json.load(f)
+    f.close()
+  return res
+
+def checkMerge(python, d, shards=3, k=3):
+  '''
+  Classify the simulated reads with centrifugeStub.py
+    against nt and against shards of nt (merged with
+    mergeCent.py); the outputs must match.
+  '''
+  base = os.path.dirname(os.path.abspath(__file__))
+  p = lambda x: os.path.join(d, x)
+  stub = [python, os.path.join(base, 'centrifugeStub.py')]
+  prefixes = ['stub'] + ['shard.%d' % i for i in range(shards)]
+  cmds = [[python, os.path.join(base, 'filterNT2.py'), p('nt.fa'),
+    p('shard.fa'), '1', '--shards', '%d' % shards]]
+  for pre in prefixes:
+    cmds.append(stub + ['build', '--conversion-table', p('acc2taxid.txt'),
+      '--taxonomy-tree', p('nodes.dmp'), '--name-table', p('names.dmp'),
+      p('nt.fa') if pre == 'stub' else p(pre + '.fa'), p(pre)])
+    cmds.append(stub + ['classify', '-x', p(pre), '-k', '%d' % k,
+      '--stub-acc', p('acc2taxid.txt'), '--reorder', '-S', p(pre + '.out'),
+      '-1', p('sim.R1.fastq.gz'), '-2', p('sim.R2.fastq.gz')])
+  cmds.append([python, os.path.join(base, 'mergeCent.py'),
+    ','.join(p(x + '.out') for x in prefixes[1:]), p('merged.out'),
+    '-k', '%d' % k])
+  start = time.time()
+  res = {'stage': 'mergeCent', 'returncode': 0}
+  for cmd in cmds:
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+      stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    if proc.returncode:
+      res['returncode'] = proc.returncode
+      res['stderr'] = err.decode('utf-8', 'replace')[-2000:]
+      break
+  res['wall'] = round(time.time() - start, 6)
+  if not res['returncode']:
+    res['check'] = 'OK' if digest(p('merged.out'), 'md5') \
+      == digest(p('stub.out'), 'md5') else 'MISMATCH'
+  return res
+
+def printResult(res):
+  '''
+  Print timings of a stage (and its phases).
+  '''
+  if res['returncode']:
+    sys.stderr.write('%-14s FAILED (exit %d)\n%s\n' % (res['stage'],
+      res['returncode'], res.get('stderr', '')))
+    return
+  prof = res.get('prof', {})
+  sys.stderr.write('%-14s %9.3fs  cpu %9.3fs  peakRSS %8.1fMB  ' \
+    % (res['stage'], res['wall'], prof.get('cpu', 0),
+    prof.get('peakRSS', 0) / 1.0e6) + '%s\n' % res.get('check', ''))
+  for ph in prof.get('phases', []):
+    rate = ''
+    if ph['wall'] > 0 and ph['bytes']:
+      rate = '  %8.1fMB/s' % (ph['bytes'] / 1.0e6 / ph['wall'])
+    if ph['wall'] > 0 and ph['records']:
+      rate += '  %10.0f rec/s' % (ph['records'] / ph['wall'])
+    sys.stderr.write('  %-12s %9.3fs  cpu %9.3fs%s\n' % (ph['name'],
+      ph['wall'], ph['cpu'], rate))
+
+def checkResult(res, expect, tolerance):
+  '''
+  Compare the outputs and wall time of a stage with
+    the golden results. Return True if it fails.
+  '''
+  if res['returncode']:
+    return True
+  checks = []
+  failed = False
+  if 'outputs' in expect:
+    if expect['outputs'] != res.get('outputs'):
+      checks.append('MISMATCH')
+      failed = True
+    else:
+      checks.append('OK')
+  elif 'check' in res:
+    checks.append(res['check'])
+    failed = res['check'] != 'OK'
+  if tolerance is not None and expect.get('wall'):
+    ratio = res['wall'] / expect['wall']
+    if ratio > 1 + tolerance and res['wall'] - expect['wall'] > TIME_SLACK:
+      checks.append('SLOW (%.2fx baseline)' % ratio)
+      failed = True
+    else:
+      checks.append('(%.2fx baseline)' % ratio)
+  res['check'] = ' '.join(checks)
+  return failed
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  seed = int(metaProf.popArg(args, '--seed', 1))
+  numReads = int(metaProf.popArg(args, '--reads', 100000))
+  maxLen = int(metaProf.popArg(args, '--max-len', 2000000))
+  python = metaProf.popArg(args, '--python', sys.executable)
+  outFile = metaProf.popArg(args, '--out')
+  update = metaProf.popArg(args, '--update', False, value=False)
+  skipGen = metaProf.popArg(args, '--no-gen', False, value=False)
+  tolerance = float(metaProf.popArg(args, '--tolerance', 0.5))
+  if metaProf.popArg(args, '--no-timing', False, value=False):
+    tolerance = None
+  if len(args) < 1 or len(args) > 3 \
+      or any(x[:1] == '-' for x in args) \
+      or (len(args) > 1 and not args[1].isdigit()):
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<dir>  [<numSeqs>]  [<golden>]  [options]\n' \
+      + '  <dir>       Working directory for synthetic inputs/outputs\n' \
+      + '  <numSeqs>   Number of synthetic nt sequences (def. 10000)\n' \
+      + '  <golden>    JSON file of golden results (output digests and\n' \
+      + '                baseline timings; def. benchmark.json, next to\n' \
+      + '                this script)\n' \
+      + '  Options:\n' \
+      + '    --seed <int>      Random seed for synthetic inputs (def. 1)\n' \
+      + '    --reads <int>     Number of centrifuge reads (def. 100000)\n' \
+      + '    --max-len <int>   Maximum nt sequence length (def. 2000000)\n' \
+      + '    --python <exe>    Python interpreter for the scripts\n' \
+      + '    --out <file>      Write JSON results to <file>\n' \
+      + '    --update          Save golden results (rather than check)\n' \
+      + '    --no-gen          Reuse previously generated inputs (if\n' \
+      + '                        generated with the same settings)\n' \
+      + '    --tolerance <float>  Fraction by which a stage may be\n' \
+      + '                        slower than its baseline (def. 0.5;\n' \
+      + '                        differences under %gs are ignored)\n' \
+        % TIME_SLACK \
+      + '    --no-timing       Do not check timings\n')
+    sys.exit(-1)
+
+  d = args[0]
+  numSeqs = 10000
+  if len(args) > 1:
+    numSeqs = int(args[1])
+  golden = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+    'benchmark.json')
+  if len(args) > 2:
+    golden = args[2]
+  if not os.path.isdir(d):
+    os.makedirs(d)
+
+  # generate inputs (unless generated with the same settings)
+  key = '%d:%d:%d:%d' % (numSeqs, numReads, seed, maxLen)
+  taxFile = os.path.join(d, 'simTaxon')
+  taxon = None
+  if skipGen and os.path.exists(taxFile):
+    f = open(taxFile)
+    spl = f.read().split()
+    f.close()
+    if len(spl) == 2 and spl[1] == key:
+      taxon = spl[0]
+  if taxon is None:
+    start = time.time()
+    taxon = generate(d, numSeqs, numReads, seed, maxLen)
+    f = open(taxFile, 'w')
+    f.write('%s\t%s\n' % (taxon, key))
+    f.close()
+    sys.stderr.write('Generated inputs (%d nt seqs, %d reads) in %.1fs\n' \
+      % (numSeqs, numReads, time.time() - start))
+
+  # load golden results
+  gold = {}
+  if os.path.exists(golden):
+    f = open(golden)
+    gold = json.load(f)
+    f.close()
+  expect = gold.get(key, {})
+  if not expect and not update:
+    sys.stderr.write('Warning! No golden results for %s in %s\n' \
+      % (key, golden))
+
+  # run stages, check outputs and timings
+  results = []
+  failed = 0
+  for name, script, sArgs, outputs in stages(d, taxon):
+    res = runStage(python, d, name, script, sArgs)
+    if not res['returncode']:
+      res['outputs'] = {}
+      for filename, check in outputs:
+        res['outputs'][os.path.basename(filename)] = digest(filename, check)
+    if checkResult(res, expect.get(name, {}), tolerance):
+      failed += 1
+    printResult(res)
+    results.append(res)
+  res = checkMerge(python, d)
+  if checkResult(res, expect.get(res['stage'], {}), tolerance):
+    failed += 1
+  printResult(res)
+  results.append(res)
+
+  # save golden results / JSON output
+  if update:
+    gold[key] = {}
+    for res in results:
+      if not res['returncode']:
+        gold[key][res['stage']] = {'wall': res['wall']}
+        if 'outputs' in res:
+          gold[key][res['stage']]['outputs'] = res['outputs']
+    f = open(golden, 'w')
+    json.dump(gold, f, indent=1, sort_keys=True)
+    f.write('\n')
+    f.close()
+    sys.stderr.write('Golden results saved to %s\n' % golden)
+  if outFile:
+    f = open(outFile, 'w')
+    json.dump({'numSeqs': numSeqs, 'numReads': numReads, 'seed': seed,
+      'results': results}, f, indent=1, sort_keys=True)
+    f.close()
+  if failed and not update:
+    sys.exit(1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,398 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Build the Centrifuge nt database (the steps of downloadNTdb.sh,
+#   downloadTax.sh, and indexNTdb2.sh) as a DAG of stages:
+#   - each stage is keyed by a hash of its command and the
+#     contents of its input files; stages whose key and outputs
+#     are unchanged since the last build are skipped
+#   - independent stages (e.g. filterNT2 and updateTaxID2)
+#     run concurrently
+#   - per-stage wall/CPU time and peak RSS are recorded
+#     (in <dir>/.buildDB.json, with the stage keys)
+
+import sys
+import os
+import time
+import json
+import hashlib
+import threading
+import subprocess
+import metaProf
+
+try:
+  import Queue as queue
+except ImportError:
+  import queue
+
+NT_URL = 'ftp://ftp.ncbi.nih.gov/blast/db/FASTA'
+TAX_URL = 'ftp://ftp.ncbi.nlm.nih.gov/pub/taxonomy'
+
+class Stage:
+  '''
+  Stage: a step of the build, with its shell command,
+    input and output files (relative to the build dir),
+    and whether it is a source (download) step, which
+    is rerun only if its outputs are missing.
+  '''
+  def __init__(self, name, cmd, inputs, outputs, source=False):
+    self.name = name
+    self.cmd = cmd
+    self.inputs = inputs
+    self.outputs = outputs
+    self.source = source
+    self.deps = []
+
+def download(url, filename, extract=None):
+  '''
+  Command to download a file and its md5. Only files
+    to be extracted are checked here; the others are
+    checked by the scripts reading them (--md5).
+  '''
+  cmd = 'rm -f %s %s.md5 && ' % (filename, filename) \
+    + 'wget -q %s/%s && wget -q %s/%s.md5' % (url, filename, url, filename)
+  if extract:
+    cmd += ' && md5sum -c %s.md5 && %s' % (filename, extract)
+  return cmd
+
+def pipeline(d, opts):
+  '''
+  List the stages of the build.
+  '''
+  base = os.path.dirname(os.path.abspath(__file__))
+  py = '%s %s' % (opts['python'], base)
+  pre = opts['prefix']
+  exists = lambda x: os.path.exists(os.path.join(d, x))
+  stages = []
+
+  # downloads
+  stages.append(Stage('downloadNT', 'date +\'%F %r\' > DATE && ' \
+    + download(NT_URL, 'nt.gz'), [], ['nt.gz', 'nt.gz.md5', 'DATE'], True))
+  stages.append(Stage('downloadTax', download(TAX_URL, 'taxdump.tar.gz',
+    'tar xzf taxdump.tar.gz nodes.dmp names.dmp merged.dmp ' \
+    + 'delnodes.dmp'), [], ['nodes.dmp', 'names.dmp', 'merged.dmp',
+    'delnodes.dmp'], True))
+  accFiles = []
+  for acc in opts['acc']:
+    filename = 'nucl_%s.accession2taxid.gz' % acc
+    stages.append(Stage('downloadAcc_' + acc, download(TAX_URL \
+      + '/accession2taxid', filename), [], [filename, filename + '.md5'],
+      True))
+    accFiles.append(filename)
+
+  # filter nt (masking adapters, if a BED file is given)
+  mask = []
+  if exists('adapters2.bed'):
+    mask = ['adapters2.bed']
+  stages.append(Stage('filterNT2', '%s/filterNT2.py nt.gz nt.fa %d %s ' \
+    % (py, opts['minLen'], ' '.join(mask)) + '--md5',
+    ['nt.gz', 'nt.gz.md5'] + mask, ['nt.fa']))
+
+  # update merged and deleted taxIDs
+  stages.append(Stage('updateTaxID2', '%s/updateTaxID2.py ' % py \
+    + 'merged.dmp delnodes.dmp acc2taxid.txt %s --md5' % ' '.join(accFiles),
+    ['merged.dmp', 'delnodes.dmp'] + accFiles \
+    + [x + '.md5' for x in accFiles], ['acc2taxid.txt']))
+
+  # add adapter sequences (to copies of the taxonomy files;
+  #   the adapter fasta is indexed alongside nt.fa)
+  fasta = ['nt.fa']
+  conv, nodes, names = 'acc2taxid.txt', 'nodes.dmp', 'names.dmp'
+  adapt = ['adapters2.fa', 'nodes2.dmp', 'names2.dmp', 'acc2taxid2.txt']
+  if all(exists(x) for x in adapt):
+    stages.append(Stage('addAdapters', 'cat nodes.dmp nodes2.dmp ' \
+      + '> nodesAll.dmp && cat names.dmp names2.dmp > namesAll.dmp && ' \
+      + 'cat acc2taxid.txt acc2taxid2.txt > acc2taxidAll.txt',
+      [conv, nodes, names] + adapt[1:],
+      ['acc2taxidAll.txt', 'nodesAll.dmp', 'namesAll.dmp']))
+    fasta.append('adapters2.fa')
+    conv, nodes, names = 'acc2taxidAll.txt', 'nodesAll.dmp', 'namesAll.dmp'
+
+  # index database, produce taxonomy tree
+  index = ['%s.%d.cf' % (pre, i) for i in range(1, 4)]
+  stages.append(Stage('centrifugeBuild', 'rm -f %s.*.cf && ' % pre \
+    + '%s -p %d --conversion-table %s ' % (opts['build'], opts['threads'],
+    conv) + '--taxonomy-tree %s --name-table %s %s %s' % (nodes, names,
+    ','.join(fasta), pre), fasta + [conv, nodes, names], index))
+  stages.append(Stage('inspectTree', '%s --taxonomy-tree %s > %s.tree.tmp' \
+    % (opts['inspect'], pre, pre), index, [pre + '.tree.tmp']))
+
+  # add taxonomic summary to tree (with adapters, nt is summarized
+  #   alongside the index build, and only the adapters are added)
+  if len(fasta) > 1:
+    stages.append(Stage('ntSummBase', '%s/ntSumm.py acc2taxid.txt ' % py \
+      + 'nodes.dmp nt.fa %s.base.tree' % pre,
+      ['acc2taxid.txt', 'nodes.dmp', 'nt.fa'], [pre + '.base.tree',
+      pre + '.base.tree.inputs']))
+    stages.append(Stage('ntSumm', '%s/ntSumm.py acc2taxid2.txt ' % py \
+      + '%s.tree.tmp adapters2.fa %s.tree --base %s.base.tree' % (pre,
+      pre, pre), ['acc2taxid2.txt', pre + '.tree.tmp', 'adapters2.fa',
+      pre + '.base.tree'], [pre + '.tree']))
+  else:
+    stages.append(Stage('ntSumm', 'cat %s | %s/ntSumm.py %s %s.tree.tmp - ' \
+      % (' '.join(fasta), py, conv, pre) + '%s.tree' % pre,
+      [conv, pre + '.tree.tmp'] + fasta, [pre + '.tree']))
+
+  # dependencies: stages producing the inputs
+  producer = {}
+  for s in stages:
+    for out in s.outputs:
+      producer[out] = s
+  for s in stages:
+    s.deps = sorted(set(producer[x].name for x in s.inputs
+      if x in producer))
+  return stages
+
+class HashCache:
+  '''
+  HashCache: md5 digests of files, cached by
+    (size, mtime), so each file is read only once.
+    With statOnly, (size, mtime) is the "digest".
+    Downloaded files (sidecars) are not read: their
+    digest is the md5 listed in <file>.md5 (and size).
+  '''
+  def __init__(self, d, cache, statOnly=False, sidecars=()):
+    self.d = d
+    self.cache = cache
+    self.statOnly = statOnly
+    self.sidecars = set(sidecars)
+    self.lock = threading.Lock()
+
+  def sidecar(self, path, size):
+    '''
+    Return digest of a downloaded file from its
+      .md5 file (None if missing or malformed).
+    '''
+    try:
+      f = open(os.path.join(self.d, path + '.md5'))
+      spl = f.read().split()
+      f.close()
+    except IOError:
+      return None
+    if len(spl) < 2 or len(spl[0]) != 32 \
+        or os.path.basename(spl[1].lstrip('*')) != os.path.basename(path):
+      return None
+    return 'md5:%s:%d' % (spl[0].lower(), size)
+
+  def digest(self, path):
+    '''
+    Return digest of a file (None if missing).
+    '''
+    full = os.path.join(self.d, path)
+    try:
+      st = os.stat(full)
+    except OSError:
+      return None
+    stat = [st.st_size, st.st_mtime]
+    if self.statOnly:
+      return 'stat:%d:%f' % tuple(stat)
+    if path in self.sidecars:
+      res = self.sidecar(path, st.st_size)
+      if res:
+        return res
+    with self.lock:
+      if path in self.cache and self.cache[path][:2] == stat:
+        return self.cache[path][2]
+    m = hashlib.md5()
+    f = open(full, 'rb')
+    for chunk in iter(lambda: f.read(1 << 22), b''):
+      m.update(chunk)
+    f.close()
+    with self.lock:
+      self.cache[path] = stat + [m.hexdigest()]
+    return m.hexdigest()
+
+def stageKey(stage, hashes):
+  '''
+  Key of a stage: hash of its command and input digests.
+  '''
+  m = hashlib.md5(stage.cmd.encode())
+  for path in stage.inputs:
+    m.update(('\0%s\0%s' % (path, hashes.digest(path))).encode())
+  return m.hexdigest()
+
+def upToDate(stage, state, hashes, refresh):
+  '''
+  Check if a stage can be skipped: same key as its
+    last run, and outputs unchanged since then.
+  '''
+  prev = state.get(stage.name)
+  if stage.source and not refresh:
+    return all(hashes.digest(x) for x in stage.outputs)
+  if not prev or prev['key'] != stageKey(stage, hashes):
+    return False
+  return all(hashes.digest(x) == prev['outputs'].get(x)
+    for x in stage.outputs)
+
+def runCommand(cmd, cwd, logFile):
+  '''
+  Run a shell command (output to logFile); return
+    its exit code, wall/CPU time, and peak RSS.
+  '''
+  res = {'start': time.time()}
+  log = open(logFile, 'w')
+  proc = subprocess.Popen(cmd, shell=True, cwd=cwd, stdout=log,
+    stderr=subprocess.STDOUT, executable='/bin/bash')
+  pid, status, ru = os.wait4(proc.pid, 0)
+  proc.returncode = 0  # reaped above
+  log.close()
+  res['wall'] = round(time.time() - res['start'], 3)
+  res['user'] = round(ru.ru_utime, 3)
+  res['sys'] = round(ru.ru_stime, 3)
+  res['maxRSS'] = ru.ru_maxrss * 1024
+  if os.WIFEXITED(status):
+    res['returncode'] = os.WEXITSTATUS(status)
+  else:
+    res['returncode'] = -os.WTERMSIG(status)
+  return res
+
+def runStage(stage, d, hashes, done):
+  '''
+  Run a stage (in a thread); put the result on
+    the queue done.
+  '''
+  key = stageKey(stage, hashes)
+  res = runCommand(stage.cmd, d, os.path.join(d, 'logs',
+    stage.name + '.log'))
+  res['key'] = key
+  if not res['returncode']:
+    res['outputs'] = dict((x, hashes.digest(x)) for x in stage.outputs)
+    if not all(res['outputs'].values()):
+      res['returncode'] = -1
+      res['error'] = 'missing outputs'
+  done.put((stage, res))
+
+def loadState(filename):
+  '''
+  Load the saved build state.
+  '''
+  if not os.path.exists(filename):
+    return {'hashes': {}, 'stages': {}}
+  f = open(filename)
+  state = json.load(f)
+  f.close()
+  return state
+
+def saveState(filename, state):
+  '''
+  Save the build state (atomically).
+  '''
+  f = open(filename + '.tmp', 'w')
+  json.dump(state, f, indent=1, sort_keys=True)
+  f.close()
+  os.rename(filename + '.tmp', filename)
+
+def build(d, stages, state, hashes, jobs, refresh, dryRun):
+  '''
+  Run stages in dependency order (up to jobs at once),
+    skipping those that are up to date. Return the
+    number of failed stages.
+  '''
+  stateFile = os.path.join(d, '.buildDB.json')
+  status = {}   # stage name -> 'skip', 'run', 'done', 'fail', 'blocked'
+  done = queue.Queue()
+  running = 0
+  while True:
+    for s in stages:
+      if s.name in status:
+        continue
+      if any(status.get(x) in ['fail', 'blocked'] for x in s.deps):
+        status[s.name] = 'blocked'
+        sys.stderr.write('%-16s blocked\n' % s.name)
+        continue
+      if not all(status.get(x) in ['skip', 'done'] for x in s.deps):
+        continue
+      ran = any(status.get(x) == 'done' for x in s.deps)
+      if not ran and upToDate(s, state['stages'], hashes,
+          refresh and s.source):
+        status[s.name] = 'skip'
+        sys.stderr.write('%-16s up to date\n' % s.name)
+        continue
+      if dryRun:
+        status[s.name] = 'done'
+        sys.stderr.write('%-16s would run: %s\n' % (s.name, s.cmd))
+        continue
+      if running >= jobs:
+        continue
+      status[s.name] = 'run'
+      running += 1
+      sys.stderr.write('%-16s started\n' % s.name)
+      t = threading.Thread(target=runStage, args=(s, d, hashes, done))
+      t.daemon = True
+      t.start()
+    if not running:
+      break
+
+    # wait for a stage to finish
+    s, res = done.get()
+    running -= 1
+    if res['returncode']:
+      status[s.name] = 'fail'
+      sys.stderr.write('%-16s FAILED (exit %d; see logs/%s.log)\n' \
+        % (s.name, res['returncode'], s.name))
+      continue
+    status[s.name] = 'done'
+    state['stages'][s.name] = res
+    saveState(stateFile, state)
+    sys.stderr.write('%-16s done: %.1fs wall, %.1fs user, ' % (s.name,
+      res['wall'], res['user']) + '%.1fs sys, %.1fMB peak RSS\n' \
+      % (res['sys'], res['maxRSS'] / 1.0e6))
+
+  if not dryRun:
+    saveState(stateFile, state)
+  return sum(1 for x in status.values() if x in ['fail', 'blocked'])
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  opts = {}
+  jobs = int(metaProf.popArg(args, '--jobs', 2))
+  opts['threads'] = int(metaProf.popArg(args, '--threads', 16))
+  opts['minLen'] = int(metaProf.popArg(args, '--min-len', 30))
+  opts['acc'] = metaProf.popArg(args, '--acc', 'gb,wgs').split(',')
+  opts['build'] = metaProf.popArg(args, '--centrifuge-build',
+    'centrifuge-build')
+  opts['inspect'] = metaProf.popArg(args, '--centrifuge-inspect',
+    'centrifuge-inspect')
+  opts['python'] = metaProf.popArg(args, '--python', sys.executable)
+  refresh = metaProf.popArg(args, '--refresh', False, value=False)
+  dryRun = metaProf.popArg(args, '--dry-run', False, value=False)
+  statOnly = metaProf.popArg(args, '--stat-only', False, value=False)
+  if len(args) < 1:
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<dir>  [<prefix>]  [options]\n' \
+      + '  <dir>      Build directory\n' \
+      + '  <prefix>   Prefix of the Centrifuge index (def. nt)\n' \
+      + '  Options:\n' \
+      + '    --jobs <int>      Stages to run concurrently (def. 2)\n' \
+      + '    --threads <int>   Threads for centrifuge-build (def. 16)\n' \
+      + '    --min-len <int>   Minimum nt sequence length (def. 30)\n' \
+      + '    --acc <list>      accession2taxid files to use (def. gb,wgs)\n' \
+      + '    --refresh         Download nt/taxonomy files again\n' \
+      + '    --dry-run         List stages that would run\n' \
+      + '    --stat-only       Compare files by size/mtime (not md5)\n' \
+      + '    --centrifuge-build <cmd>     Command for centrifuge-build\n' \
+      + '    --centrifuge-inspect <cmd>   Command for centrifuge-inspect\n' \
+      + '    --python <exe>    Python interpreter for the scripts\n')
+    sys.exit(-1)
+
+  d = args[0]
+  opts['prefix'] = 'nt'
+  if len(args) > 1:
+    opts['prefix'] = args[1]
+  if not os.path.isdir(os.path.join(d, 'logs')):
+    os.makedirs(os.path.join(d, 'logs'))
+
+  state = loadState(os.path.join(d, '.buildDB.json'))
+  stages = pipeline(d, opts)
+  sidecars = [x for s in stages if s.source for x in s.outputs
+    if x + '.md5' in s.outputs]
+  hashes = HashCache(d, state['hashes'], statOnly, sidecars)
+  failed = build(d, stages, state, hashes, jobs, refresh, dryRun)
+  if failed:
+    sys.stderr.write('Error! %d stage(s) failed or blocked\n' % failed)
+    sys.exit(-1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,369 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Produce a kraken-style report from centrifuge's per-read
+#   output, as `centrifuge-kreport --no-lca` does (including
+#   the nt90 columns), but using local taxonomy files
+#   (.tree and names) rather than centrifuge-inspect.
+#   With --lca, each read with multiple hits is assigned to
+#   the LCA of their taxa (as centrifuge-kreport does by
+#   default), using the LCA index saved alongside the tree.
+#   With --weights (from collapseFq.py), the hits of each
+#   read are multiplied by its number of copies.
+
+import sys
+import metaProf
+import taxTree
+from taxTree import np
+from metaIO import openRead, openWrite
+
+def loadTree(f):
+  '''
+  Load parents and ranks from a taxonomy tree
+    (centrifuge-inspect --taxonomy-tree, nodes.dmp,
+    or a .tree file produced by ntSumm.py).
+  '''
+  return taxTree.loadTree(f)
+
+def loadNames(f, tree):
+  '''
+  Load taxon names (centrifuge-inspect --name-table,
+    or names.dmp [scientific names only]).
+  '''
+  for line in f:
+    spl = line.rstrip('\n').split('\t')
+    if len(spl) < 2:
+      continue
+    if len(spl) > 6 and spl[1] == '|':
+      # names.dmp format
+      if spl[6] == 'scientific name':
+        tree.name[int(spl[0])] = spl[2]
+    else:
+      tree.name[int(spl[0])] = spl[1]
+
+def rankCode(rank):
+  '''
+  Return one-letter code for canonical ranks.
+  '''
+  return {'species': 'S', 'genus': 'G', 'family': 'F', 'order': 'O',
+    'class': 'C', 'phylum': 'P', 'kingdom': 'K',
+    'superkingdom': 'D'}.get(rank, '-')
+
+class Aggregate:
+  '''
+  Aggregate: read assignments to each taxon
+    (taxo), to each seqID within a taxon (seqid),
+    and the total number of reads (seqCount).
+  '''
+  def __init__(self, minScore=None, minLength=None):
+    self.taxo = {'0': 0}
+    self.seqid = {}
+    self.seqCount = 0
+    self.minScore = minScore
+    self.minLength = minLength
+
+  def add(self, seqID, taxID, score, hitLength, numMatches, weight=1):
+    '''
+    Add one alignment of a read (with given weight).
+    '''
+    if self.minLength is not None and hitLength < self.minLength:
+      return
+    if self.minScore is not None and score < self.minScore:
+      return
+    frac = weight / float(numMatches)
+    self.taxo[taxID] = self.taxo.get(taxID, 0) + frac
+    if taxID not in self.seqid:
+      self.seqid[taxID] = {}
+    self.seqid[taxID][seqID] = self.seqid[taxID].get(seqID, 0) + frac
+    self.seqCount += frac
+
+def parseHeader(line):
+  '''
+  Map column names of centrifuge output to indexes.
+  '''
+  spl = line.rstrip('\n').split('\t')
+  idx = {}
+  for i in range(len(spl)):
+    idx[spl[i]] = i
+  for col in ['readID', 'seqID', 'taxID', 'score', 'hitLength',
+      'numMatches']:
+    if col not in idx:
+      sys.stderr.write('Error! Cannot find column %s ' % col \
+        + 'in centrifuge output header\n')
+      sys.exit(-1)
+  return idx
+
+def parseReads(f, agg, weights=None):
+  '''
+  Add all the reads of a centrifuge output file
+    to the aggregate. Optional weights give the
+    multiplicity of each readID.
+  '''
+  idx = parseHeader(f.readline())
+  iRead = idx['readID']
+  iSeq = idx['seqID']
+  iTax = idx['taxID']
+  iScore = idx['score']
+  iHit = idx['hitLength']
+  iNum = idx['numMatches']
+  count = 0
+  for line in f:
+    spl = line.rstrip('\n').split('\t')
+    weight = 1
+    if weights is not None:
+      weight = weights.get(spl[iRead], 1)
+    agg.add(spl[iSeq], spl[iTax], int(spl[iScore]), int(spl[iHit]),
+      int(spl[iNum]), weight)
+    count += 1
+  return count
+
+def assignLCA(taxa, first, lca):
+  '''
+  Reduce the hits of reads (taxa, with first marking
+    the first hit of each read) to the LCA of each read.
+  '''
+  taxa = np.array(taxa, np.int64)
+  start = np.nonzero(np.array(first, bool))[0]
+  num = np.diff(np.append(start, taxa.size))
+  res = taxa[start]
+  for i in range(1, int(num.max()) if num.size else 0):
+    sel = np.nonzero(num > i)[0]
+    res[sel] = lca.query(res[sel], taxa[start[sel] + i])
+  return res
+
+def parseReadsLCA(f, agg, lca, weights=None, batch=1000000):
+  '''
+  Add all the reads of a centrifuge output file to
+    the aggregate, each read assigned to the LCA of its
+    hits (in batches of hits). As in centrifuge-kreport,
+    minimum score/length are not applied, and the
+    seqIDs (nt90 values) are not recorded.
+  '''
+  idx = parseHeader(f.readline())
+  iRead = idx['readID']
+  iTax = idx['taxID']
+  count = 0
+  prev = None
+  taxa = []    # taxIDs of hits
+  first = []   # first hit of a read?
+  reads = []   # readIDs (for weights)
+
+  def flush():
+    res = assignLCA(taxa, first, lca)
+    w = np.ones(res.size)
+    if weights is not None:
+      w = np.array([weights.get(r, 1) for r in reads], float)
+    uniq, inv = np.unique(res, return_inverse=True)
+    sums = np.bincount(inv, weights=w)
+    for i in range(uniq.size):
+      t = str(uniq[i])
+      agg.taxo[t] = agg.taxo.get(t, 0) + sums[i]
+    agg.seqCount += w.sum()
+    del taxa[:], first[:], reads[:]
+
+  for line in f:
+    spl = line.split('\t', max(iRead, iTax) + 1)
+    read = spl[iRead]
+    if read != prev:
+      if len(taxa) >= batch:
+        flush()
+      if weights is not None:
+        reads.append(read)
+      prev = read
+      first.append(True)
+    else:
+      first.append(False)
+    taxa.append(int(spl[iTax]))
+    count += 1
+  if taxa:
+    flush()
+  return count
+
+def calcNT90(counts):
+  '''
+  Count the number of seqs that account for >= 90%
+    of the assignments to a taxon (counting generic
+    assignments as 5).
+  '''
+  total = 0.9 * sum(counts.values())
+  subt = count = 0
+  for seqID in sorted(counts, key=lambda s: -counts[s]):
+    if 'A' <= seqID[:1] <= 'Z':
+      count += 1
+    else:
+      count += 5
+    subt += counts[seqID]
+    if subt >= total:
+      break
+  return count
+
+def summarize(agg, tree):
+  '''
+  Sum read counts and nt90 values over the tree
+    (the taxa with assignments, and their ancestors).
+    Return clade counts and nt90 dicts (by taxID).
+  '''
+  taxa = [int(t) for t in agg.taxo if agg.taxo[t]]
+  active = tree.ancestors(taxa)
+  clade = {}
+  nt90 = {}
+  cladeNT90 = {}
+  child = {}
+  # iterative post-order traversal from root
+  stack = [(1, False)]
+  while stack:
+    node, done = stack.pop()
+    if not done:
+      taxon = str(node)
+      if taxon not in agg.taxo:
+        clade[node] = 0
+        nt90[node] = 0
+      else:
+        clade[node] = agg.taxo[taxon]
+        nt90[node] = calcNT90(agg.seqid.get(taxon, {}))
+      cladeNT90[node] = 0
+      kids = tree.children(node)
+      child[node] = kids[active[kids]].tolist()
+      stack.append((node, True))
+      for m in child[node][::-1]:
+        stack.append((m, False))
+      continue
+
+    # sum counts from children nodes
+    counts = [(node, clade[node])]
+    for m in child[node]:
+      counts.append((m, clade[m]))
+      clade[node] += clade[m]
+    if not clade[node]:
+      continue
+
+    # sum nt90s for nodes composing 90% of assignments
+    subt = 0
+    for m, c in sorted(counts, key=lambda x: -x[1]):
+      if m == node:
+        cladeNT90[node] += nt90[m]
+      else:
+        cladeNT90[node] += cladeNT90[m]
+      subt += c
+      if subt >= 0.9 * clade[node]:
+        break
+  return clade, nt90, cladeNT90
+
+def reportLine(pct, clade, taxo, code, taxon, cladeNT90, nt90,
+    depth, name):
+  '''
+  Format one line of the kraken-style report.
+  '''
+  return '%6.2f\t%.0f\t%.0f\t%s\t%d\t%d\t%d\t%s%s\n' % (pct, clade,
+    taxo, code, int(taxon), cladeNT90, nt90, '  ' * depth, name)
+
+def printReport(f, agg, tree, showZeros=False):
+  '''
+  Print the kraken-style report.
+  '''
+  if agg.seqCount <= 0:
+    sys.stderr.write('Error! No sequence matches with given settings\n')
+    sys.exit(-1)
+  clade, nt90, cladeNT90 = summarize(agg, tree)
+  total = agg.seqCount
+  f.write(reportLine(agg.taxo['0'] * 100 / total, agg.taxo['0'],
+    agg.taxo['0'], 'U', '0', 0, 0, 0, 'unclassified'))
+  stack = [(1, 0)]
+  while stack:
+    node, depth = stack.pop()
+    if not clade.get(node, 0) and not showZeros:
+      continue
+    f.write(reportLine(clade.get(node, 0) * 100 / total,
+      clade.get(node, 0), agg.taxo.get(str(node), 0),
+      rankCode(tree.rankName(node)), node,
+      cladeNT90.get(node, 0), nt90.get(node, 0), depth,
+      tree.name.get(node, '')))
+    child = sorted(tree.children(node).tolist(),
+      key=lambda m: -clade.get(m, 0))
+    for m in child[::-1]:
+      stack.append((m, depth + 1))
+
+def loadWeights(f):
+  '''
+  Load the number of copies of each read
+    (readID, count).
+  '''
+  weights = {}
+  for line in f:
+    spl = line.rstrip('\n').split('\t')
+    if len(spl) < 2:
+      continue
+    weights[spl[0]] = int(spl[1])
+  return weights
+
+def loadTaxonomy(treeFile, namesFile):
+  '''
+  Load tree and names files to a TaxTree.
+  '''
+  f = openRead(treeFile)
+  tree = loadTree(f)
+  if f != sys.stdin:
+    f.close()
+  f = openRead(namesFile)
+  loadNames(f, tree)
+  if f != sys.stdin:
+    f.close()
+  return tree
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  showZeros = '--show-zeros' in args
+  if showZeros:
+    args.remove('--show-zeros')
+  useLCA = '--lca' in args
+  if useLCA:
+    args.remove('--lca')
+  weightsFile = metaProf.popArg(args, '--weights')
+  if len(args) < 4:
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<taxTree>  <names>  <in>  <out> \\\n' \
+      + '    [--show-zeros]  [--lca]  [--weights <file>] \\\n' \
+      + '    [<minScore>  [<minLength>]]\n' \
+      + '  <taxTree>    Taxonomy tree (e.g. nt.tree, nodes.dmp)\n' \
+      + '  <names>      Names table (e.g. names.dmp)\n' \
+      + '  <in>         Centrifuge per-read output\n' \
+      + '  <out>        Output kraken-style report\n' \
+      + '  --lca        Assign reads with multiple hits to their LCA\n' \
+      + '                 (min. score/length not applied)\n' \
+      + '  --weights    Numbers of copies of collapsed reads\n' \
+      + '                 (from collapseFq.py)\n')
+    sys.exit(-1)
+
+  tree = loadTaxonomy(args[0], args[1])
+  weights = None
+  if weightsFile is not None:
+    f = openRead(weightsFile)
+    weights = loadWeights(f)
+    if f != sys.stdin:
+      f.close()
+  minScore = minLength = None
+  if len(args) > 4:
+    minScore = int(args[4])
+  if len(args) > 5:
+    minLength = int(args[5])
+
+  # aggregate reads
+  agg = Aggregate(minScore, minLength)
+  fIn = openRead(args[2])
+  if useLCA:
+    parseReadsLCA(fIn, agg, taxTree.loadLCA(args[0], tree), weights)
+  else:
+    parseReads(fIn, agg, weights)
+  if fIn != sys.stdin:
+    fIn.close()
+
+  # print report
+  fOut = openWrite(args[3])
+  printReport(fOut, agg, tree, showZeros)
+  if fOut != sys.stdout:
+    fOut.close()
+
+if __name__ == '__main__':
+  main()
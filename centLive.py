@@ -0,0 +1,273 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Produce live reports while centrifuge is still running:
+#   aggregate its per-read output as it streams in (e.g.
+#     centrifuge ... | python centLive.py nt.tree names - out.html)
+#   and, every N reads or T seconds (even while the input
+#   has stalled; of complete reads only), write snapshots
+#   of the kraken-style report (<out>.raw, as centKreport.py)
+#   and of the html summary (<out>, as centSumm3.py).
+#   Snapshots are written to temporary files and renamed,
+#   so readers never see partial reports; the last one (at
+#   the end of the input) is the final report.
+
+import sys
+import os
+import time
+import threading
+import metaProf
+import centKreport
+import centSumm3
+import metaIO
+from metaIO import openRead, openWrite
+
+class Snapshots:
+  '''
+  Snapshots: writes the reports of an aggregate to
+    <out>.raw and <out>, given the tree (with names,
+    canonical parents, and nt counts/lengths).
+  '''
+  def __init__(self, out, tax, num, version, date):
+    self.out = out
+    self.tree, self.canon, self.count, self.length = tax
+    self.num = num
+    self.version = version
+    self.date = date
+    self.written = 0
+
+  def write(self, agg):
+    '''
+    Write a snapshot of the reports (atomically).
+    '''
+    if agg.seqCount <= 0:
+      return
+    raw = self.out + '.raw'
+    f = openWrite(raw + '.tmp')
+    centKreport.printReport(f, agg, self.tree)
+    f.close()
+
+    # html summary (of the top taxa)
+    f = openRead(raw + '.tmp')
+    top = centSumm3.TopScores(self.num)
+    unclass, root, score = centSumm3.loadScores(f, self.tree, self.canon,
+      top)
+    f.close()
+    fOut = openWrite(self.out + '.tmp')
+    centSumm3.printOutput(fOut, unclass, root, self.num, top.cutoff(),
+      self.version, self.date, self.count, self.length)
+    fOut.close()
+    os.rename(raw + '.tmp', raw)
+    os.rename(self.out + '.tmp', self.out)
+    self.written += 1
+
+class LiveInput:
+  '''
+  LiveInput: centrifuge output, read by
+    centKreport.parseReads(). Input is read in chunks
+    of what has arrived (from a pipe), and its lines
+    (without newlines) are passed on once the next read
+    starts (or the input ends), so the aggregate only
+    has complete reads. A snapshot is written once every
+    reads (of the aggregate) have been added, or, by
+    a timer thread, once interval seconds have passed
+    (even if the input has stalled), if reads were
+    added since the last one. The lock is held except
+    while waiting for input.
+  '''
+  def __init__(self, f, agg, snap, every, interval, tee=None):
+    self.f = f
+    self.agg = agg
+    self.snap = snap
+    self.every = every
+    self.interval = interval
+    self.tee = tee
+    self.lock = threading.Lock()
+    self.done = threading.Event()
+    self.last = time.time()
+    self.lastReads = agg.seqCount
+    self.src = self.chunks()
+    self.rest = ''
+
+  def chunks(self):
+    '''
+    Yield chunks of the input as they arrive (by file
+      descriptor; compressed inputs in batches of lines).
+    '''
+    fd = None
+    if not isinstance(self.f, metaIO.Reader):
+      try:
+        fd = self.f.fileno()
+      except (AttributeError, IOError, ValueError):
+        pass
+    if fd is None:
+      batch = []
+      for line in self.f:
+        batch.append(line)
+        if len(batch) >= 1000:
+          yield ''.join(batch)
+          batch = []
+      if batch:
+        yield ''.join(batch)
+      return
+    while True:
+      chunk = os.read(fd, 1 << 16)
+      if not chunk:
+        break
+      if not isinstance(chunk, str):
+        chunk = chunk.decode('latin-1')
+      yield chunk
+
+  def readline(self):
+    '''
+    Read the header.
+    '''
+    while '\n' not in self.rest:
+      chunk = next(self.src, '')
+      if not chunk:
+        break
+      self.rest += chunk
+    header, sep, self.rest = self.rest.partition('\n')
+    header += sep
+    if self.tee is not None:
+      self.tee.write(header)
+    self.iRead = centKreport.parseHeader(header)['readID']
+    return header
+
+  def snapshot(self):
+    '''
+    Write a snapshot of the aggregate (with the lock held).
+    '''
+    self.snap.write(self.agg)
+    sys.stderr.write('Snapshot %d: %.0f reads\n' \
+      % (self.snap.written, self.agg.seqCount))
+    if self.tee is not None:
+      self.tee.flush()
+    self.last = time.time()
+    self.lastReads = self.agg.seqCount
+
+  def timer(self):
+    '''
+    Write snapshots every interval seconds (of reads
+      added since the last snapshot).
+    '''
+    wait = self.interval
+    while not self.done.wait(max(wait, 0.01)):
+      with self.lock:
+        wait = self.last + self.interval - time.time()
+        if wait <= 0:
+          if self.agg.seqCount != self.lastReads:
+            self.snapshot()
+          wait = self.interval
+
+  def __iter__(self):
+    agg = self.agg
+    iRead = self.iRead
+    pending = []   # lines of the last read (may continue)
+    rest = self.rest
+    if self.tee is not None:
+      self.tee.write(rest)
+    thread = threading.Thread(target=self.timer)
+    thread.daemon = True
+    thread.start()
+    self.lock.acquire()
+    try:
+      while True:
+        self.lock.release()
+        try:
+          chunk = next(self.src, '')
+        finally:
+          self.lock.acquire()
+        if not chunk:
+          break
+        if self.tee is not None:
+          self.tee.write(chunk)
+        lines = (rest + chunk).split('\n')
+        rest = lines.pop()
+        if not lines:
+          continue
+
+        # pass on all but the lines of the last read
+        lines = pending + lines
+        last = lines[-1].split('\t', iRead + 1)[iRead]
+        k = len(lines) - 1
+        while k and lines[k-1].split('\t', iRead + 1)[iRead] == last:
+          k -= 1
+        for i in range(k):
+          yield lines[i]
+        pending = lines[k:]
+        if agg.seqCount - self.lastReads >= self.every:
+          self.snapshot()
+      if rest:
+        pending.append(rest)
+      for line in pending:
+        yield line
+    finally:
+      self.done.set()
+      self.lock.release()
+      thread.join()
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  every = metaProf.popNum(args, '--every', 1000000)
+  interval = metaProf.popNum(args, '--interval', 60, float)
+  teeFile = metaProf.popArg(args, '--tee')
+  if len(args) < 4:
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<taxTree>  <names>  <in>  <out> \\\n' \
+      + '    [<num>  [<version>  <date>]]  [options]\n' \
+      + '  <taxTree>    Taxonomy tree with nt counts (e.g. nt.tree)\n' \
+      + '  <names>      Names table (e.g. names.dmp, or\n' \
+      + '                 centrifuge-inspect --name-table)\n' \
+      + '  <in>         Centrifuge per-read output (\'-\' for stdin)\n' \
+      + '  <out>        Output html file (and <out>.raw)\n' \
+      + '  <num>        Number of taxa to print (def. 20)\n' \
+      + '  <version>    Version of centrifuge\n' \
+      + '  <date>       Date of nt download\n' \
+      + '  Options:\n' \
+      + '    --every <int>       Reads between snapshots (def. 1000000)\n' \
+      + '    --interval <float>  Seconds between snapshots (def. 60)\n' \
+      + '    --tee <file>        Also save the per-read output\n')
+    sys.exit(-1)
+  num = 20
+  if len(args) > 4:
+    num = int(args[4])
+  version = date = ''
+  if len(args) > 6:
+    version = args[5]
+    date = args[6]
+
+  # load tree (with nt counts) and names
+  f = openRead(args[0])
+  tax = centSumm3.loadTax(f)
+  if f != sys.stdin:
+    f.close()
+  f = openRead(args[1])
+  centKreport.loadNames(f, tax[0])
+  if f != sys.stdin:
+    f.close()
+  snap = Snapshots(args[3], tax, num, version, date)
+
+  # aggregate reads, writing snapshots
+  agg = centKreport.Aggregate()
+  fIn = openRead(args[2])
+  tee = openWrite(teeFile) if teeFile is not None else None
+  centKreport.parseReads(LiveInput(fIn, agg, snap, every, interval, tee),
+    agg)
+  if fIn != sys.stdin:
+    fIn.close()
+  if tee is not None and tee != sys.stdout:
+    tee.close()
+
+  # final report
+  if agg.seqCount <= 0:
+    sys.stderr.write('Error! No sequence matches with given settings\n')
+    sys.exit(-1)
+  snap.write(agg)
+  sys.stderr.write('Final report (%.0f reads): %s\n' % (agg.seqCount,
+    args[3]))
+
+if __name__ == '__main__':
+  main()
@@ -6,41 +6,9 @@
 #   centrifuge's kraken-style report.
 
 import sys
-import gzip
-
-def openRead(filename):
-  '''
-  Open filename for reading. '-' indicates stdin.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdin
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'rb')
-    else:
-      f = open(filename, 'rU')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
-    sys.exit(-1)
-  return f
-
-def openWrite(filename):
-  '''
-  Open filename for writing. '-' indicates stdout.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdout
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'wb')
-    else:
-      f = open(filename, 'w')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
-    sys.exit(-1)
-  return f
+import taxTree
+from taxTree import np
+from metaIO import openRead, openWrite
 
 class Node:
   '''
@@ -184,7 +152,7 @@ def checkTree(node, taxon):
       return parent
   return None
 
-def loadScores(f, d):
+def loadScores(f, canon):
   '''
   Create taxonomic tree (including scores) from a
     Centrifuge report.
@@ -218,19 +186,21 @@ def loadScores(f, d):
       continue
 
     # find parent node in hierarchy
-    if spl[4] not in d:
+    taxon = int(spl[4])
+    if not 0 <= taxon < len(canon) or canon[taxon] == -2:
       sys.stderr.write('Warning! Unknown taxon: %s\n' % spl[4])
       continue
+    par = str(canon[taxon])
     parent = None
     # check current branch first
     while temp != None:
-      if temp.taxon == d[spl[4]]:
+      if temp.taxon == par:
         parent = temp
         break
       temp = temp.parent
     # if not found, check whole tree from root
     if parent == None:
-      parent = checkTree(root, d[spl[4]])
+      parent = checkTree(root, par)
     if parent == None:
       sys.stderr.write('Warning! Cannot find parent for ' \
         + 'taxon %s\n' % spl[4])
@@ -249,16 +219,6 @@ def loadScores(f, d):
 
   return unclass, root, score
 
-def findParent(d, taxon):
-  '''
-  Find parent taxon (recursively).
-  '''
-  if taxon not in d or d[taxon][0] not in d:
-    return None
-  if d[ d[taxon][0] ][1]:
-    return d[taxon][0]
-  return findParent(d, d[taxon][0])
-
 def loadTax(f):
   '''
   Load parents of each taxon, keeping only
@@ -266,35 +226,17 @@ def loadTax(f):
     (include 1 -> 'root'
          12908 -> 'unclassified sequences'
          28384 -> 'other sequences')
+    Return canonical parents (see TaxTree.canonical()).
   '''
-  # load immediate parent taxa to dict
-  temp = {}
-  for line in f:
-    spl = line.split('|')
-    if len(spl) < 3:
-      sys.stderr.write('Error! Improperly formatted tree file\n')
-      sys.exit(-1)
-
-    level = False
-    if spl[2].strip() in ['superkingdom', 'kingdom', 'phylum', \
-        'class', 'order', 'family', 'genus', 'species'] \
-        or spl[0].strip() in ['1', '12908', '28384']:
-      level = True
-    temp[spl[0].strip()] = (spl[1].strip(), level)
-
-  # save canonical parent taxa to dict
-  d = {}
-  for taxon in temp:
-    if taxon == '1': continue  # skip root (parent is 'None')
-    if temp[taxon][1]:
-      parent = findParent(temp, taxon)
-      if parent:
-        d[taxon] = parent
-      else:
-        sys.stderr.write('Warning! Cannot find parent ' \
-          + 'of taxon %s\n' % taxon)
-
-  return d
+  tree = taxTree.loadTree(f)
+  canon = tree.canonical([1, 12908, 28384])
+  if tree.has(1):
+    canon[1] = -2  # skip root (parent is 'None')
+  for taxon in np.nonzero(canon == -1)[0]:
+    sys.stderr.write('Warning! Cannot find parent ' \
+      + 'of taxon %d\n' % taxon)
+    canon[taxon] = -2
+  return canon
 
 def main():
   '''Main.'''
@@ -310,13 +252,13 @@ def main():
 
   # load tax tree
   fTax = openRead(args[1])
-  d = loadTax(fTax)
+  canon = loadTax(fTax)
   if fTax != sys.stdin:
     fTax.close()
 
   # load scores and create taxonomic tree
   fIn = openRead(args[0])
-  unclass, root, score = loadScores(fIn, d)
+  unclass, root, score = loadScores(fIn, canon)
   if fIn != sys.stdin:
     fIn.close()
 
@@ -6,43 +6,14 @@
 #   from centrifuge's kraken-style report.
 
 import sys
-import gzip
 import math
-import scipy.stats
-
-def openRead(filename):
-  '''
-  Open filename for reading. '-' indicates stdin.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdin
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'rb')
-    else:
-      f = open(filename, 'rU')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
-    sys.exit(-1)
-  return f
-
-def openWrite(filename):
-  '''
-  Open filename for writing. '-' indicates stdout.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdout
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'wb')
-    else:
-      f = open(filename, 'w')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
-    sys.exit(-1)
-  return f
+import json
+import heapq
+import scipy.special
+import metaProf
+import taxTree
+from taxTree import np
+from metaIO import openRead, openWrite
 
 class Node:
   '''
@@ -176,69 +147,133 @@ def calcPval(count, n, p1, p2):
     z = (p_hat - p0) / div
   if not div or z > 100:
     z = 100
-  return scipy.stats.norm.sf(z), p_hat
+  return scipy.special.ndtr(-z), p_hat  # (= scipy.stats.norm.sf(z))
+
+def calcCI(count, n, z=1.96):
+  '''
+  Calculate binomial (Wilson score) confidence
+    interval of a proportion, as percents.
+  '''
+  if n <= 0:
+    return 0.0, 100.0
+  p_hat = min(1.0, count / float(n))
+  div = 1 + z * z / n
+  mid = (p_hat + z * z / (2 * n)) / div
+  half = z * math.sqrt(p_hat * (1 - p_hat) / n + z * z / (4 * n * n)) / div
+  return 100 * max(0.0, mid - half), 100 * min(1.0, mid + half)
+
+def ciCell(count, total):
+  '''
+  Format the confidence interval of a percent.
+  '''
+  lo, hi = calcCI(count, total)
+  return '    <td align="center">%.2f&ndash;%.2f</td>\n' % (lo, hi)
 
-def printLevel(f, n, level, cutoff, signif, nt90Bool):
+def testNode(n, level, signif, nt90Bool):
+  '''
+  Determine if a node is enriched, and if its nt90
+    is low (True/False, or None if not measured).
+    Also return signif/nt90Bool for its children.
+  '''
+  # do not include significance/nt90 results for 'other' taxa
+  if n.taxon in ['12908', '28384']:
+    signif = False
+    nt90Bool = False
+
+  # determine significance (p-value <= 0.05 or prop >= 0.9)
+  enriched = None
+  if level > 0 and signif:
+    pval, p_hat = calcPval(n.count, n.parent.count, \
+        n.ntTotal, n.parent.ntTotal)
+        # null distribution based on number of nt sequences;
+        #   to use sequence lengths, specify n.ntLen and n.parent.ntLen
+        #   in above calcPval() call
+    enriched = not (pval > 0.05 and p_hat < 0.9)
+    signif = enriched
+
+  lowNT90 = None
+  if nt90Bool:
+    lowNT90 = n.nt90 < 5
+  return enriched, lowNT90, signif, nt90Bool
+
+def printLevel(f, n, level, cutoff, signif, nt90Bool, total=0):
   '''
   Print results for a node (if its count meets cutoff).
-    Continue printing for children nodes (recursively).
+    Continue printing for children nodes (recursively;
+    their counts cannot exceed the node's). With total
+    (reads of a subsample), add the percent's CI.
   '''
-  if n.count >= cutoff:  # or level == 0: # to include all children of root
-
-    # do not include significance/nt90 results for 'other' taxa
-    if n.taxon in ['12908', '28384']:
-      signif = False
-      nt90Bool = False
-
-    # determine significance (p-value <= 0.05 or prop >= 0.9)
-    if level > 0 and signif:
-      pval, p_hat = calcPval(n.count, n.parent.count, \
-          n.ntTotal, n.parent.ntTotal)
-          # null distribution based on number of nt sequences;
-          #   to use sequence lengths, specify n.ntLen and n.parent.ntLen
-          #   in above calcPval() call
-      if pval > 0.05 and p_hat < 0.9:
-        signif = False
-        sigRes = '    <td align="center" style="color:red">&#10008;</td>\n'
-      else:
-        sigRes = '    <td align="center" style="color:green">&#10003;</td>\n'
-    else:
-      sigRes = '    <td align="center">&#9472;</td>\n'
-
-    # add nt90 value
-    if not nt90Bool:
-      nt90 = '    <td align="center">&#9472;</td>\n'
-    elif n.nt90 < 5:
-      nt90 = '    <td align="center">&#10071;</td>\n'
-    else:
-      nt90 = '    <td></td>\n'
-
-    # write results
-    f.write('  <tr>\n' \
-      + '    <td align="right">%.2f&emsp;</td>\n' % n.score \
-      + '    <td>%s%s</td>\n' % (level * 2 * '&emsp;', n.name) \
-      + sigRes \
-      + nt90 \
-      + '    <td align="right">%d</td>\n' % n.ntTotal \
-      + '  </tr>\n')
+  if n.count < cutoff:  # (nor can any children)
+    return
+
+  enriched, lowNT90, signif, nt90Bool \
+    = testNode(n, level, signif, nt90Bool)
+  if enriched is None:
+    sigRes = '    <td align="center">&#9472;</td>\n'
+  elif enriched:
+    sigRes = '    <td align="center" style="color:green">&#10003;</td>\n'
+  else:
+    sigRes = '    <td align="center" style="color:red">&#10008;</td>\n'
+
+  # add nt90 value
+  if lowNT90 is None:
+    nt90 = '    <td align="center">&#9472;</td>\n'
+  elif lowNT90:
+    nt90 = '    <td align="center">&#10071;</td>\n'
+  else:
+    nt90 = '    <td></td>\n'
+
+  # write results
+  f.write('  <tr>\n' \
+    + '    <td align="right">%.2f&emsp;</td>\n' % n.score \
+    + (ciCell(n.count, total) if total else '') \
+    + '    <td>%s%s</td>\n' % (level * 2 * '&emsp;', n.name) \
+    + sigRes \
+    + nt90 \
+    + '    <td align="right">%d</td>\n' % n.ntTotal \
+    + '  </tr>\n')
 
   for m in n.child:
-    printLevel(f, m, level + 1, cutoff, signif, nt90Bool)
+    printLevel(f, m, level + 1, cutoff, signif, nt90Bool, total)
+
+def testTree(n, level, signif, nt90Bool, res):
+  '''
+  Determine enrichment and nt90 flags (see testNode())
+    of a node and all nodes below it (as printLevel()
+    would with no cutoff). Save to res, by taxon.
+  '''
+  enriched, lowNT90, signif, nt90Bool \
+    = testNode(n, level, signif, nt90Bool)
+  res[n.taxon] = (enriched, lowNT90)
+  for m in n.child:
+    testTree(m, level + 1, signif, nt90Bool, res)
 
 def printOutput(f, unclass, root, num, cutoff, version, date,
-    count, length):
+    count, length, sample=None):
   '''
   Begin printing results (header and unclassified).
-    Start recursive tree printing.
+    Start recursive tree printing. With sample (stats
+    of subsampleFq.py), report the sampling fraction
+    and confidence intervals of the percents.
   '''
   f.write('''<h2>Taxonomy Analysis</h2>
 <strong><font color="red" size="4">Warning:</font></strong>
 <font size="4"> experimental software; not suitable for publication</font>
 <p>
-<table style="width:100%;border:1px solid;">
+''')
+  total = 0
+  if sample is not None:
+    total = unclass[3] + max(root.count, 0)
+    f.write('<strong>Preliminary report:</strong> ' \
+      + 'based on %d of %d reads (%.2f%%),\n' % (sample['sampled'],
+      sample['reads'], 100 * sample['fraction']) \
+      + '  sampled at random (seed %d). ' % sample['seed'] \
+      + 'Percents are given with 95% confidence intervals.\n<p>\n')
+  f.write('''<table style="width:100%;border:1px solid;">
   <tr>
     <th align="right" width=10%>Percent&emsp;</th>
-    <th align="left" width=50%>Taxon</th>
+''' + ('    <th align="center">95% CI</th>\n' if total else '') \
+  + '''    <th align="left" width=50%>Taxon</th>
     <th align="center">Enriched</th>
     <th align="center">nt90</th>
     <th align="right">Total nt sequences</th>
@@ -246,6 +281,7 @@ def printOutput(f, unclass, root, num, cutoff, version, date,
 ''')
   f.write('  <tr>\n' \
     + '    <td align="right">%.2f&emsp;</td>\n' % unclass[0] \
+    + (ciCell(unclass[3], total) if total else '') \
     + '    <td>unclassified</td>\n' \
     + '    <td align="center">&#9472;</td>\n' \
     + '    <td align="center">&#9472;</td>\n' \
@@ -262,7 +298,7 @@ def printOutput(f, unclass, root, num, cutoff, version, date,
 
   # print tree
   for n in root.child:
-    printLevel(f, n, 0, cutoff, True, True)
+    printLevel(f, n, 0, cutoff, True, True, total)
   f.write('</table>\n')
 
   printFooter(f, num, version, date, count, length)
@@ -276,6 +312,40 @@ def findCutoff(score, x):
   res = sorted(score, reverse=True)
   return res[x-1]
 
+class TopScores:
+  '''
+  TopScores: the top num scores seen (bounded heap),
+    and the number of scores seen.
+  '''
+  def __init__(self, num):
+    self.num = num
+    self.heap = []
+    self.seen = 0
+
+  def add(self, score):
+    '''
+    Add a score.
+    '''
+    self.seen += 1
+    if len(self.heap) < self.num:
+      heapq.heappush(self.heap, score)
+    elif score > self.heap[0]:
+      heapq.heapreplace(self.heap, score)
+
+  def below(self, score):
+    '''
+    Check if a score cannot reach the top num.
+    '''
+    return len(self.heap) >= self.num and score < self.heap[0]
+
+  def cutoff(self):
+    '''
+    Threshold for the top num scores (as findCutoff()).
+    '''
+    if self.num >= self.seen or not self.heap:
+      return 0
+    return self.heap[0]
+
 def checkTree(node, taxon):
   '''
   Search node and its children for given taxon.
@@ -288,16 +358,21 @@ def checkTree(node, taxon):
       return parent
   return None
 
-def loadScores(f, d):
+def loadScores(f, tree, canon, top=None):
   '''
   Create taxonomic tree (including scores) from a
-    Centrifuge report.
+    Centrifuge report, given the canonical parents
+    from loadTax(). With top (TopScores), subtrees
+    whose counts cannot reach the top scores are
+    skipped (the report lists each taxon's subtree
+    below it, more indented).
   '''
   rank = 'DKPCOFGS'
   unclass = 0.0  # 'unclassified' score
   root = Node(None, 'root', '1', -1, -1, -1, -1, -1) # root of tree
   temp = root    # pointer to previous node
   score = []     # list of scores (read counts)
+  skip = -1      # depth of skipped subtree
 
   for line in f:
     spl = line.split('\t')
@@ -306,7 +381,22 @@ def loadScores(f, d):
         + 'centrifuge-kreport file\n')
       sys.exit(-1)
 
-    # skip non-canonical levels
+    # skip subtrees below the top scores (counting their
+    #   canonical taxa as seen)
+    if top is not None and spl[3] != 'U':
+      depth = (len(spl[7]) - len(spl[7].lstrip(' '))) // 2
+      if skip == -1 or depth <= skip:
+        skip = -1
+        if top.below(int(spl[1])):
+          skip = depth
+      if skip != -1:
+        if spl[3] in rank or spl[4] in ['12908', '28384']:
+          top.seen += 1
+        continue
+
+    # skip non-canonical levels (saving root's count)
+    if spl[4] == '1':
+      root.count = int(spl[1])
     if spl[3] == '-':
       if spl[4] not in ['12908', '28384']:
         # make exception for these '-' taxa
@@ -314,7 +404,8 @@ def loadScores(f, d):
         continue
     elif spl[3] == 'U':
       # save unclassified value automatically
-      unclass = (float(spl[0]), d['0'][1], d['0'][2])
+      unclass = (float(spl[0]), int(tree.count[0]), int(tree.length[0]),
+        int(spl[1]))
       continue
     elif spl[3] not in rank:
       sys.stderr.write('Warning! Unknown taxonomic rank:' \
@@ -322,19 +413,21 @@ def loadScores(f, d):
       continue
 
     # find parent node in hierarchy
-    if spl[4] not in d:
+    taxon = int(spl[4])
+    if not 0 <= taxon < len(canon) or canon[taxon] == -2:
       sys.stderr.write('Warning! Unknown taxon: %s\n' % spl[4])
       continue
+    par = str(canon[taxon])
     parent = None
     # check current branch first
     while temp != None:
-      if temp.taxon == d[spl[4]][0]:
+      if temp.taxon == par:
         parent = temp
         break
       temp = temp.parent
     # if not found, check whole tree from root
     if parent == None:
-      parent = checkTree(root, d[spl[4]][0])
+      parent = checkTree(root, par)
     if parent == None:
       sys.stderr.write('Warning! Cannot find parent for ' \
         + 'taxon %s\n' % spl[4])
@@ -345,25 +438,17 @@ def loadScores(f, d):
     if spl[3] in 'GS' and name[0].isupper():
       name = '<i>' + name + '</i>'  # italicize genus/species
     n = Node(parent, name, spl[4], spl[0], spl[1], spl[5],
-      d[spl[4]][1], d[spl[4]][2])
+      tree.count[taxon], tree.length[taxon])
     parent.child.append(n)
     temp = n
 
     # save score
     score.append(int(spl[1]))
+    if top is not None:
+      top.add(int(spl[1]))
 
   return unclass, root, score
 
-def findParent(d, taxon):
-  '''
-  Find parent taxon (recursively).
-  '''
-  if taxon not in d or d[taxon][0] not in d:
-    return None
-  if d[ d[taxon][0] ][1]:
-    return d[taxon][0]
-  return findParent(d, d[taxon][0])
-
 def loadTax(f):
   '''
   Load parents of each taxon, keeping only
@@ -372,73 +457,76 @@ def loadTax(f):
              1 -> 'root'
          12908 -> 'unclassified sequences'
          28384 -> 'other sequences')
+    Return tree, canonical parents (see
+    TaxTree.canonical()), and total count/length.
   '''
-  # load immediate parent taxa and counts to dict
+  tree = taxTree.loadTree(f, counts=True)
+  canon = tree.canonical([0, 1, 12908, 28384])
+
+  # for root nodes, save counts only (parents are 'None')
   count = length = 0
-  temp = {}
-  for line in f:
-    spl = line.split('|')
-    if len(spl) < 3:
-      sys.stderr.write('Error! Improperly formatted tree file\n')
-      sys.exit(-1)
+  for taxon in [0, 1]:
+    if tree.has(taxon):
+      canon[taxon] = -1
+      count += int(tree.count[taxon])
+      length += int(tree.length[taxon])
 
-    level = False
-    if spl[2].strip() in ['superkingdom', 'kingdom', 'phylum', \
-        'class', 'order', 'family', 'genus', 'species'] \
-        or spl[0].strip() in ['0', '1', '12908', '28384']:
-      level = True
-    temp[spl[0].strip()] = (spl[1].strip(), level, int(spl[3]),
-      int(spl[4]))
-
-  # save canonical parent taxa (and stats) to dict
-  d = {}
-  for taxon in temp:
-    # for root nodes, save counts only (parents are 'None')
-    if taxon in ['0', '1']:
-      d[taxon] = (None, temp[taxon][2], temp[taxon][3])
-      count += temp[taxon][2]
-      length += temp[taxon][3]
-      continue
-    # find canonical parent
-    if temp[taxon][1]:
-      parent = findParent(temp, taxon)
-      if parent:
-        d[taxon] = (parent, temp[taxon][2], temp[taxon][3])
-      else:
-        sys.stderr.write('Warning! Cannot find parent ' \
-          + 'of taxon %s\n' % taxon)
+  # drop canonical taxa without canonical parents
+  for taxon in np.nonzero(canon == -1)[0]:
+    if taxon not in [0, 1]:
+      sys.stderr.write('Warning! Cannot find parent ' \
+        + 'of taxon %d\n' % taxon)
+      canon[taxon] = -2
 
-  return d, count, length
+  return tree, canon, count, length
 
 def main():
   '''Main.'''
   args = sys.argv[1:]
+  prof = metaProf.fromArgs('centSumm3', args)
+  sampleFile = metaProf.popArg(args, '--sample')
   if len(args) < 3:
     sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
       + '<kreport>  <taxTree>  <out> \ \n' \
-      + '    [<num>]  [<version>  <date>]\n' \
+      + '    [<num>]  [<version>  <date>]  [--sample <stats>]\n' \
       + '  <num>      Number of taxa to print (def. 20)\n' \
       + '  <version>  Version of centrifuge\n' \
-      + '  <date>     Date of nt download\n')
+      + '  <date>     Date of nt download\n' \
+      + '  --sample   Sampling stats (subsampleFq.py --stats) of the\n' \
+      + '               reads, to give confidence intervals\n' \
+      + metaProf.usage)
     sys.exit(-1)
+  sample = None
+  if sampleFile is not None:
+    f = openRead(sampleFile)
+    sample = json.load(f)
+    if f != sys.stdin:
+      f.close()
 
   # load tax tree
-  fTax = openRead(args[1])
-  d, count, length = loadTax(fTax)
-  if fTax != sys.stdin:
-    fTax.close()
-
-  # load scores and create taxonomic tree
-  fIn = openRead(args[0])
-  unclass, root, score = loadScores(fIn, d)
-  if fIn != sys.stdin:
-    fIn.close()
-
-  # find cutoff score for top N taxa
+  with prof.phase('loadTax'):
+    fTax = openRead(args[1])
+    tree, canon, count, length = loadTax(fTax)
+    if fTax != sys.stdin:
+      fTax.close()
+    prof.count(len(tree), metaProf.fileSize(args[1]))
+
+  # load scores and create taxonomic tree (of taxa
+  #   that may reach the top N)
   num = 20
   if len(args) > 3:
     num = int(args[3])
-  cutoff = findCutoff(score, num)
+  top = TopScores(num)
+  with prof.phase('loadScores'):
+    fIn = openRead(args[0])
+    unclass, root, score = loadScores(fIn, tree, canon, top)
+    if fIn != sys.stdin:
+      fIn.close()
+    prof.count(top.seen, metaProf.fileSize(args[0]))
+
+  # find cutoff score for top N taxa
+  with prof.phase('findCutoff'):
+    cutoff = top.cutoff()
 
   # load centrifuge version, date of nt download
   version = date = ''
@@ -447,11 +535,13 @@ def main():
     date = args[5]
 
   # print output
-  fOut = openWrite(args[2])
-  printOutput(fOut, unclass, root, num, cutoff, version, date,
-    count, length)
-  if fOut != sys.stdout:
-    fOut.close()
+  with prof.phase('printOutput'):
+    fOut = openWrite(args[2])
+    printOutput(fOut, unclass, root, num, cutoff, version, date,
+      count, length, sample)
+    if fOut != sys.stdout:
+      fOut.close()
+  prof.finish()
 
 if __name__ == '__main__':
   main()
@@ -0,0 +1,566 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Run centrifuge on the samples of a sequencing run (as
+#   centrifugeWrap.sh and centrifuge.sh do), several at a time:
+#   - samples (and their files in other lanes) are found as
+#     in centrifugeWrap.sh
+#   - classifications run concurrently, as many as fit in the
+#     CPU and memory budgets, sharing one memory-mapped (--mm)
+#     index
+#   - reports (centSumm3.py) run alongside the next
+#     classifications
+#   - the state of each sample is saved (<out>/.centrifugeSched.json),
+#     so a rerun resumes where the last one stopped
+#   - results are cached (<out>/.cache), keyed by hashes of the
+#     inputs: the classification (kraken-style report) by the
+#     fastq files, index (by size/mtime, unless --hash-idx),
+#     and classification settings; the html report by those,
+#     the tree, and the report settings. A
+#     sample is skipped if its report is cached, and re-rendered
+#     from its cached classification if only the report changed
+#   - with several (comma-separated) indexes, e.g. the shards of
+#     filterNT2.py --shards, reads are classified against each,
+#     and the outputs merged (mergeCent.py)
+
+import sys
+import os
+import glob
+import json
+import shutil
+import hashlib
+import threading
+import metaProf
+from buildDB import HashCache, runCommand, saveState
+
+try:
+  import Queue as queue
+except ImportError:
+  import queue
+try:
+  from shlex import quote
+except ImportError:
+  from pipes import quote
+
+ROOT = '/n/seqcfs/sequencing/analysis_finished'
+IDX = '/n/regal/informatics_public/metagen/nt'
+LANES = ['Lane%d' % i for i in range(1, 9)]
+
+def findSamples(root, fol, lane):
+  '''
+  Find R1 (and R2) files of each sample in the lane,
+    with those of the same sample in other lanes.
+  '''
+  samples = []
+  for f in sorted(glob.glob(os.path.join(root, fol, lane + '.*', 'Fastq',
+      '*R1.fastq.gz'))):
+
+    # skip undetermined
+    if 'Undetermined' in f:
+      continue
+    base = os.path.basename(f)[:-len('.R1.fastq.gz')]
+    d = os.path.dirname(f)
+    r1 = [f]
+    r2 = []
+    if os.path.exists(f[:-len('R1.fastq.gz')] + 'R2.fastq.gz'):
+      r2.append(f[:-len('R1.fastq.gz')] + 'R2.fastq.gz')
+
+    # check for files in other lanes
+    for ln in LANES:
+      if ln == lane:
+        continue
+      d2 = d.replace(lane, ln)
+      if os.path.exists(os.path.join(d2, base + '.R1.fastq.gz')):
+        r1.append(os.path.join(d2, base + '.R1.fastq.gz'))
+      if os.path.exists(os.path.join(d2, base + '.R2.fastq.gz')):
+        r2.append(os.path.join(d2, base + '.R2.fastq.gz'))
+    samples.append((base, r1, r2))
+  return samples
+
+def totalMem():
+  '''
+  Total memory (bytes) of this machine.
+  '''
+  try:
+    return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+  except (ValueError, OSError, AttributeError):
+    return 0
+
+def classifySlots(cpus, mem, proc, jobMem, idxMem, mm):
+  '''
+  Number of concurrent classifications that fit the
+    CPU and memory budgets. With --mm, the index is
+    mapped once and shared by all jobs.
+  '''
+  byCpu = cpus // proc
+  if mm:
+    byMem = (mem - idxMem) // jobMem
+  else:
+    byMem = mem // (idxMem + jobMem)
+  return int(max(1, min(byCpu, byMem)))
+
+def scriptPath(name):
+  '''
+  Path of a script of this package.
+  '''
+  return os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+
+def subsampleCmd(r1, r2, raw, opts):
+  '''
+  Command to subsample reads (subsampleFq.py), with
+    the sampling stats saved for the report.
+    Return the command and the subsampled files.
+  '''
+  pre = raw[:-len('.html.raw')] + '.sub'
+  sub1 = [pre + '.R1.fastq']
+  sub2 = [pre + '.R2.fastq'] if r2 else []
+  amt = opts['subsample']
+  return '%s %s %s %s %s %s --%s %s --seed %d --stats %s' % (opts['python'],
+    quote(scriptPath('subsampleFq.py')), quote(','.join(r1)),
+    quote(','.join(r2)) if r2 else 'None', quote(sub1[0]),
+    quote(sub2[0]) if r2 else '', 'fraction' if amt < 1 else 'reads',
+    repr(amt) if amt < 1 else '%d' % amt, opts['seed'],
+    quote(raw[:-len('.raw')] + '.sample.json')), sub1, sub2
+
+def collapseCmd(r1, r2, raw, opts):
+  '''
+  Command to collapse identical reads (collapseFq.py).
+    Return the command, the unique-read files, and
+    the weights file.
+  '''
+  pre = raw[:-len('.html.raw')] + '.uniq'
+  uniq1 = [pre + '.R1.fastq']
+  uniq2 = [pre + '.R2.fastq'] if r2 else []
+  weights = pre + '.weights'
+  return '%s %s %s %s %s %s%s' % (opts['python'],
+    quote(scriptPath('collapseFq.py')), quote(','.join(r1)),
+    quote(','.join(r2)) if r2 else 'None', quote(uniq1[0]),
+    quote(uniq2[0]) + ' ' if r2 else '', quote(weights)), uniq1, uniq2, \
+    weights
+
+def classifyCmd(r1, r2, raw, opts):
+  '''
+  Command to classify reads and produce the
+    kraken-style report (as in centrifuge.sh),
+    first subsampling and/or collapsing the reads
+    (if requested). Collapsed reads are reported
+    by centKreport.py, with their weights. With
+    sharded indexes, the per-read outputs of the
+    shards are merged.
+  '''
+  sub = ''
+  tmp = []
+  if opts['subsample']:
+    cmd, r1, r2 = subsampleCmd(r1, r2, raw, opts)
+    sub += cmd + ' && '
+    tmp += r1 + r2
+  kreport = '%s -x %s --no-lca' % (opts['kreport'], quote(opts['idx']))
+  if opts['collapse']:
+    cmd, r1, r2, weights = collapseCmd(r1, r2, raw, opts)
+    sub += cmd + ' && '
+    tmp += r1 + r2 + [weights]
+    kreport = '%s %s %s %s - - --weights %s' % (opts['python'],
+      quote(scriptPath('centKreport.py')), quote(opts['tree']),
+      quote(opts['names']), quote(weights))
+  if r2:
+    reads = '-1 %s -2 %s' % (quote(','.join(r1)), quote(','.join(r2)))
+  else:
+    reads = '-U %s' % quote(','.join(r1))
+  cent = '%s -p %d -x %%s %s %s' % (opts['centrifuge'], opts['proc'],
+    reads, '--mm' if opts['mm'] else '') \
+    + ' --no-abundance --report-file /dev/null'
+  if len(opts['shards']) > 1:
+    outs = [raw[:-len('.html.raw')] + '.shard%d.out' % i
+      for i in range(len(opts['shards']))]
+    tmp += outs
+    cent = ' && '.join(cent % quote(x) + ' --reorder -S %s' % quote(y)
+      for x, y in zip(opts['shards'], outs)) + ' && %s %s %s -' \
+      % (opts['python'], quote(scriptPath('mergeCent.py')),
+      quote(','.join(outs)))
+  else:
+    cent = cent % quote(opts['idx'])
+  cmd = 'set -o pipefail; %s%s | %s' % (sub, cent, kreport) \
+    + ' > %s.tmp && mv %s.tmp %s' % (quote(raw), quote(raw), quote(raw))
+  if tmp:
+    cmd += '; ret=$?; rm -f %s; exit $ret' % ' '.join(quote(x) for x in tmp)
+  return cmd
+
+def reportCmd(raw, html, opts):
+  '''
+  Command to produce the html report (centSumm3.py).
+  '''
+  cmd = '%s %s %s %s %s %d %s %s' % (opts['python'],
+    quote(scriptPath('centSumm3.py')), quote(raw),
+    quote(opts['tree']), quote(html), opts['top'],
+    quote(opts['version']), quote(opts['date']))
+  if opts['subsample']:
+    cmd += ' --sample %s' % quote(html + '.sample.json')
+  return cmd
+
+def readVersions(opts):
+  '''
+  Determine versions of centrifuge and nt (as in
+    centrifuge.sh).
+  '''
+  opts['version'] = opts['date'] = ''
+  exe = opts['centrifuge'].split()[0]
+  for d in os.environ.get('PATH', '').split(os.pathsep):
+    if os.path.exists(os.path.join(d, exe)):
+      if os.path.exists(os.path.join(d, 'VERSION')):
+        f = open(os.path.join(d, 'VERSION'))
+        opts['version'] = f.read().strip()
+        f.close()
+      break
+  date = os.path.join(os.path.dirname(opts['idx']), 'DATE')
+  if os.path.exists(date):
+    f = open(date)
+    opts['date'] = f.read().strip()
+    f.close()
+
+class ResultCache:
+  '''
+  ResultCache: classifications (.raw) and reports
+    (.html) of samples, stored in a folder under keys
+    hashed from their inputs. Digests of files are
+    cached by (size, mtime), as in buildDB.py. The
+    index files are keyed by (size, mtime) only,
+    unless hashIdx.
+  '''
+  def __init__(self, d, statOnly=False, hashIdx=False):
+    self.d = d
+    if not os.path.isdir(d):
+      os.makedirs(d)
+    self.hashFile = os.path.join(d, 'hashes.json')
+    cache = {}
+    if os.path.exists(self.hashFile):
+      f = open(self.hashFile)
+      cache = json.load(f)
+      f.close()
+    self.hashes = HashCache('', cache, statOnly)
+    self.idxHashes = self.hashes
+    if not hashIdx:
+      self.idxHashes = HashCache('', {}, True)
+
+  def key(self, settings, files, idxFiles=[]):
+    '''
+    Hash of settings and the digests of files
+      (and of index files).
+    '''
+    m = hashlib.md5(json.dumps(settings, sort_keys=True).encode())
+    for path in files:
+      m.update(('\0%s' % self.hashes.digest(os.path.abspath(path))).encode())
+    for path in idxFiles:
+      m.update(('\0%s' \
+        % self.idxHashes.digest(os.path.abspath(path))).encode())
+    return m.hexdigest()
+
+  def classifyKey(self, r1, r2, opts):
+    '''
+    Key of a classification: the reads, index (and
+      tree/names, with --collapse), and settings.
+    '''
+    files = r1 + r2
+    idxFiles = []
+    for idx in opts['shards']:
+      idxFiles += sorted(glob.glob(idx + '.*.cf'))
+    scripts = ['centrifugeSched.py']
+    if opts['subsample']:
+      scripts.append('subsampleFq.py')
+    if opts['collapse']:
+      files += [opts['tree'], opts['names']]
+      scripts += ['collapseFq.py', 'centKreport.py']
+    if len(opts['shards']) > 1:
+      scripts.append('mergeCent.py')
+    settings = {'reads': [len(r1), len(r2)],
+      'shards': len(opts['shards']), 'centrifuge': opts['centrifuge'],
+      'kreport': opts['kreport'], 'version': opts['version'],
+      'subsample': opts['subsample'], 'seed': opts['seed'],
+      'collapse': opts['collapse']}
+    return self.key(settings, files + [scriptPath(x) for x in scripts],
+      idxFiles)
+
+  def reportKey(self, classifyKey, opts):
+    '''
+    Key of a report: the classification, tree, and
+      report settings.
+    '''
+    settings = {'classify': classifyKey, 'top': opts['top'],
+      'version': opts['version'], 'date': opts['date']}
+    return self.key(settings, [opts['tree'], scriptPath('centSumm3.py')])
+
+  def path(self, key, ext):
+    '''
+    Path of a cached file.
+    '''
+    return os.path.join(self.d, key + ext)
+
+  def has(self, key, ext):
+    '''
+    Check if a file is cached.
+    '''
+    return os.path.exists(self.path(key, ext))
+
+  def get(self, key, ext, filename):
+    '''
+    Copy a cached file to filename (if cached).
+    '''
+    if self.has(key, ext):
+      shutil.copyfile(self.path(key, ext), filename + '.tmp')
+      os.rename(filename + '.tmp', filename)
+
+  def put(self, filename, key, ext):
+    '''
+    Store a file in the cache (if it exists).
+    '''
+    if os.path.exists(filename):
+      shutil.copyfile(filename, self.path(key, ext) + '.tmp')
+      os.rename(self.path(key, ext) + '.tmp', self.path(key, ext))
+
+  def save(self):
+    '''
+    Save the file digests.
+    '''
+    saveState(self.hashFile, self.hashes.cache)
+
+def runJob(kind, base, cmd, logFile, done):
+  '''
+  Run a job (in a thread); put the result on
+    the queue done.
+  '''
+  done.put((kind, base, runCommand(cmd, None, logFile)))
+
+def restore(cache, key, exts, html, dryRun):
+  '''
+  Copy cached files (by extension) to the outputs
+    of a sample (<html>.raw, etc.).
+  '''
+  if not dryRun:
+    for ext in exts:
+      cache.get(key, ext, html + ext)
+
+def schedule(samples, state, stateFile, out, opts, slots, cache):
+  '''
+  Run classifications (up to slots at once) and
+    reports (up to opts['reportJobs'] at once),
+    unless cached, or done (or classified) in the
+    saved state with the same keys and the outputs
+    present. Return the number of failed samples.
+  '''
+  classifyQ = []
+  reportQ = []
+  rawExts = ['.raw', '.sample.json'] if opts['subsample'] else ['.raw']
+  for base, r1, r2 in samples:
+    html = os.path.join(out, base + '.html')
+    ckey = cache.classifyKey(r1, r2, opts)
+    rkey = cache.reportKey(ckey, opts)
+    prev = state.get(base, {})
+    state[base] = {'state': 'pending', 'r1': r1, 'r2': r2,
+      'classifyKey': ckey, 'reportKey': rkey}
+    if prev.get('classifyKey') == ckey \
+        and all(os.path.exists(html + ext) for ext in rawExts):
+      if prev.get('state') == 'done' and prev.get('reportKey') == rkey \
+          and os.path.exists(html):
+        state[base] = prev
+        sys.stderr.write('%s: done\n' % base)
+        continue
+      if prev.get('state') in ['classified', 'done']:
+        state[base]['state'] = 'classified'
+        reportQ.append(base)
+        sys.stderr.write('%s: %sresuming at report\n' \
+          % (base, 'would be ' if opts['dryRun'] else ''))
+        continue
+    if cache.has(rkey, '.html'):
+      restore(cache, ckey, rawExts, html, opts['dryRun'])
+      if not opts['dryRun']:
+        cache.get(rkey, '.html', html)
+      state[base]['state'] = 'done'
+      sys.stderr.write('%s: cached\n' % base)
+      continue
+    if cache.has(ckey, '.raw'):
+      restore(cache, ckey, rawExts, html, opts['dryRun'])
+      state[base]['state'] = 'classified'
+      reportQ.append(base)
+      sys.stderr.write('%s: %sreporting from cached classification\n' \
+        % (base, 'would be ' if opts['dryRun'] else ''))
+    else:
+      classifyQ.append(base)
+      if opts['dryRun']:
+        sys.stderr.write('%s: would classify %s %s\n' % (base, r1, r2))
+  cache.save()
+  if opts['dryRun']:
+    return 0
+  saveState(stateFile, state)
+  if not (classifyQ or reportQ):
+    return 0
+
+  logDir = os.path.join(out, 'logs')
+  if not os.path.isdir(logDir):
+    os.makedirs(logDir)
+  done = queue.Queue()
+  running = {'classify': 0, 'report': 0}
+  failed = 0
+  while classifyQ or reportQ or running['classify'] or running['report']:
+
+    # start jobs that fit
+    while classifyQ and running['classify'] < slots:
+      base = classifyQ.pop(0)
+      raw = os.path.join(out, base + '.html.raw')
+      cmd = classifyCmd(state[base]['r1'], state[base]['r2'], raw, opts)
+      running['classify'] += 1
+      sys.stderr.write('%s: classifying\n' % base)
+      t = threading.Thread(target=runJob, args=('classify', base, cmd,
+        os.path.join(logDir, base + '.classify.log'), done))
+      t.daemon = True
+      t.start()
+    while reportQ and running['report'] < opts['reportJobs']:
+      base = reportQ.pop(0)
+      html = os.path.join(out, base + '.html')
+      cmd = reportCmd(html + '.raw', html, opts)
+      running['report'] += 1
+      t = threading.Thread(target=runJob, args=('report', base, cmd,
+        os.path.join(logDir, base + '.report.log'), done))
+      t.daemon = True
+      t.start()
+
+    # wait for a job to finish
+    kind, base, res = done.get()
+    running[kind] -= 1
+    state[base][kind] = res
+    if res['returncode']:
+      state[base]['state'] = 'failed'
+      failed += 1
+      sys.stderr.write('%s: %s FAILED (exit %d; see logs/%s.%s.log)\n' \
+        % (base, kind, res['returncode'], base, kind))
+    elif kind == 'classify':
+      state[base]['state'] = 'classified'
+      html = os.path.join(out, base + '.html')
+      for ext in rawExts:
+        cache.put(html + ext, state[base]['classifyKey'], ext)
+      reportQ.append(base)
+      sys.stderr.write('%s: classified (%.1fs, %.1fGB peak RSS)\n' \
+        % (base, res['wall'], res['maxRSS'] / 1.0e9))
+    else:
+      state[base]['state'] = 'done'
+      cache.put(os.path.join(out, base + '.html'), state[base]['reportKey'],
+        '.html')
+      sys.stderr.write('%s: done\n' % base)
+    saveState(stateFile, state)
+  return failed
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  opts = {}
+  root = metaProf.popArg(args, '--root', ROOT)
+  out = metaProf.popArg(args, '--out')
+  opts['shards'] = metaProf.popArg(args, '--idx', IDX).split(',')
+  opts['idx'] = opts['shards'][0]
+  opts['tree'] = metaProf.popArg(args, '--tree', opts['idx'] + '.tree')
+  opts['proc'] = int(metaProf.popArg(args, '--proc', 8))
+  cpus = int(metaProf.popArg(args, '--cpus', 0))
+  mem = float(metaProf.popArg(args, '--mem', 0)) * 1e9
+  jobMem = float(metaProf.popArg(args, '--job-mem', 8)) * 1e9
+  opts['reportJobs'] = int(metaProf.popArg(args, '--report-jobs', 2))
+  opts['top'] = int(metaProf.popArg(args, '--top', 20))
+  opts['mm'] = not metaProf.popArg(args, '--no-mm', False, value=False)
+  opts['centrifuge'] = metaProf.popArg(args, '--centrifuge', 'centrifuge')
+  opts['kreport'] = metaProf.popArg(args, '--kreport', 'centrifuge-kreport')
+  opts['python'] = metaProf.popArg(args, '--python', sys.executable)
+  opts['dryRun'] = metaProf.popArg(args, '--dry-run', False, value=False)
+  cacheDir = metaProf.popArg(args, '--cache')
+  statOnly = metaProf.popArg(args, '--stat-only', False, value=False)
+  hashIdx = metaProf.popArg(args, '--hash-idx', False, value=False)
+  opts['subsample'] = float(metaProf.popArg(args, '--subsample', 0))
+  opts['seed'] = int(metaProf.popArg(args, '--seed', 0))
+  opts['collapse'] = metaProf.popArg(args, '--collapse', False, value=False)
+  opts['names'] = metaProf.popArg(args, '--names')
+  if len(args) < 1:
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<fol>  [<lane>]  [options]\n' \
+      + '  <fol>    Folder of sequencing run\n' \
+      + '  <lane>   Lane to analyze (def. Lane1)\n' \
+      + '  Options:\n' \
+      + '    --root <dir>        Folder of sequencing runs\n' \
+      + '                          (def. %s)\n' % ROOT \
+      + '    --out <dir>         Output folder (def. <fol>)\n' \
+      + '    --idx <prefix>      Centrifuge index (def. %s),\n' % IDX \
+      + '                          or comma-separated shards\n' \
+      + '    --tree <file>       Taxonomy tree with nt counts of the\n' \
+      + '                          database (def. <idx>.tree)\n' \
+      + '    --proc <int>        Threads per classification (def. 8)\n' \
+      + '    --cpus <int>        CPU budget (def. all)\n' \
+      + '    --mem <float>       Memory budget, GB (def. all)\n' \
+      + '    --job-mem <float>   Memory per classification, GB, not\n' \
+      + '                          counting the index (def. 8)\n' \
+      + '    --report-jobs <int> Concurrent reports (def. 2)\n' \
+      + '    --no-mm             Do not memory-map the index\n' \
+      + '    --centrifuge <cmd>  Command for centrifuge\n' \
+      + '    --kreport <cmd>     Command for centrifuge-kreport\n' \
+      + '    --subsample <num>   Classify a random subsample of the\n' \
+      + '                          reads: a fraction (<1) or a number\n' \
+      + '                          of reads (or pairs), for a quick\n' \
+      + '                          preliminary report\n' \
+      + '    --seed <int>        Seed of subsampling (def. 0)\n' \
+      + '    --collapse          Classify identical reads (or pairs)\n' \
+      + '                          once, weighting their hits\n' \
+      + '    --names <file>      Names table, for --collapse (e.g.\n' \
+      + '                          centrifuge-inspect --name-table)\n' \
+      + '    --cache <dir>       Folder of cached results, may be shared\n' \
+      + '                          by runs (def. <out>/.cache)\n' \
+      + '    --stat-only         Compare files by size/mtime (not md5)\n' \
+      + '    --hash-idx          Compare the index files by md5 (reads\n' \
+      + '                          the whole index; def. size/mtime)\n' \
+      + '    --dry-run           List samples that would be analyzed\n')
+    sys.exit(-1)
+
+  fol = args[0]
+  lane = 'Lane1'
+  if len(args) > 1:
+    lane = args[1]
+  if out is None:
+    out = fol
+  if not os.path.isdir(out):
+    os.makedirs(out)
+  if not os.path.exists(opts['tree']):
+    sys.stderr.write('Error! Cannot find taxonomy tree %s ' \
+      % opts['tree'] + '(produced by buildDB.py or indexNTdb2.sh)\n')
+    sys.exit(-1)
+  if opts['collapse'] and not opts['names']:
+    sys.stderr.write('Error! --collapse requires a names table (--names)\n')
+    sys.exit(-1)
+  readVersions(opts)
+
+  # determine number of concurrent classifications
+  if not cpus:
+    import multiprocessing
+    cpus = multiprocessing.cpu_count()
+  if not mem:
+    mem = totalMem()
+  # (shards are mapped one at a time)
+  idxMem = max(sum(os.path.getsize(x) for x in glob.glob(idx + '.*.cf'))
+    for idx in opts['shards'])
+  slots = classifySlots(cpus, mem, opts['proc'], jobMem, idxMem, opts['mm'])
+  sys.stderr.write('Concurrent classifications: %d ' % slots \
+    + '(%d CPUs, %.1fGB memory, %.1fGB index%s)\n' % (cpus, mem / 1e9,
+    idxMem / 1e9, ', shared' if opts['mm'] else ''))
+
+  # load saved state, run samples
+  stateFile = os.path.join(out, '.centrifugeSched.json')
+  state = {}
+  if os.path.exists(stateFile):
+    f = open(stateFile)
+    state = json.load(f)
+    f.close()
+  samples = findSamples(root, fol, lane)
+  sys.stderr.write('Samples found: %d\n' % len(samples))
+  if cacheDir is None:
+    cacheDir = os.path.join(out, '.cache')
+  cache = ResultCache(cacheDir, statOnly, hashIdx)
+  failed = schedule(samples, state, stateFile, out, opts, slots, cache)
+  if failed:
+    sys.stderr.write('Error! %d sample(s) failed\n' % failed)
+    sys.exit(-1)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,219 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Local stand-in for the Centrifuge binaries, for testing
+#   the pipeline without a real index:
+#     build     like centrifuge-build: stores the accession ->
+#                 taxID map (for seqs in the fasta), the taxonomy
+#                 tree and names as <prefix>.1.cf, .2.cf, .3.cf
+#     inspect   like centrifuge-inspect --taxonomy-tree/--name-table
+#     classify  like centrifuge: "classifies" reads by the accession
+#                 in their headers (e.g. reads from simReads.py);
+#                 other reads are unclassified. With -k, reads hit
+#                 (with equal scores) up to k seqs in the index of
+#                 the taxon of their accession (from --stub-acc),
+#                 in order of accession
+#     kreport   like centrifuge-kreport (via centKreport.py)
+
+import sys
+import time
+import metaProf
+import centKreport
+import taxTree
+from metaIO import openRead, openWrite
+
+def build(args):
+  '''
+  Build a stub index.
+  '''
+  metaProf.popArg(args, '-p')
+  conv = metaProf.popArg(args, '--conversion-table')
+  tree = metaProf.popArg(args, '--taxonomy-tree')
+  names = metaProf.popArg(args, '--name-table')
+  if len(args) < 2 or not (conv and tree and names):
+    sys.stderr.write('Usage: python %s build  ' % sys.argv[0] \
+      + '--conversion-table <file>  --taxonomy-tree <file> \\\n' \
+      + '    --name-table <file>  <fasta>[,<fasta>]*  <prefix>\n')
+    sys.exit(-1)
+
+  # load accessions of sequences in fasta file(s)
+  acc = {}
+  for filename in args[0].split(','):
+    f = openRead(filename)
+    for line in f:
+      if line[0] == '>':
+        acc[line[1:].split()[0]] = '0'
+    if f != sys.stdin:
+      f.close()
+
+  # save taxIDs of accessions
+  f = openRead(conv)
+  fOut = openWrite(args[1] + '.1.cf')
+  for line in f:
+    spl = line.rstrip().split('\t')
+    if len(spl) > 1 and spl[0] in acc:
+      fOut.write(spl[0] + '\t' + spl[1] + '\n')
+  f.close()
+  fOut.close()
+
+  # save tree and names
+  f = openRead(tree)
+  fOut = openWrite(args[1] + '.2.cf')
+  for line in f:
+    spl = line.split('|')
+    if len(spl) > 2:
+      fOut.write('\t|\t'.join(x.strip() for x in spl[:3]) + '\n')
+  f.close()
+  fOut.close()
+  f = openRead(names)
+  fOut = openWrite(args[1] + '.3.cf')
+  for line in f:
+    spl = line.rstrip('\n').split('\t')
+    if len(spl) > 6 and spl[6] == 'scientific name':
+      fOut.write(spl[0] + '\t' + spl[2] + '\n')
+  f.close()
+  fOut.close()
+  sys.stderr.write('Stub index %s: %d sequences\n' % (args[1], len(acc)))
+
+def inspect(args):
+  '''
+  Print taxonomy tree or names of a stub index.
+  '''
+  if len(args) < 2 or args[0] not in ['--taxonomy-tree', '--name-table']:
+    sys.stderr.write('Usage: python %s inspect  ' % sys.argv[0] \
+      + '(--taxonomy-tree | --name-table)  <prefix>\n')
+    sys.exit(-1)
+  f = openRead(args[1] + ('.2.cf' if args[0] == '--taxonomy-tree' \
+    else '.3.cf'))
+  for line in f:
+    sys.stdout.write(line)
+  f.close()
+
+def fastqHeads(filenames):
+  '''
+  Yield header and sequence length of each read.
+  '''
+  for filename in filenames.split(','):
+    f = openRead(filename)
+    i = 0
+    for line in f:
+      if i == 0:
+        head = line
+      elif i == 1:
+        yield head, len(line.rstrip())
+      i = (i + 1) % 4
+    if f != sys.stdin:
+      f.close()
+
+def classify(args):
+  '''
+  Classify reads by the accessions in their headers.
+  '''
+  idx = metaProf.popArg(args, '-x')
+  r1 = metaProf.popArg(args, '-1')
+  r2 = metaProf.popArg(args, '-2')
+  unp = metaProf.popArg(args, '-U')
+  out = metaProf.popArg(args, '-S', '-')
+  metaProf.popArg(args, '-p')
+  metaProf.popArg(args, '--report-file')
+  metaProf.popArg(args, '--mm', value=False)
+  metaProf.popArg(args, '--no-abundance', value=False)
+  metaProf.popArg(args, '--reorder', value=False)
+  k = metaProf.popArg(args, '-k')
+  convFile = metaProf.popArg(args, '--stub-acc')
+  delay = float(metaProf.popArg(args, '--stub-delay', 0))
+  if not idx or not (r1 or unp):
+    sys.stderr.write('Usage: python %s classify  ' % sys.argv[0] \
+      + '-x <prefix>  (-1 <R1> -2 <R2> | -U <reads>)  [-S <out>] \\\n' \
+      + '    [-k <int>  [--stub-acc <acc2taxid>]]\n')
+    sys.exit(-1)
+
+  acc = {}
+  f = openRead(idx + '.1.cf')
+  for line in f:
+    spl = line.rstrip().split('\t')
+    acc[spl[0]] = spl[1]
+  f.close()
+  conv = acc
+  if convFile is not None:
+    conv = {}
+    f = openRead(convFile)
+    for line in f:
+      spl = line.rstrip().split('\t')
+      if len(spl) > 1:
+        conv[spl[0]] = spl[1]
+    f.close()
+  if k is not None:
+    k = int(k)
+  byTax = {}
+  for seq in sorted(acc):
+    byTax.setdefault(acc[seq], []).append(seq)
+
+  fOut = openWrite(out)
+  fOut.write('readID\tseqID\ttaxID\tscore\t2ndBestScore\thitLength\t' \
+    + 'queryLength\tnumMatches\n')
+  count = 0
+  for head, length in fastqHeads(r1 or unp):
+    spl = head[1:].split()
+    read = spl[0]
+    if read[-2:] in ['/1', '/2']:
+      read = read[:-2]
+    seq = ''
+    if len(spl) > 1:
+      seq = spl[1].rsplit('_', 1)[0]
+    if r2:
+      length *= 2
+    if k is not None:
+      hits = byTax.get(conv.get(seq), [])[:k]
+      for hit in hits:
+        fOut.write('%s\t%s\t%s\t%d\t0\t%d\t%d\t%d\n' % (read, hit,
+          acc[hit], (length - 15) ** 2, length, length, len(hits)))
+      if not hits:
+        fOut.write('%s\tunclassified\t0\t0\t0\t0\t%d\t1\n' % (read, length))
+    elif seq in acc:
+      fOut.write('%s\t%s\t%s\t%d\t0\t%d\t%d\t1\n' % (read, seq, acc[seq],
+        (length - 15) ** 2, length, length))
+    else:
+      fOut.write('%s\tunclassified\t0\t0\t0\t0\t%d\t1\n' % (read, length))
+    count += 1
+    if delay and count % 1000 == 0:
+      time.sleep(delay)
+  if fOut != sys.stdout:
+    fOut.close()
+  sys.stderr.write('Reads classified: %d\n' % count)
+
+def kreport(args):
+  '''
+  Produce a kraken-style report with a stub index.
+  '''
+  idx = metaProf.popArg(args, '-x')
+  noLCA = metaProf.popArg(args, '--no-lca', False, value=False)
+  if not idx:
+    sys.stderr.write('Usage: python %s kreport  ' % sys.argv[0] \
+      + '-x <prefix>  [--no-lca]  [<in>]\n')
+    sys.exit(-1)
+  tax = centKreport.loadTaxonomy(idx + '.2.cf', idx + '.3.cf')
+  agg = centKreport.Aggregate()
+  f = openRead(args[0] if args else '-')
+  if noLCA:
+    centKreport.parseReads(f, agg)
+  else:
+    centKreport.parseReadsLCA(f, agg, taxTree.loadLCA(idx + '.2.cf', tax))
+  if f != sys.stdin:
+    f.close()
+  centKreport.printReport(sys.stdout, agg, tax)
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  cmds = {'build': build, 'inspect': inspect, 'classify': classify,
+    'kreport': kreport}
+  if not args or args[0] not in cmds:
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '(build | inspect | classify | kreport)  [<args>]\n')
+    sys.exit(-1)
+  cmds[args[0]](args[1:])
+
+if __name__ == '__main__':
+  main()
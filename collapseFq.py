@@ -0,0 +1,173 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Collapse identical reads (or read pairs) of fastq files
+#   (e.g. the comma-joined lanes of a sample) to unique reads,
+#   before classification. Each unique read keeps the header
+#   and qualities of its first copy; its multiplicity is
+#   written to a weights file (readID, count; for counts > 1),
+#   for centKreport.py --weights, so that the report matches
+#   that of the uncollapsed reads. Up to --mem unique reads
+#   are held in memory; beyond that, they are spilled to
+#   temporary files by hash, and merged one file at a time.
+
+import sys
+import os
+import shutil
+import hashlib
+import tempfile
+import binascii
+import metaProf
+from metaIO import openWrite
+from subsampleFq import readName, pairedRecords
+
+class Collapser:
+  '''
+  Collapser: unique reads (by md5 of the sequences of
+    a read or pair), with the index of their first copy
+    and their counts. Up to limit are kept in memory;
+    beyond that, they are spilled to parts files (by
+    the first byte of the digest).
+  '''
+  def __init__(self, paired, limit=1000000, parts=64, tmpDir=None):
+    self.paired = paired
+    self.limit = limit
+    self.parts = parts
+    self.tmpDir = tmpDir
+    self.mem = {}    # digest -> [index, count, rec1, rec2]
+    self.dir = None
+    self.files = None
+    self.total = 0
+    self.spills = 0
+
+  def add(self, rec1, rec2):
+    '''
+    Add a read (pair).
+    '''
+    seq = rec1.split('\n', 2)[1]
+    if rec2 is not None:
+      seq += '\t' + rec2.split('\n', 2)[1]
+    d = hashlib.md5(seq.encode('ascii')).digest()
+    entry = self.mem.get(d)
+    if entry is None:
+      self.mem[d] = [self.total, 1, rec1, rec2]
+      if len(self.mem) >= self.limit:
+        self.spill()
+    else:
+      entry[1] += 1
+    self.total += 1
+
+  def spill(self):
+    '''
+    Move the in-memory reads to the parts files.
+    '''
+    if self.files is None:
+      self.dir = tempfile.mkdtemp(prefix='collapseFq.', dir=self.tmpDir)
+      self.files = [open(os.path.join(self.dir, '%d' % i), 'w')
+        for i in range(self.parts)]
+    for d in self.mem:
+      i, count, rec1, rec2 = self.mem[d]
+      f = self.files[bytearray(d)[0] % self.parts]
+      f.write('%d\t%d\t%s\n' % (i, count,
+        binascii.hexlify(d).decode('ascii')) + rec1)
+      if rec2 is not None:
+        f.write(rec2)
+    self.mem = {}
+    self.spills += 1
+
+  def loadPart(self, f):
+    '''
+    Load the reads of a parts file, merging copies
+      (keeping the first).
+    '''
+    lines = iter(f)
+    for line in lines:
+      i, count, d = line.rstrip('\n').split('\t')
+      rec1 = ''.join(next(lines) for j in range(4))
+      rec2 = None
+      if self.paired:
+        rec2 = ''.join(next(lines) for j in range(4))
+      entry = self.mem.get(d)
+      if entry is None:
+        self.mem[d] = [int(i), int(count), rec1, rec2]
+      else:
+        entry[1] += int(count)
+        if int(i) < entry[0]:
+          entry[0], entry[2], entry[3] = int(i), rec1, rec2
+
+  def unique(self):
+    '''
+    Yield the unique reads [index, count, rec1, rec2],
+      in the order of their first copies (within each
+      parts file, if spilled).
+    '''
+    if self.files is None:
+      for entry in sorted(self.mem.values(), key=lambda x: x[0]):
+        yield entry
+      self.mem = {}
+      return
+    self.spill()
+    for f in self.files:
+      f.close()
+    for i in range(self.parts):
+      filename = os.path.join(self.dir, '%d' % i)
+      f = open(filename)
+      self.loadPart(f)
+      f.close()
+      os.remove(filename)
+      for entry in sorted(self.mem.values(), key=lambda x: x[0]):
+        yield entry
+      self.mem = {}
+    shutil.rmtree(self.dir)
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  limit = int(metaProf.popArg(args, '--mem', 1000000))
+  tmpDir = metaProf.popArg(args, '--tmp')
+  if len(args) < 4 or (args[1] != 'None' and len(args) < 5):
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<R1>  <R2>  <out1>  [<out2>]  <weights> \\\n' \
+      + '    [--mem <int>]  [--tmp <dir>]\n' \
+      + '  <R1>       Input fastq file(s) of R1 reads (comma-separated)\n' \
+      + '  <R2>       Input fastq file(s) of R2 reads; use "None" for SE\n' \
+      + '  <out1>     Output fastq file of unique R1 reads\n' \
+      + '  <out2>     Output fastq file of unique R2 reads (PE only)\n' \
+      + '  <weights>  Output file of read counts (readID, count)\n' \
+      + '  --mem      Unique reads held in memory (def. 1000000)\n' \
+      + '  --tmp      Folder for temporary files\n')
+    sys.exit(-1)
+
+  files1 = args[0].split(',')
+  files2 = args[1].split(',') if args[1] != 'None' else []
+  if files2 and len(files2) != len(files1):
+    sys.stderr.write('Error! Different numbers of R1 and R2 files\n')
+    sys.exit(-1)
+  fOut1 = openWrite(args[2])
+  fOut2 = openWrite(args[3]) if files2 else None
+  fWeights = openWrite(args[4] if files2 else args[3])
+
+  # collapse reads
+  coll = Collapser(bool(files2), limit, tmpDir=tmpDir)
+  for rec1, rec2 in pairedRecords(files1, files2):
+    coll.add(rec1, rec2)
+  uniq = 0
+  for i, count, rec1, rec2 in coll.unique():
+    fOut1.write(rec1)
+    if rec2 is not None:
+      fOut2.write(rec2)
+    if count > 1:
+      fWeights.write('%s\t%d\n' % (readName(rec1[1:]), count))
+    uniq += 1
+  for f in [fOut1, fOut2, fWeights]:
+    if f is not None and f != sys.stdout:
+      f.close()
+  sys.stderr.write('Reads in %d file(s): %d\n' % (len(files1), coll.total) \
+    + '  Unique: %d (%.4f%%)\n' % (uniq,
+    100.0 * uniq / coll.total if coll.total else 0.0))
+  if coll.spills:
+    sys.stderr.write('  Spilled to disk: %d time(s)\n' % coll.spills)
+
+if __name__ == '__main__':
+  main()
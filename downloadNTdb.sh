@@ -6,19 +6,20 @@
 #SBATCH --mem 10000
 #SBATCH -t 2-00:00
 
-# download nt database, check md5
-rm -f nt.gz nt.gz.md5
+# download nt database (md5 checked by filterNT2.py while filtering;
+#   only the format of nt.gz.md5 is checked here, to fail fast)
+rm -f nt.gz nt.gz.md5 nt.base.tree nt.base.tree.inputs
 date +'%F %r' > DATE  # record date/time of download
 wget -q ftp://ftp.ncbi.nih.gov/blast/db/FASTA/nt.gz
 wget -q ftp://ftp.ncbi.nih.gov/blast/db/FASTA/nt.gz.md5
-md5sum -c nt.gz.md5
+grep -Eq "^[0-9a-f]{32} +nt\.gz$" nt.gz.md5
 
 # filter out sequences that are pure Ns or shorter than 30bp;
 #   mask subsequences that match adapters
 if [ -f adapters2.bed ]; then
   mask="adapters2.bed"
 fi
-python filterNT2.py nt.gz nt.fa 30 $mask
+python filterNT2.py nt.gz nt.fa 30 $mask --md5
 
 # download taxonomy files, check md5
 rm -f taxdump.tar.gz taxdump.tar.gz.md5 nodes.dmp names.dmp merged.dmp delnodes.dmp
@@ -28,31 +29,32 @@ md5sum -c taxdump.tar.gz.md5
 tar xzf taxdump.tar.gz  # creates many files, including 'nodes.dmp' and 'names.dmp' (required by centrifuge-build)
                         #   and 'merged.dmp' and 'delnodes.dmp' (required by updateTaxID2.py)
 
-# download accession-to-taxID files (4), check md5s
+# download accession-to-taxID files (4) (md5s checked by updateTaxID2.py
+#   while reading; only the formats of the .md5 files are checked here)
 rm -f nucl_gb.accession2taxid.gz nucl_gb.accession2taxid.gz.md5
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_gb.accession2taxid.gz
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_gb.accession2taxid.gz.md5
-md5sum -c nucl_gb.accession2taxid.gz.md5
+grep -Eq "^[0-9a-f]{32} +nucl_gb\.accession2taxid\.gz$" nucl_gb.accession2taxid.gz.md5
 
 rm -f nucl_wgs.accession2taxid.gz nucl_wgs.accession2taxid.gz.md5
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_wgs.accession2taxid.gz
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_wgs.accession2taxid.gz.md5
-md5sum -c nucl_wgs.accession2taxid.gz.md5
+grep -Eq "^[0-9a-f]{32} +nucl_wgs\.accession2taxid\.gz$" nucl_wgs.accession2taxid.gz.md5
 
 rm -f nucl_est.accession2taxid.gz nucl_est.accession2taxid.gz.md5
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_est.accession2taxid.gz
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_est.accession2taxid.gz.md5
-md5sum -c nucl_est.accession2taxid.gz.md5
+grep -Eq "^[0-9a-f]{32} +nucl_est\.accession2taxid\.gz$" nucl_est.accession2taxid.gz.md5
 
 rm -f nucl_gss.accession2taxid.gz nucl_gss.accession2taxid.gz.md5
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_gss.accession2taxid.gz
 wget -q ftp://ftp.ncbi.nih.gov/pub/taxonomy/accession2taxid/nucl_gss.accession2taxid.gz.md5
-md5sum -c nucl_gss.accession2taxid.gz.md5
+grep -Eq "^[0-9a-f]{32} +nucl_gss\.accession2taxid\.gz$" nucl_gss.accession2taxid.gz.md5
 
 # update merged and deleted taxIDs from accession2taxid files, and then combine them
 python updateTaxID2.py merged.dmp delnodes.dmp acc2taxid.txt \
   nucl_gb.accession2taxid.gz nucl_est.accession2taxid.gz \
-  nucl_gss.accession2taxid.gz nucl_wgs.accession2taxid.gz
+  nucl_gss.accession2taxid.gz nucl_wgs.accession2taxid.gz --md5
 
 # append adapters to db
 #if [ -f adapters2.fa ]; then
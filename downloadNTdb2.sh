@@ -16,19 +16,20 @@ module load bedtools2
 #   create bed regions of matches; mask those regions:
 #   $ bash downloadNTdb2.sh  <fasta>
 
-# download nt database, check md5
-rm -f nt.gz nt.gz.md5
+# download nt database (md5 checked by filterNT2.py while filtering;
+#   only the format of nt.gz.md5 is checked here, to fail fast)
+rm -f nt.gz nt.gz.md5 nt.base.tree nt.base.tree.inputs
 date +'%F %r' > DATE  # record date/time of download
 wget -q ftp://ftp.ncbi.nih.gov/blast/db/FASTA/nt.gz
 wget -q ftp://ftp.ncbi.nih.gov/blast/db/FASTA/nt.gz.md5
-md5sum -c nt.gz.md5
+grep -Eq "^[0-9a-f]{32} +nt\.gz$" nt.gz.md5
 
 # filter out sequences that are pure Ns or shorter than 30bp;
 #   mask subsequences that match adapters (adapters2.bed)
 if [[ $# -eq 0 && -f adapters2.bed ]]; then
   mask="adapters2.bed"
 fi
-python filterNT2.py nt.gz nt.fa 30 $mask
+python filterNT2.py nt.gz nt.fa 30 $mask --md5
 
 # search for matching adapter sequences
 if [[ $# -gt 0 && -f $1 ]]; then
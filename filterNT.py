@@ -10,41 +10,7 @@
 #       given list
 
 import sys
-import gzip
-
-def openRead(filename):
-  '''
-  Open filename for reading. '-' indicates stdin.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdin
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'rb')
-    else:
-      f = open(filename, 'rU')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
-    sys.exit(-1)
-  return f
-
-def openWrite(filename):
-  '''
-  Open filename for writing. '-' indicates stdout.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdout
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'wb')
-    else:
-      f = open(filename, 'w')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
-    sys.exit(-1)
-  return f
+from metaIO import openRead, openWrite
 
 def parseFasta(fIn, fOut, minLen, headers):
   '''
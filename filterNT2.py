@@ -9,43 +9,32 @@
 #   - mask sequences in a given BED file
 #   - remove sequences whose headers are in a
 #       given list
+#   - with --md5, verify the input against <input>.md5
+#       while reading it (all outputs are removed if it fails)
+#   - with --dedup, remove sequences identical to one already
+#       written (or, with --dedup-acc, identical and of the same
+#       taxID), listing dropped -> kept accessions
+#   - with --cap, limit the sequences/bases kept per species
+#       (based on counts of a .tree file produced by ntSumm.py),
+#       writing the pruned acc2taxid and the updated tree
+#   - with --shards, split the output into files of similar
+#       size (e.g. nt.fa -> nt.0.fa, nt.1.fa, ...), to build
+#       smaller indexes (merge results with mergeCent.py);
+#       with --shard-tree, taxa at --shard-rank (e.g. species
+#       or superkingdom) are kept within one shard
+#   - sequences of records over --record-mem (def. 16MB) are
+#       spilled to a temporary file while parsed, so memory
+#       stays bounded for chromosome-scale records
 
 import sys
-import gzip
-
-def openRead(filename):
-  '''
-  Open filename for reading. '-' indicates stdin.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdin
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'rb')
-    else:
-      f = open(filename, 'rU')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
-    sys.exit(-1)
-  return f
-
-def openWrite(filename):
-  '''
-  Open filename for writing. '-' indicates stdout.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdout
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'wb')
-    else:
-      f = open(filename, 'w')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
-    sys.exit(-1)
-  return f
+import os
+import array
+import hashlib
+import sqlite3
+import tempfile
+import metaProf
+import metaIO
+from metaIO import openRead, openWrite
 
 def loadBed(filename, d):
   '''Load BED regions to dict.'''
@@ -63,13 +52,393 @@ def loadBed(filename, d):
   if f != sys.stdin:
     f.close()
 
-def parseFasta(fIn, fOut, minLen, mask, headers):
+class Record:
+  '''
+  Record: the fasta record being parsed (header, and
+    sequence lines). Up to limit bytes of sequence are
+    held in memory; beyond that, they are spilled to a
+    temporary file (reused for each record), so memory
+    stays bounded for chromosome-scale records. With
+    digest, the md5 of the sequence is computed.
+    (parseFasta() appends to lines directly, calling
+    spill() every limit bytes.)
+  '''
+  def __init__(self, limit=1 << 24, tmpDir=None, digest=False):
+    self.limit = limit
+    self.tmpDir = tmpDir
+    self.useDigest = digest
+    self.head = ''     # header line
+    self.lines = []    # sequence lines in memory
+    self.tmp = None    # temporary file
+    self.spilled = False
+    self.spills = 0    # records spilled
+    self.md5 = None
+
+  def start(self, line):
+    '''
+    Start a new record (header line).
+    '''
+    self.head = line
+    del self.lines[:]
+    if self.spilled:
+      self.tmp.seek(0)
+      self.tmp.truncate()
+      self.spilled = False
+    if self.useDigest:
+      self.md5 = hashlib.md5()
+
+  def spill(self):
+    '''
+    Move the lines in memory to the temporary file.
+    '''
+    if self.tmp is None:
+      self.tmp = tempfile.TemporaryFile('w+', dir=self.tmpDir)
+    if not self.spilled:
+      self.spilled = True
+      self.spills += 1
+    seq = ''.join(self.lines)
+    self.tmp.write(seq)
+    if self.md5 is not None:
+      self.md5.update(seq.replace('\n', '').encode('ascii'))
+    del self.lines[:]
+
+  def digest(self):
+    '''
+    md5 digest of the sequence.
+    '''
+    m = self.md5.copy()
+    m.update(''.join(self.lines).replace('\n', '').encode('ascii'))
+    return m.digest()
+
+  def write(self, f):
+    '''
+    Write the record (header first, on its own if
+      the sequence was spilled).
+    '''
+    if not self.spilled:
+      f.write(self.head + ''.join(self.lines))
+      return
+    f.write(self.head)
+    self.spill()
+    self.tmp.seek(0)
+    for chunk in iter(lambda: self.tmp.read(1 << 20), ''):
+      f.write(chunk)
+
+  def close(self):
+    '''
+    Remove the temporary file.
+    '''
+    if self.tmp is not None:
+      self.tmp.close()
+
+class Dedup:
+  '''
+  Dedup: digests of the sequences written (md5, plus
+    taxID with acc2tax), mapped to the first accession
+    with each. Up to limit digests are kept in memory;
+    beyond that, they are spilled to an SQLite file.
+  '''
+  def __init__(self, fMap, acc2tax=None, limit=5000000, tmpDir=None):
+    self.fMap = fMap
+    self.acc2tax = acc2tax
+    self.limit = limit
+    self.tmpDir = tmpDir
+    self.mem = {}
+    self.db = None
+    self.dbFile = None
+    self.spilled = 0
+    self.dups = 0
+
+  def spill(self):
+    '''
+    Move the in-memory digests to the SQLite file.
+    '''
+    if self.db is None:
+      fd, self.dbFile = tempfile.mkstemp(suffix='.sqlite', dir=self.tmpDir)
+      os.close(fd)
+      self.db = sqlite3.connect(self.dbFile)
+      self.db.execute('PRAGMA journal_mode = OFF')
+      self.db.execute('PRAGMA synchronous = OFF')
+      self.db.execute('CREATE TABLE digest (d BLOB PRIMARY KEY, ' \
+        + 'acc TEXT) WITHOUT ROWID')
+    self.db.executemany('INSERT OR IGNORE INTO digest VALUES (?, ?)',
+      ((sqlite3.Binary(d), self.mem[d]) for d in self.mem))
+    self.db.commit()
+    self.spilled += len(self.mem)
+    self.mem = {}
+
+  def key(self, head, d):
+    '''
+    Key of a sequence (md5 digest d, plus taxID
+      with acc2tax).
+    '''
+    if self.acc2tax is not None:
+      d += str(self.acc2tax.get(head, '')).encode('ascii')
+    return d
+
+  def check(self, head, key):
+    '''
+    Return True if a sequence duplicates one already
+      written (and record dropped -> kept accessions).
+    '''
+    kept = self.mem.get(key)
+    if kept is None and self.db is not None:
+      row = self.db.execute('SELECT acc FROM digest WHERE d = ?',
+        (sqlite3.Binary(key),)).fetchone()
+      if row is not None:
+        kept = row[0]
+    if kept is not None:
+      self.fMap.write('%s\t%s\n' % (head, kept))
+      self.dups += 1
+      return True
+    return False
+
+  def add(self, head, key):
+    '''
+    Record a sequence as written.
+    '''
+    self.mem[key] = head
+    if len(self.mem) >= self.limit:
+      self.spill()
+
+  def close(self):
+    '''
+    Close the map, remove the SQLite file.
+    '''
+    if self.fMap != sys.stdout:
+      self.fMap.close()
+    if self.db is not None:
+      self.db.close()
+      os.remove(self.dbFile)
+
+def groupTaxa(tree, rank):
+  '''
+  Group the taxa of a tree (with nt counts) by their
+    ancestors at the given rank (or by themselves, if
+    not below that rank). Return the taxa, their groups,
+    and their own (not clade) counts and lengths.
+  '''
+  from taxTree import np
+  if rank not in tree.rankNames:
+    sys.stderr.write('Error! Unknown rank %s in tree\n' % rank)
+    sys.exit(-1)
+  taxa = tree.taxa()
+  up = tree.up()
+  kids = taxa[up[taxa] >= 0]
+  count = tree.count.astype(np.float64)
+  length = tree.length.astype(np.float64)
+  np.subtract.at(count, up[kids], tree.count[kids])
+  np.subtract.at(length, up[kids], tree.length[kids])
+  group = tree.nearest(taxa, tree.rank == tree.rankNames.index(rank),
+    inclusive=True)
+  group = np.where(group >= 0, group, taxa)
+  return taxa, group, count[taxa], length[taxa]
+
+class Caps:
+  '''
+  Caps: limits on sequences (maxSeqs) and bases (maxBp)
+    kept per taxon at the given rank (sequences of taxa
+    not below that rank are grouped by their own taxa).
+    The first sequence of a group is always kept; others
+    are kept (while the group is under the caps) if a hash
+    of the accession falls below the fraction of the group
+    (from the counts/lengths of the tree) that fits.
+    Sequences without a (known) taxon are not capped.
+  '''
+  def __init__(self, tree, acc2tax, maxSeqs, maxBp, rank, fAcc):
+    from taxTree import np
+    self.tree = tree
+    self.acc2tax = acc2tax
+    self.maxSeqs = maxSeqs
+    self.maxBp = maxBp
+    self.fAcc = fAcc
+    self.kept = {}   # seqs kept per group
+    self.keptBp = {} # bases kept per group
+    self.taxa = array.array('l')     # taxa of seqs kept
+    self.lengths = array.array('l')  # lengths of seqs kept
+    self.capped = 0
+
+    # group taxa, determine fraction of each group to keep
+    taxa, group, count, length = groupTaxa(tree, rank)
+    self.group = np.zeros(tree.order.size, np.int64)
+    self.group[taxa] = group
+    seqs = np.zeros(tree.order.size)
+    bases = np.zeros(tree.order.size)
+    np.add.at(seqs, group, count)
+    np.add.at(bases, group, length)
+    frac = np.ones(tree.order.size)
+    if maxSeqs is not None:
+      frac = np.minimum(frac, maxSeqs / np.maximum(seqs, 1))
+    if maxBp is not None:
+      frac = np.minimum(frac, maxBp / np.maximum(bases, 1))
+    self.frac = frac
+
+  def check(self, head, length):
+    '''
+    Return True if the sequence exceeds its group's
+      caps (else record it as kept).
+    '''
+    taxon = int(self.acc2tax.get(head, 0))
+    if not self.tree.has(taxon):
+      taxon = 0
+    g = int(self.group[taxon])
+    seqs = self.kept.get(g, 0)
+    bp = self.keptBp.get(g, 0)
+    if seqs and taxon:
+      u = int(hashlib.md5(head.encode('ascii')).hexdigest()[:13], 16) \
+        / float(16 ** 13)
+      if u >= self.frac[g] \
+          or (self.maxSeqs is not None and seqs >= self.maxSeqs) \
+          or (self.maxBp is not None and bp + length > self.maxBp):
+        self.capped += 1
+        return True
+    self.kept[g] = seqs + 1
+    self.keptBp[g] = bp + length
+    self.taxa.append(taxon)
+    self.lengths.append(length)
+    if head in self.acc2tax:
+      self.fAcc.write('%s\t%s\n' % (head, self.acc2tax[head]))
+    return False
+
+  def finish(self, fTree):
+    '''
+    Write the tree with counts/lengths of seqs kept.
+    '''
+    import ntSumm
+    if self.fAcc != sys.stdout:
+      self.fAcc.close()
+    ntSumm.saveCounts(self.taxa, self.lengths, self.tree)
+    ntSumm.printOutput(fTree, self.tree)
+    if fTree != sys.stdout:
+      fTree.close()
+
+def shardName(filename, i):
+  '''
+  Name of a shard of an output file (e.g. nt.fa.gz
+    -> nt.0.fa.gz).
+  '''
+  d, base = os.path.split(filename)
+  spl = base.split('.', 1)
+  return os.path.join(d, '.'.join([spl[0], '%d' % i] + spl[1:]))
+
+class Shards:
+  '''
+  Shards: output split into files (for separate indexes)
+    of similar total size. Each sequence goes to the shard
+    with the fewest bytes written; with a tree (with nt
+    counts), taxa are grouped at the given rank, and each
+    group goes to one shard, assigned up front (largest
+    groups first, by the lengths of the tree).
+  '''
+  def __init__(self, fOuts, tree=None, acc2tax=None, rank=None):
+    self.fOuts = fOuts
+    self.size = [0] * len(fOuts)
+    self.seqs = [0] * len(fOuts)
+    self.cur = 0
+    self.tree = tree
+    self.acc2tax = acc2tax
+    if tree is None:
+      return
+
+    # assign groups to shards
+    from taxTree import np
+    taxa, group, count, length = groupTaxa(tree, rank)
+    self.group = np.zeros(tree.order.size, np.int64)
+    self.group[taxa] = group
+    bases = np.zeros(tree.order.size)
+    np.add.at(bases, group, length)
+    self.shard = {}
+    load = [0.0] * len(fOuts)
+    for g in np.argsort(-bases, kind='stable'):
+      if not bases[g]:
+        break
+      i = load.index(min(load))
+      self.shard[int(g)] = i
+      load[i] += bases[g]
+
+  def write(self, data):
+    '''
+    Write (part of) a read. A read starts with its
+      header, and goes to the shard chosen then.
+    '''
+    if data[:1] == '>':
+      self.cur = self.choose(data)
+      self.seqs[self.cur] += 1
+    self.fOuts[self.cur].write(data)
+    self.size[self.cur] += len(data)
+
+  def choose(self, read):
+    '''
+    Choose the shard of a read (by its header).
+    '''
+    i = -1
+    if self.tree is not None:
+      head = read[1:read.find('\n')].split(' ')[0]
+      taxon = int(self.acc2tax.get(head, 0))
+      if not self.tree.has(taxon):
+        taxon = 0
+      g = int(self.group[taxon])
+      i = self.shard.get(g, -1)
+    if i < 0:
+      i = self.size.index(min(self.size))
+      if self.tree is not None:
+        self.shard[g] = i
+    return i
+
+  def close(self):
+    '''
+    Close the shard files.
+    '''
+    for f in self.fOuts:
+      f.close()
+
+def loadAcc(filename):
+  '''
+  Load accession -> taxID (str) info.
+  '''
+  f = openRead(filename)
+  d = {}
+  for line in f:
+    spl = line.rstrip().split('\t')
+    if len(spl) < 2:
+      sys.stderr.write('Error! Improperly formatted acc2taxid file\n')
+      sys.exit(-1)
+    d[spl[0]] = spl[1]
+  if f != sys.stdin:
+    f.close()
+  return d
+
+def dropRecord(head, length, rec, dedup, caps):
+  '''
+  Return True if a record is a duplicate or over its
+    caps. Otherwise, it is recorded as kept by both
+    (only once it passes both, so that the dedup map
+    and the caps outputs agree with the fasta).
+  '''
+  key = None
+  if dedup is not None:
+    key = dedup.key(head, rec.digest())
+    if dedup.check(head, key):
+      return True
+  if caps is not None and caps.check(head, length):
+    return True
+  if dedup is not None:
+    dedup.add(head, key)
+  return False
+
+def parseFasta(fIn, fOut, minLen, mask, headers, dedup=None, caps=None,
+    prog=None, rec=None):
   '''
   Parse fasta file, write output on the fly.
   '''
+  if prog is None:
+    prog = metaProf.NullProgress()
+  if rec is None:
+    rec = Record(digest=dedup is not None)
+  lines = rec.lines  # sequence lines of record (in memory)
+  spillAt = 0  # length at which to spill lines
   count = short = pureNs = xReads = masked = maskedBP = total = 0
   head = ''    # header (1st space-delim token)
-  read = ''    # full read (header + sequence)
   nseq = True  # sequence is pure Ns
   length = 0   # length of sequence
   inter = []   # intervals to mask
@@ -79,7 +448,7 @@ def parseFasta(fIn, fOut, minLen, mask, headers):
     if line[0] == '>':
 
       # process previous read
-      if read:
+      if rec.head:
         count += 1
         if length < minLen:
           short += 1
@@ -87,12 +456,17 @@ def parseFasta(fIn, fOut, minLen, mask, headers):
           pureNs += 1
         elif head in headers:
           xReads += 1
+        elif (dedup is not None or caps is not None) \
+            and dropRecord(head, length, rec, dedup, caps):
+          pass
         else:
-          fOut.write(read)
+          rec.write(fOut)
           total += 1
 
       # start new read
-      read = line
+      prog.records += 1
+      rec.start(line)
+      spillAt = rec.limit
       head = line.rstrip().split(' ')[0][1:]
       inter = []
       if head in mask:
@@ -104,7 +478,7 @@ def parseFasta(fIn, fOut, minLen, mask, headers):
       length = 0
       nseq = True
 
-    elif read:
+    elif rec.head:
       # mask sequence
       while inter and length <= inter[0] < length + len(line) - 1:
         line = line[:inter[0]-length] + 'N' + line[inter[0]-length+1:]
@@ -112,8 +486,11 @@ def parseFasta(fIn, fOut, minLen, mask, headers):
         maskedBP += 1
 
       # save sequence
-      read += line
+      lines.append(line)
       length += len(line) - 1
+      if length >= spillAt:
+        rec.spill()
+        spillAt = length + rec.limit
       if nseq and line.rstrip() != 'N' * (len(line) - 1):
         nseq = False
 
@@ -121,7 +498,7 @@ def parseFasta(fIn, fOut, minLen, mask, headers):
     fIn.close()
 
   # process last read
-  if read:
+  if rec.head:
     count += 1
     if length < minLen:
       short += 1
@@ -129,9 +506,13 @@ def parseFasta(fIn, fOut, minLen, mask, headers):
       pureNs += 1
     elif head in headers:
       xReads += 1
+    elif (dedup is not None or caps is not None) \
+        and dropRecord(head, length, rec, dedup, caps):
+      pass
     else:
-      fOut.write(read)
+      rec.write(fOut)
       total += 1
+  rec.close()
 
   if fOut != sys.stdout:
     fOut.close()
@@ -141,17 +522,65 @@ def parseFasta(fIn, fOut, minLen, mask, headers):
 def main():
   '''Main.'''
   args = sys.argv[1:]
-  if len(args) < 2:
+  prof = metaProf.fromArgs('filterNT2', args)
+  md5 = metaProf.popArg(args, '--md5', False, value=False)
+  mapFile = metaProf.popArg(args, '--dedup')
+  accFile = metaProf.popArg(args, '--dedup-acc')
+  limit = int(metaProf.popArg(args, '--dedup-mem', 5000000))
+  capTree = metaProf.popArg(args, '--cap')
+  capAcc = metaProf.popArg(args, '--cap-acc')
+  maxSeqs = metaProf.popArg(args, '--max-seqs')
+  maxBp = metaProf.popArg(args, '--max-bp')
+  capRank = metaProf.popArg(args, '--cap-rank', 'species')
+  capOut = metaProf.popArg(args, '--cap-out')
+  numShards = int(metaProf.popArg(args, '--shards', 0))
+  shardTree = metaProf.popArg(args, '--shard-tree')
+  shardAcc = metaProf.popArg(args, '--shard-acc')
+  shardRank = metaProf.popArg(args, '--shard-rank', 'species')
+  recordMem = float(metaProf.popArg(args, '--record-mem', 16))
+  if len(args) < 2 or (capTree is not None and (capAcc is None \
+      or (maxSeqs is None and maxBp is None))) \
+      or (shardTree is not None and shardAcc is None):
     sys.stderr.write('Usage: python filterNT2.py  <input>  <output> \ \n' \
-      + '    [<minLen>]  [<BED>]  [<headers]\n')
+      + '    [<minLen>]  [<BED>]  [<headers]  [--md5] \\\n' \
+      + '    [--dedup <map>  [--dedup-acc <acc2taxid>]  [--dedup-mem <int>]] \\\n' \
+      + '    [--cap <tree>  --cap-acc <acc2taxid>  (--max-seqs <int> | \\\n' \
+      + '      --max-bp <int>)  [--cap-rank <rank>]  [--cap-out <prefix>]] \\\n' \
+      + '    [--shards <int>  [--shard-tree <tree>  --shard-acc <acc2taxid> \\\n' \
+      + '      [--shard-rank <rank>]]]  [--record-mem <float>]\n')
     sys.stderr.write('  <minLen>    Minimum sequence length (def. 25bp)\n')
     sys.stderr.write('  <BED>       BED file of regions to mask\n')
     sys.stderr.write('  <headers>   File listing headers of sequences to exclude\n')
+    sys.stderr.write('  --md5       Verify <input> against <input>.md5\n')
+    sys.stderr.write('  --dedup     Remove duplicate sequences, listing\n' \
+      + '                dropped -> kept accessions in <map>\n')
+    sys.stderr.write('  --dedup-acc Only remove duplicates of the same taxID\n')
+    sys.stderr.write('  --dedup-mem Digests kept in memory before spilling\n' \
+      + '                to a temporary file (def. 5000000)\n')
+    sys.stderr.write('  --cap       Tree with nt counts (ntSumm.py) for caps\n')
+    sys.stderr.write('  --cap-acc   Accession-to-taxID file (e.g. acc2taxid.txt)\n')
+    sys.stderr.write('  --max-seqs  Max. sequences kept per taxon\n')
+    sys.stderr.write('  --max-bp    Max. bases kept per taxon\n')
+    sys.stderr.write('  --cap-rank  Rank of taxa capped (def. species)\n')
+    sys.stderr.write('  --cap-out   Prefix of pruned acc2taxid and tree\n' \
+      + '                (<prefix>.acc2taxid, <prefix>.tree; def. <output>)\n')
+    sys.stderr.write('  --shards    Split output into files of similar size\n' \
+      + '                (e.g. nt.fa -> nt.0.fa, nt.1.fa, ...)\n')
+    sys.stderr.write('  --shard-tree Tree with nt counts, to keep taxa together\n')
+    sys.stderr.write('  --shard-acc Accession-to-taxID file, for --shard-tree\n')
+    sys.stderr.write('  --shard-rank Rank of taxa kept together (def. species)\n')
+    sys.stderr.write('  --record-mem MB of a sequence held in memory before\n' \
+      + '                spilling to a temporary file (def. 16)\n')
+    sys.stderr.write(metaProf.usage)
     sys.exit(-1)
 
   # get CL args
-  fIn = openRead(args[0])
-  fOut = openWrite(args[1])
+  if md5:
+    expected = metaIO.expectedMd5(args[0])
+  fIn = openRead(args[0], md5)
+  if numShards and args[1] == '-':
+    sys.stderr.write('Error! Cannot write shards to stdout\n')
+    sys.exit(-1)
   minLen = 25
   if len(args) > 2:
     minLen = int(args[2])
@@ -159,18 +588,95 @@ def main():
   # load BED regions
   mask = {}
   if len(args) > 3:
-    loadBed(args[3], mask)
+    with prof.phase('loadBed'):
+      loadBed(args[3], mask)
+      prof.count(len(mask), metaProf.fileSize(args[3]))
 
   # load headers of seqs to exclude
   headers = {}
   if len(args) > 4:
-    fRead = openRead(args[4])
-    for line in fRead:
-      headers[line.rstrip()] = 1
+    with prof.phase('loadHeaders'):
+      fRead = openRead(args[4])
+      for line in fRead:
+        headers[line.rstrip()] = 1
+      prof.count(len(headers), metaProf.fileSize(args[4]))
+
+  # load acc2taxid (to dedup by taxID, or for caps)
+  accs = {}
+  for filename in [accFile, capAcc, shardAcc]:
+    if filename is not None and filename not in accs:
+      with prof.phase('loadAcc'):
+        accs[filename] = loadAcc(filename)
+        prof.count(len(accs[filename]), metaProf.fileSize(filename))
+  outputs = []  # files opened for writing (removed if md5 fails)
+  dedup = None
+  if mapFile is not None:
+    if mapFile != '-':
+      outputs.append(mapFile)
+    dedup = Dedup(openWrite(mapFile), accs.get(accFile), limit,
+      os.path.dirname(os.path.abspath(mapFile)) if mapFile != '-' else None)
+
+  # load tree (for caps)
+  caps = None
+  if capTree is not None:
+    if capOut is None:
+      capOut = args[1]
+    if capOut == '-':
+      sys.stderr.write('Error! Need --cap-out with output to stdout\n')
+      sys.exit(-1)
+    import taxTree
+    with prof.phase('loadTree'):
+      f = openRead(capTree)
+      tree = taxTree.loadTree(f, counts=True)
+      if f != sys.stdin:
+        f.close()
+      prof.count(len(tree), metaProf.fileSize(capTree))
+    outputs.append(capOut + '.acc2taxid')
+    caps = Caps(tree, accs[capAcc],
+      int(maxSeqs) if maxSeqs is not None else None,
+      int(maxBp) if maxBp is not None else None, capRank,
+      openWrite(capOut + '.acc2taxid'))
+
+  # open output (or shards)
+  fOut = None
+  if numShards:
+    tree = None
+    if shardTree is not None:
+      import taxTree
+      with prof.phase('loadTree'):
+        f = openRead(shardTree)
+        tree = taxTree.loadTree(f, counts=True)
+        if f != sys.stdin:
+          f.close()
+        prof.count(len(tree), metaProf.fileSize(shardTree))
+    outputs += [shardName(args[1], i) for i in range(numShards)]
+    fOut = Shards([openWrite(x) for x in outputs[-numShards:]], tree,
+      accs.get(shardAcc), shardRank)
+  else:
+    if args[1] != '-':
+      outputs.append(args[1])
+    fOut = openWrite(args[1])
 
   # parse fasta
-  count, short, pureNs, xReads, masked, maskedBP, total \
-    = parseFasta(fIn, fOut, minLen, mask, headers)
+  rec = Record(int(recordMem * 1e6), os.path.dirname(os.path.abspath(args[1]))
+    if args[1] != '-' else None, dedup is not None)
+  with prof.phase('parseFasta'), prof.progress('parseFasta', fIn,
+      args[0]) as prog:
+    count, short, pureNs, xReads, masked, maskedBP, total \
+      = parseFasta(fIn, fOut, minLen, mask, headers, dedup, caps, prog, rec)
+    prof.count(count, metaProf.fileSize(args[0]))
+    if dedup is not None:
+      dedup.close()
+    if md5 and not metaIO.verifyMd5(fIn, args[0], expected):
+      if caps is not None:
+        caps.fAcc.close()
+      for filename in outputs:
+        os.remove(filename)
+      sys.exit(-1)
+  if caps is not None:
+    with prof.phase('printTree'):
+      caps.finish(openWrite(capOut + '.tree'))
+      prof.count(len(caps.tree))
 
   sys.stderr.write('Total fasta sequences in %s: %d\n' % (args[0], count))
   sys.stderr.write('  Shorter than %dbp: %d\n' % (minLen, short))
@@ -180,7 +686,21 @@ def main():
   if len(args) > 3:
     sys.stderr.write('  Masked sequences (length): %d (%dbp)\n' \
       % (masked, maskedBP))
-  sys.stderr.write('  Written to %s: %d\n' % (args[1], total))
+  if dedup is not None:
+    sys.stderr.write('  Duplicates: %d%s\n' % (dedup.dups,
+      ' (%d digests spilled)' % dedup.spilled if dedup.spilled else ''))
+  if caps is not None:
+    sys.stderr.write('  Over per-%s caps: %d\n' % (capRank, caps.capped))
+  if rec.spills:
+    sys.stderr.write('  Spilled to disk (over %gMB): %d\n' % (recordMem,
+      rec.spills))
+  if numShards:
+    for i in range(numShards):
+      sys.stderr.write('  Written to %s: %d (%.1fMB)\n' \
+        % (shardName(args[1], i), fOut.seqs[i], fOut.size[i] / 1e6))
+  else:
+    sys.stderr.write('  Written to %s: %d\n' % (args[1], total))
+  prof.finish()
 
 if __name__ == '__main__':
   main()
@@ -8,15 +8,31 @@
 
 module load centrifuge
 
-# append adapters to nt db
+# summarize nt db (before appending adapters; kept for reruns,
+#   but rebuilt if nt.fa or the taxonomy files are newer, i.e.
+#   after a new download -- downloadNTdb*.sh also delete it)
 db=nt.fa
+pre=nt
+if [[ ! -f $pre.base.tree || ! -f $pre.base.tree.inputs \
+    || $db -nt $pre.base.tree || acc2taxid.txt -nt $pre.base.tree \
+    || nodes.dmp -nt $pre.base.tree ]]; then
+  python ntSumm.py \
+    acc2taxid.txt \
+    nodes.dmp \
+    $db \
+    $pre.base.tree.tmp
+  mv $pre.base.tree.tmp.inputs $pre.base.tree.inputs
+  mv $pre.base.tree.tmp $pre.base.tree
+fi
+
+# append adapters to nt db
 cat adapters2.fa >> $db
 cat nodes2.dmp >> nodes.dmp
 cat names2.dmp >> names.dmp
 cat acc2taxid2.txt >> acc2taxid.txt
+touch $pre.base.tree  # still the summary of nt without adapters
 
 # index database
-pre=nt
 rm -f $pre.1.cf $pre.2.cf $pre.3.cf $pre.4.cf $pre.tree
 centrifuge-build \
   -p4 \
@@ -33,10 +49,12 @@ centrifuge-inspect \
   $pre \
   > $pre.tree.tmp
 
-# add taxonomic summary to tree
+# add taxonomic summary to tree (adding only the adapters
+#   to the summary of nt)
 python ntSumm.py \
-  acc2taxid.txt \
+  acc2taxid2.txt \
   $pre.tree.tmp \
-  $db \
-  $pre.tree
+  adapters2.fa \
+  $pre.tree \
+  --base $pre.base.tree
 rm $pre.tree.tmp
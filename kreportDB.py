@@ -0,0 +1,269 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Store kraken-style reports (centrifuge-kreport, centKreport.py)
+#   in an SQLite database, keyed by run, sample, and taxID,
+#   with the enrichment and nt90 flags of centSumm3.py, and
+#   query it:
+#     load    add reports (replacing those of the same run/sample),
+#               in batched transactions
+#     query   samples in which a taxon (or any taxon in its clade)
+#               is at or above a percent threshold
+
+import sys
+import os
+import time
+import sqlite3
+import metaProf
+import centSumm3
+from metaIO import openRead
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sample (
+  id INTEGER PRIMARY KEY,
+  run TEXT NOT NULL,
+  name TEXT NOT NULL,
+  date TEXT,
+  path TEXT,
+  reads REAL,
+  UNIQUE (run, name)
+);
+CREATE TABLE IF NOT EXISTS taxon (
+  taxid INTEGER PRIMARY KEY,
+  parent INTEGER,
+  rank TEXT,
+  name TEXT
+);
+CREATE TABLE IF NOT EXISTS hit (
+  sample INTEGER NOT NULL,
+  taxid INTEGER NOT NULL,
+  pct REAL,
+  clade REAL,
+  reads REAL,
+  cladeNT90 INTEGER,
+  nt90 INTEGER,
+  enriched INTEGER,
+  lowNT90 INTEGER,
+  PRIMARY KEY (sample, taxid)
+);
+CREATE INDEX IF NOT EXISTS hit_taxid ON hit (taxid, pct);
+CREATE INDEX IF NOT EXISTS taxon_parent ON taxon (parent);
+CREATE INDEX IF NOT EXISTS sample_date ON sample (date);
+'''
+
+def openDB(filename):
+  '''
+  Open (or create) the database.
+  '''
+  try:
+    db = sqlite3.connect(filename)
+  except sqlite3.Error:
+    sys.stderr.write('Error! Cannot open database %s\n' % filename)
+    sys.exit(-1)
+  db.executescript(SCHEMA)
+  return db
+
+def parseReport(lines):
+  '''
+  Parse a kraken-style report. Return rows of
+    (taxID, parent, rank code, name, pct, clade,
+    reads, cladeNT90, nt90), and the total reads.
+  '''
+  rows = []
+  stack = []   # taxIDs of current lineage, by depth
+  total = 0.0
+  for line in lines:
+    spl = line.rstrip('\n').split('\t')
+    if len(spl) < 8:
+      sys.stderr.write('Error! Improperly formatted ' \
+        + 'centrifuge-kreport file\n')
+      sys.exit(-1)
+    name = spl[7].lstrip(' ')
+    depth = (len(spl[7]) - len(name)) // 2
+    taxon = int(spl[4])
+    del stack[depth:]
+    parent = stack[-1] if stack and spl[3] != 'U' else None
+    if spl[3] != 'U':
+      stack.append(taxon)
+    rows.append((taxon, parent, spl[3], name, float(spl[0]),
+      float(spl[1]), float(spl[2]), int(spl[5]), int(spl[6])))
+    if taxon in [0, 1]:
+      total += float(spl[1])
+  return rows, total
+
+def reportFlags(lines, tax):
+  '''
+  Determine enrichment and nt90 flags of the taxa
+    in a report (as centSumm3.py does), given the
+    output of centSumm3.loadTax().
+  '''
+  devNull = open(os.devnull, 'w')
+  stderr = sys.stderr
+  sys.stderr = devNull  # (warnings are printed by centSumm3.py)
+  try:
+    unclass, root, score = centSumm3.loadScores(lines, tax[0], tax[1])
+  finally:
+    sys.stderr = stderr
+    devNull.close()
+  flags = {}
+  for n in root.child:
+    centSumm3.testTree(n, 0, True, True, flags)
+  return flags
+
+def sampleName(path):
+  '''
+  Determine run and sample names from the path of
+    a report (<run>/<sample>.html.raw).
+  '''
+  name = os.path.basename(path)
+  for ext in ['.raw', '.html', '.kreport', '.txt']:
+    if name.endswith(ext):
+      name = name[:-len(ext)]
+  run = os.path.basename(os.path.dirname(os.path.abspath(path)))
+  return run, name
+
+def loadReports(db, paths, tax, run=None, date=None, batch=100):
+  '''
+  Load reports to the database, committing every
+    batch files. Return the number of hits loaded.
+  '''
+  count = 0
+  cur = db.cursor()
+  for i in range(len(paths)):
+    path = paths[i]
+    f = openRead(path)
+    lines = list(f)
+    if f != sys.stdin:
+      f.close()
+    rows, total = parseReport(lines)
+    flags = {}
+    if tax is not None:
+      flags = reportFlags(lines, tax)
+
+    # replace sample
+    r, name = sampleName(path)
+    if run is not None:
+      r = run
+    d = date
+    if d is None:
+      d = time.strftime('%Y-%m-%d', time.localtime(os.path.getmtime(path)))
+    cur.execute('DELETE FROM hit WHERE sample IN (SELECT id FROM sample ' \
+      + 'WHERE run = ? AND name = ?)', (r, name))
+    cur.execute('INSERT OR REPLACE INTO sample (run, name, date, path, ' \
+      + 'reads) VALUES (?, ?, ?, ?, ?)', (r, name, d,
+      os.path.abspath(path), total))
+    sid = cur.lastrowid
+
+    # save taxa and hits
+    cur.executemany('INSERT OR IGNORE INTO taxon VALUES (?, ?, ?, ?)',
+      [row[:4] for row in rows])
+    hits = []
+    for row in rows:
+      enriched, lowNT90 = flags.get(str(row[0]), (None, None))
+      hits.append((sid, row[0]) + row[4:] + (enriched, lowNT90))
+    cur.executemany('INSERT OR REPLACE INTO hit VALUES ' \
+      + '(?, ?, ?, ?, ?, ?, ?, ?, ?)', hits)
+    count += len(hits)
+    if (i + 1) % batch == 0:
+      db.commit()
+  db.commit()
+  return count
+
+def query(db, taxon, minPct, clade=False, since=None, direct=False):
+  '''
+  Find samples in which the taxon (or, with clade,
+    any taxon below it) is at or above minPct percent
+    of reads (of reads assigned directly, with direct).
+  '''
+  taxa = 'SELECT ?'
+  if clade:
+    taxa = 'WITH RECURSIVE sub(taxid) AS (SELECT ? UNION ALL ' \
+      + 'SELECT t.taxid FROM taxon t JOIN sub ON t.parent = sub.taxid) ' \
+      + 'SELECT taxid FROM sub'
+  cond = 'h.pct >= ?'
+  if direct:
+    cond = 'h.reads * 100.0 >= ? * s.reads'
+  sql = 'SELECT s.run, s.name, s.date, h.taxid, t.name, h.pct, ' \
+    + 'COALESCE(h.reads * 100.0 / NULLIF(s.reads, 0), 0), h.clade, ' \
+    + 'h.enriched, h.lowNT90 ' \
+    + 'FROM hit h JOIN sample s ON s.id = h.sample ' \
+    + 'LEFT JOIN taxon t ON t.taxid = h.taxid ' \
+    + 'WHERE h.taxid IN (%s) AND %s' % (taxa, cond)
+  params = [taxon, minPct]
+  if since is not None:
+    sql += ' AND s.date >= ?'
+    params.append(since)
+  sql += ' ORDER BY s.date, s.run, s.name, h.pct DESC'
+  return db.execute(sql, params)
+
+def flag(x):
+  '''
+  Format an enrichment/nt90 flag.
+  '''
+  if x is None:
+    return '-'
+  return 'Y' if x else 'N'
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  if len(args) < 3 or args[0] not in ['load', 'query']:
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + 'load  <db>  [<kreport>]+  [options]\n' \
+      + '  Options:\n' \
+      + '    --tree <file>   Taxonomy tree with nt counts (e.g. nt.tree),\n' \
+      + '                      to add enrichment/nt90 flags\n' \
+      + '    --list <file>   File listing reports to load\n' \
+      + '    --run <str>     Run name (def. folder of each report)\n' \
+      + '    --date <str>    Date of samples (def. file date)\n' \
+      + '    --batch <int>   Reports per transaction (def. 100)\n' \
+      + '       python %s  ' % sys.argv[0] \
+      + 'query  <db>  <taxID>  [options]\n' \
+      + '  Options:\n' \
+      + '    --min-pct <float>   Minimum percent of reads (def. 1)\n' \
+      + '    --clade             Include all taxa below <taxID>\n' \
+      + '    --direct            Count reads assigned directly to a taxon\n' \
+      + '    --since <date>      Earliest date (YYYY-MM-DD)\n')
+    sys.exit(-1)
+
+  if args[0] == 'load':
+    tree = metaProf.popArg(args, '--tree')
+    listFile = metaProf.popArg(args, '--list')
+    run = metaProf.popArg(args, '--run')
+    date = metaProf.popArg(args, '--date')
+    batch = int(metaProf.popArg(args, '--batch', 100))
+    paths = args[2:]
+    if listFile is not None:
+      f = openRead(listFile)
+      paths += [line.strip() for line in f if line.strip()]
+      if f != sys.stdin:
+        f.close()
+    tax = None
+    if tree is not None:
+      f = openRead(tree)
+      tax = centSumm3.loadTax(f)
+      if f != sys.stdin:
+        f.close()
+    db = openDB(args[1])
+    start = time.time()
+    count = loadReports(db, paths, tax, run, date, batch)
+    db.close()
+    sys.stderr.write('Reports loaded: %d (%d taxa, %.1fs)\n' % (len(paths),
+      count, time.time() - start))
+
+  else:
+    minPct = float(metaProf.popArg(args, '--min-pct', 1))
+    clade = metaProf.popArg(args, '--clade', False, value=False)
+    direct = metaProf.popArg(args, '--direct', False, value=False)
+    since = metaProf.popArg(args, '--since')
+    db = openDB(args[1])
+    sys.stdout.write('run\tsample\tdate\ttaxID\tname\tpercent\t' \
+      + 'directPercent\treads\tenriched\tlowNT90\n')
+    for row in query(db, int(args[2]), minPct, clade, since, direct):
+      sys.stdout.write('%s\t%s\t%s\t%d\t%s\t%.2f\t%.2f\t%.0f\t%s\t%s\n' \
+        % (row[:8] + (flag(row[8]), flag(row[9]))))
+    db.close()
+
+if __name__ == '__main__':
+  main()
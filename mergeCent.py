@@ -0,0 +1,149 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Merge centrifuge's per-read outputs of the same reads
+#   against several indexes (e.g. the shards of filterNT2.py
+#   --shards), as if the reads were classified against one
+#   index of the whole database:
+#   - for each read, only the best-scoring hits (over all
+#     shards) are kept, up to -k (as given to centrifuge;
+#     def. 5), in order of seqID and taxID, and numMatches
+#     is their number
+#   - 2ndBestScore is the best of the other scores
+#   - reads without hits in any shard are unclassified
+#   The outputs must list the reads in the same order
+#   (run centrifuge with --reorder when using -p).
+#   The merged output can be given to centKreport.py or
+#   centrifuge-kreport, as usual.
+
+import sys
+import metaProf
+from centKreport import parseHeader
+from metaIO import openRead, openWrite
+
+def readBlocks(f, iRead):
+  '''
+  Yield the readID and the (split) lines of
+    each read of a centrifuge output.
+  '''
+  read = None
+  lines = []
+  for line in f:
+    spl = line.rstrip('\n').split('\t')
+    if spl[iRead] != read:
+      if lines:
+        yield read, lines
+      read = spl[iRead]
+      lines = []
+    lines.append(spl)
+  if lines:
+    yield read, lines
+
+def mergeHits(blocks, idx, k=5):
+  '''
+  Merge the hits of a read from all shards. Return
+    the lines to write (the first unclassified line,
+    if there are no hits).
+  '''
+  iSeq = idx['seqID']
+  iTax = idx['taxID']
+  iScore = idx['score']
+  i2nd = idx['2ndBestScore']
+  iNum = idx['numMatches']
+  hits = []
+  for lines in blocks:
+    for spl in lines:
+      if spl[iTax] != '0' or spl[iSeq] != 'unclassified':
+        hits.append(spl)
+  if not hits:
+    return [blocks[0][0]]
+
+  # keep best-scoring hits
+  best = max(int(spl[iScore]) for spl in hits)
+  second = 0
+  kept = []
+  for spl in hits:
+    score = int(spl[iScore])
+    if score == best:
+      kept.append(spl)
+      second = max(second, int(spl[i2nd]))
+    else:
+      second = max(second, score)
+  kept.sort(key=lambda spl: (spl[iSeq], spl[iTax]))
+  kept = kept[:k]
+  for spl in kept:
+    spl[i2nd] = '%d' % min(second, best)
+    spl[iNum] = '%d' % len(kept)
+  return kept
+
+def mergeOutputs(fIns, fOut, k=5):
+  '''
+  Merge centrifuge outputs (read in parallel).
+    Return the number of reads.
+  '''
+  header = [f.readline() for f in fIns]
+  if any(h != header[0] for h in header[1:]):
+    sys.stderr.write('Error! Centrifuge outputs have different headers\n')
+    sys.exit(-1)
+  idx = parseHeader(header[0])
+  for col in ['readID', 'seqID', 'taxID', 'score', '2ndBestScore',
+      'numMatches']:
+    if col not in idx:
+      sys.stderr.write('Error! Cannot find column %s ' % col \
+        + 'in centrifuge output header\n')
+      sys.exit(-1)
+  fOut.write(header[0])
+  its = [readBlocks(f, idx['readID']) for f in fIns]
+  count = 0
+  for read, lines in its[0]:
+    blocks = [lines]
+    for it in its[1:]:
+      res = next(it, None)
+      if res is None or res[0] != read:
+        sys.stderr.write('Error! Reads differ between centrifuge ' \
+          + 'outputs at read %s\n' % read \
+          + '  (classify with --reorder)\n')
+        sys.exit(-1)
+      blocks.append(res[1])
+    for spl in mergeHits(blocks, idx, k):
+      fOut.write('\t'.join(spl) + '\n')
+    count += 1
+  for it in its[1:]:
+    if next(it, None) is not None:
+      sys.stderr.write('Error! Reads differ between centrifuge ' \
+        + 'outputs (extra reads)\n')
+      sys.exit(-1)
+  return count
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  prof = metaProf.fromArgs('mergeCent', args)
+  k = int(metaProf.popArg(args, '-k', 5))
+  if len(args) < 2:
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<in>[,<in>]*  <out>  [-k <int>]\n' \
+      + '  <in>   Centrifuge per-read output of each shard\n' \
+      + '           (same reads, in the same order)\n' \
+      + '  <out>  Output merged per-read file\n' \
+      + '  -k     Max. hits per read, as given to centrifuge (def. 5)\n' \
+      + metaProf.usage)
+    sys.exit(-1)
+
+  fIns = [openRead(x) for x in args[0].split(',')]
+  fOut = openWrite(args[1])
+  with prof.phase('mergeOutputs'):
+    count = mergeOutputs(fIns, fOut, k)
+    prof.count(count, sum(metaProf.fileSize(x) for x in args[0].split(',')))
+  for f in fIns:
+    if f != sys.stdin:
+      f.close()
+  if fOut != sys.stdout:
+    fOut.close()
+  sys.stderr.write('Reads merged from %d outputs: %d\n' % (len(fIns),
+    count))
+  prof.finish()
+
+if __name__ == '__main__':
+  main()
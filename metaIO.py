@@ -0,0 +1,428 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Shared file I/O for the metagen scripts.
+#   openRead(): '-' is stdin; '.gz' files (gzip or BGZF) are
+#     decompressed in a background thread (BGZF blocks by a
+#     pool of threads); '.zst' files need the zstandard module.
+#   openWrite(): '-' is stdout; '.gz' files are written as BGZF
+#     (randomly accessible, e.g. by samtools faidx), compressed
+#     by a pool of threads in the background; '.zst' files need
+#     the zstandard module.
+#   Reading and writing use large buffers.
+#   openRead(md5=True) also computes the md5 of the compressed
+#     bytes as they stream, for verifyMd5() to check against a
+#     <file>.md5 (md5sum output), saving a separate read.
+
+import sys
+import hashlib
+import struct
+import threading
+import zlib
+
+try:
+  import Queue as queue
+except ImportError:
+  import queue
+
+BUFSIZE = 1 << 20          # read/write buffer size
+BLOCKSIZE = 65280          # max. uncompressed size of a BGZF block
+BATCHSIZE = 64 * BLOCKSIZE # uncompressed bytes per batch of blocks
+BGZF_EOF = b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC' \
+  + b'\x02\x00\x1b\x00\x03\x00\x00\x00\x00\x00\x00\x00\x00\x00'
+
+def numThreads():
+  '''
+  Number of compression/decompression threads.
+  '''
+  try:
+    import multiprocessing
+    return max(1, min(8, multiprocessing.cpu_count()))
+  except (ImportError, NotImplementedError):
+    return 1
+
+def toBytes(s):
+  '''
+  Convert str to bytes (no-op in python2).
+  '''
+  if isinstance(s, bytes):
+    return s
+  return s.encode('latin-1')
+
+def background(gen, size=8):
+  '''
+  Run a generator in a background thread; yield
+    its items (re-raising any exception).
+  '''
+  q = queue.Queue(size)
+  def run():
+    try:
+      for item in gen:
+        q.put((item, None))
+    except Exception as e:
+      q.put((None, e))
+    q.put((None, None))
+  t = threading.Thread(target=run)
+  t.daemon = True
+  t.start()
+  while True:
+    item, err = q.get()
+    if err is not None:
+      raise err
+    if item is None:
+      break
+    yield item
+
+def isBgzf(head):
+  '''
+  Check if a gzip header is that of a BGZF block.
+  '''
+  return len(head) >= 16 and head[:4] == b'\x1f\x8b\x08\x04' \
+    and head[12:14] == b'BC'
+
+def inflateBlock(block):
+  '''
+  Decompress a BGZF block (raw deflate between the
+    18-byte header and 8-byte footer).
+  '''
+  return zlib.decompress(block[18:-8], -15)
+
+def deflateBlock(data, level=6):
+  '''
+  Compress up to BLOCKSIZE bytes to a BGZF block.
+  '''
+  z = zlib.compressobj(level, zlib.DEFLATED, -15)
+  cdata = z.compress(data) + z.flush()
+  return b'\x1f\x8b\x08\x04\x00\x00\x00\x00\x00\xff\x06\x00BC\x02\x00' \
+    + struct.pack('<H', len(cdata) + 25) + cdata \
+    + struct.pack('<II', zlib.crc32(data) & 0xffffffff,
+    len(data) & 0xffffffff)
+
+def bgzfCompress(data, level=6, pool=None):
+  '''
+  Compress data to BGZF blocks (no EOF marker).
+  '''
+  data = toBytes(data)
+  blocks = [data[i:i+BLOCKSIZE] for i in range(0, len(data), BLOCKSIZE)]
+  if pool is not None and len(blocks) > 1:
+    return b''.join(pool.map(lambda b: deflateBlock(b, level), blocks))
+  return b''.join(deflateBlock(b, level) for b in blocks)
+
+class Reader:
+  '''
+  Reader: file-like object iterating over the lines
+    of a compressed file, decompressed in a background
+    thread. Tracks bytes read (inBytes, compressed)
+    and produced (outBytes, uncompressed), and
+    optionally the md5 of the bytes read.
+  '''
+  def __init__(self, filename, fmt, md5=False):
+    self.name = filename
+    self.fh = open(filename, 'rb')
+    self.inBytes = self.outBytes = 0
+    self.md5 = hashlib.md5() if md5 else None
+    if fmt == 'zst':
+      chunks = self.zstChunks()
+    else:
+      head = self.read(18)
+      if isBgzf(head):
+        chunks = self.bgzfChunks(head)
+      else:
+        chunks = self.gzChunks(head)
+    self.lines = self.iterLines(background(chunks))
+
+  def read(self, size=BUFSIZE):
+    '''
+    Read compressed data (counting and hashing bytes).
+    '''
+    data = self.fh.read(size)
+    self.inBytes += len(data)
+    if self.md5 is not None:
+      self.md5.update(data)
+    return data
+
+  def gzChunks(self, head):
+    '''
+    Decompress a (multi-member) gzip file.
+    '''
+    d = zlib.decompressobj(31)
+    data = head
+    while True:
+      while data:
+        out = d.decompress(data)
+        if out:
+          yield out
+        data = d.unused_data
+        if data:
+          # start of next member
+          d = zlib.decompressobj(31)
+      data = self.read()
+      if not data:
+        break
+    out = d.flush()
+    if out:
+      yield out
+
+  def bgzfChunks(self, head):
+    '''
+    Decompress a BGZF file, in batches of blocks
+      decompressed by a pool of threads.
+    '''
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(numThreads())
+    data = head
+    while True:
+      # collect a batch of complete blocks
+      blocks = []
+      pos = 0
+      while len(blocks) < 64:
+        if len(data) - pos < 18:
+          more = self.read()
+          if not more:
+            break
+          data = data[pos:] + more
+          pos = 0
+          continue
+        if not isBgzf(data[pos:pos+16]):
+          pool.close()
+          raise IOError('Invalid BGZF block in %s' % self.name)
+        bsize = struct.unpack('<H', data[pos+16:pos+18])[0] + 1
+        if len(data) - pos < bsize:
+          more = self.read(max(BUFSIZE, bsize))
+          if not more:
+            pool.close()
+            raise IOError('Truncated BGZF block in %s' % self.name)
+          data = data[pos:] + more
+          pos = 0
+          continue
+        blocks.append(data[pos:pos+bsize])
+        pos += bsize
+      data = data[pos:]
+      if not blocks:
+        break
+      out = b''.join(pool.map(inflateBlock, blocks))
+      if out:
+        yield out
+    pool.close()
+
+  def zstChunks(self):
+    '''
+    Decompress a zstd file.
+    '''
+    zstd = importZstd()
+    dctx = zstd.ZstdDecompressor()
+    for out in dctx.read_to_iter(self, read_size=BUFSIZE):
+      yield out
+
+  def iterLines(self, chunks):
+    '''
+    Split decompressed chunks into lines. Chunks
+      without newlines (e.g. of a long unwrapped line)
+      are collected, and joined once its end arrives.
+    '''
+    rest = []  # pieces of the current (unfinished) line
+    for chunk in chunks:
+      self.outBytes += len(chunk)
+      if not isinstance(chunk, str):
+        chunk = chunk.decode('latin-1')
+      rest.append(chunk)
+      if '\n' not in chunk:
+        continue
+      lines = ''.join(rest).split('\n')
+      rest = [lines.pop()]
+      for line in lines:
+        yield line + '\n'
+    rest = ''.join(rest)
+    if rest:
+      yield rest
+
+  def __iter__(self):
+    return self.lines
+
+  def __next__(self):
+    return next(self.lines)
+  next = __next__
+
+  def readline(self):
+    return next(self.lines, '')
+
+  def close(self):
+    if self.md5 is not None:
+      while self.read():
+        pass  # hash any bytes not read by the decompressor
+    self.fh.close()
+
+class BgzfWriter:
+  '''
+  BgzfWriter: writes a BGZF file, with batches of
+    blocks compressed by a pool of threads in the
+    background.
+  '''
+  def __init__(self, filename, level=6):
+    from multiprocessing.pool import ThreadPool
+    self.name = filename
+    self.fh = open(filename, 'wb')
+    self.level = level
+    self.buf = []
+    self.size = 0
+    self.err = None
+    self.pool = ThreadPool(numThreads())
+    self.q = queue.Queue(4)
+    self.thread = threading.Thread(target=self.run)
+    self.thread.daemon = True
+    self.thread.start()
+
+  def run(self):
+    while True:
+      data = self.q.get()
+      if data is None:
+        break
+      if self.err is None:
+        try:
+          self.fh.write(bgzfCompress(data, self.level, self.pool))
+        except Exception as e:
+          self.err = e
+
+  def write(self, s):
+    self.buf.append(s)
+    self.size += len(s)
+    if self.size >= BATCHSIZE:
+      self.flush()
+
+  def flush(self):
+    if self.buf:
+      self.q.put(toBytes(''.join(self.buf)))
+      self.buf = []
+      self.size = 0
+
+  def close(self):
+    self.flush()
+    self.q.put(None)
+    self.thread.join()
+    self.pool.close()
+    self.fh.write(BGZF_EOF)
+    self.fh.close()
+    if self.err is not None:
+      raise self.err
+
+class ZstdWriter:
+  '''
+  ZstdWriter: writes a zstd file (multi-threaded
+    compression by the zstandard module).
+  '''
+  def __init__(self, filename, level=3):
+    zstd = importZstd()
+    self.fh = open(filename, 'wb')
+    self.flushFrame = zstd.FLUSH_FRAME
+    self.w = zstd.ZstdCompressor(level=level,
+      threads=-1).stream_writer(self.fh)
+
+  def write(self, s):
+    self.w.write(toBytes(s))
+
+  def close(self):
+    self.w.flush(self.flushFrame)
+    self.fh.close()
+
+def importZstd():
+  '''
+  Import the (optional) zstandard module.
+  '''
+  try:
+    import zstandard
+  except ImportError:
+    sys.stderr.write('Error! The zstandard module is required ' \
+      + 'for .zst files\n')
+    sys.exit(-1)
+  return zstandard
+
+def openRead(filename, md5=False):
+  '''
+  Open filename for reading. '-' indicates stdin.
+    '.gz' suffix indicates gzip (or BGZF) compression,
+    '.zst' suffix zstd compression. With md5, the
+    compressed bytes are hashed as they are read.
+  '''
+  if filename == '-':
+    return sys.stdin
+  try:
+    if filename[-3:] == '.gz':
+      f = Reader(filename, 'gz', md5)
+    elif filename[-4:] == '.zst':
+      f = Reader(filename, 'zst', md5)
+    elif bytes is str:
+      f = open(filename, 'rU', BUFSIZE)
+    else:
+      f = open(filename, 'r', BUFSIZE, encoding='latin-1')
+  except IOError:
+    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
+    sys.exit(-1)
+  return f
+
+def expectedMd5(filename):
+  '''
+  Load the expected md5 of a file from <filename>.md5
+    (in md5sum format).
+  '''
+  if filename == '-':
+    sys.stderr.write('Error! Cannot check md5 of stdin\n')
+    sys.exit(-1)
+  try:
+    f = open(filename + '.md5')
+    spl = f.read().split()
+    f.close()
+  except IOError:
+    sys.stderr.write('Error! Cannot open %s.md5 for reading\n' % filename)
+    sys.exit(-1)
+  if not spl or len(spl[0]) != 32:
+    sys.stderr.write('Error! Improperly formatted %s.md5\n' % filename)
+    sys.exit(-1)
+  return spl[0].lower()
+
+def verifyMd5(f, filename, expected):
+  '''
+  Check the md5 of a file, after it has been read
+    by openRead(md5=True) (uncompressed files are
+    hashed here, in a separate read). Return True
+    if it matches the expected digest.
+  '''
+  if getattr(f, 'md5', None) is not None:
+    if not f.fh.closed:
+      while f.read():
+        pass  # hash any bytes not read by the decompressor
+    digest = f.md5.hexdigest()
+  else:
+    m = hashlib.md5()
+    fh = open(filename, 'rb')
+    for chunk in iter(lambda: fh.read(BUFSIZE), b''):
+      m.update(chunk)
+    fh.close()
+    digest = m.hexdigest()
+  if digest != expected:
+    sys.stderr.write('Error! md5 of %s (%s) does not match ' % (filename,
+      digest) + '%s.md5 (%s)\n' % (filename, expected))
+    return False
+  return True
+
+def openWrite(filename):
+  '''
+  Open filename for writing. '-' indicates stdout.
+    '.gz' suffix indicates (BGZF) compression,
+    '.zst' suffix zstd compression.
+  '''
+  if filename == '-':
+    return sys.stdout
+  try:
+    if filename[-3:] == '.gz':
+      f = BgzfWriter(filename)
+    elif filename[-4:] == '.zst':
+      f = ZstdWriter(filename)
+    elif bytes is str:
+      f = open(filename, 'w', BUFSIZE)
+    else:
+      f = open(filename, 'w', BUFSIZE, encoding='latin-1')
+  except IOError:
+    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
+    sys.exit(-1)
+  return f
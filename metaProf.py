@@ -0,0 +1,390 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Shared profiling/instrumentation for the metagen scripts.
+#   Scripts create a Profiler with fromArgs(), which removes
+#   the profiling options from the CL args:
+#     --prof <out>      Write JSON record of phase timings to <out>
+#                         ('-' for stderr)
+#     --prof-hot <N>    Include the N hottest functions (cProfile)
+#     --prof-mem        Include top memory allocations (tracemalloc)
+#     --progress <out>  Write progress of streaming loops as JSON
+#                         lines to <out> ('-' for stderr)
+#     --progress-interval <sec>   Time between progress lines (def. 10)
+
+import sys
+import os
+import time
+import json
+import threading
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+def popArg(args, flag, default=None, value=True):
+  '''
+  Remove a flag (and its value) from the list of CL args.
+    Return the value (True for a flag without a value),
+    or the default if the flag is absent.
+  '''
+  if flag not in args:
+    return default
+  i = args.index(flag)
+  if not value:
+    del args[i]
+    return True
+  if i + 1 >= len(args):
+    sys.stderr.write('Error! Missing value for %s\n' % flag)
+    sys.exit(-1)
+  val = args[i+1]
+  del args[i:i+2]
+  return val
+
+def popNum(args, flag, default, kind=int):
+  '''
+  Remove a numeric flag (and its value) from the list
+    of CL args. Return the value converted by kind.
+  '''
+  val = popArg(args, flag, default)
+  try:
+    return kind(val)
+  except ValueError:
+    sys.stderr.write('Error! Invalid value for %s: %s\n' % (flag, val))
+    sys.exit(-1)
+
+def peakRSS():
+  '''
+  Peak resident set size of this process (bytes).
+  '''
+  if resource is None:
+    return 0
+  rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  if sys.platform == 'darwin':
+    return rss     # already in bytes
+  return rss * 1024
+
+def cpuTime():
+  '''
+  User + system CPU time of this process.
+  '''
+  t = os.times()
+  return t[0] + t[1]
+
+def fileSize(filename):
+  '''
+  Size of a file on disk (0 for stdin or unknown).
+  '''
+  if filename == '-':
+    return 0
+  try:
+    return os.path.getsize(filename)
+  except OSError:
+    return 0
+
+class NullPhase:
+  '''
+  NullPhase: no-op context manager for a disabled Profiler.
+  '''
+  def __enter__(self):
+    return self
+  def __exit__(self, *exc):
+    return False
+
+class Phase:
+  '''
+  Phase: a timed section of a script, with
+    wall/CPU time, peak RSS at its end, and
+    counts of records and bytes processed.
+  '''
+  def __init__(self, prof, name):
+    self.prof = prof
+    self.name = name
+    self.records = 0
+    self.bytes = 0
+  def __enter__(self):
+    self.prof.stack.append(self)
+    self.wall = time.time()
+    self.cpu = cpuTime()
+    return self
+  def __exit__(self, *exc):
+    self.wall = time.time() - self.wall
+    self.cpu = cpuTime() - self.cpu
+    self.prof.stack.pop()
+    self.prof.phases.append({'name': self.name,
+      'wall': round(self.wall, 6), 'cpu': round(self.cpu, 6),
+      'peakRSS': peakRSS(), 'records': self.records,
+      'bytes': self.bytes})
+    return False
+
+def position(f):
+  '''
+  Bytes of a file read so far: compressed and
+    uncompressed (from a metaIO.Reader, or the
+    position of a plain file; None if unknown).
+  '''
+  if f is None:
+    return None, None
+  if hasattr(f, 'inBytes'):
+    return f.inBytes, f.outBytes
+  try:
+    pos = os.lseek(f.fileno(), 0, os.SEEK_CUR)
+  except (AttributeError, ValueError, OSError, IOError):
+    return None, None
+  return pos, pos
+
+class NullProgress:
+  '''
+  NullProgress: no-op progress of a loop (when
+    progress is not reported).
+  '''
+  def __init__(self):
+    self.records = 0
+  def __enter__(self):
+    return self
+  def __exit__(self, *exc):
+    return False
+
+class Progress:
+  '''
+  Progress: periodic report of a streaming loop. The loop
+    only increments records; a background thread samples
+    it (and the bytes read from the input file f) every
+    interval, and writes records/s, bytes/s (compressed
+    and uncompressed), the fraction done (of total records,
+    or of the input file size), and the ETA. The final
+    line (done) has the mean rates of the whole loop.
+  '''
+  def __init__(self, prof, name, f=None, size=0, total=0):
+    self.prof = prof
+    self.name = name
+    self.f = f
+    self.size = size
+    self.total = total
+    self.records = 0
+    self.stop = threading.Event()
+
+  def sample(self, last, done=False):
+    '''
+    Write a progress line; return the current sample.
+    '''
+    now = time.time()
+    inBytes, outBytes = position(self.f)
+    cur = (now, self.records, inBytes or 0, outBytes or 0)
+    dt = max(now - last[0], 1e-9)
+    elapsed = now - self.start
+    rec = {'script': self.prof.script, 'phase': self.name,
+      'elapsed': round(elapsed, 3), 'records': cur[1],
+      'recordsPerSec': round((cur[1] - last[1]) / dt, 1)}
+    if inBytes is not None:
+      rec.update({'inBytes': inBytes, 'outBytes': outBytes,
+        'inBytesPerSec': round((cur[2] - last[2]) / dt, 1),
+        'outBytesPerSec': round((cur[3] - last[3]) / dt, 1)})
+    frac = None
+    if self.total:
+      frac = min(1.0, cur[1] / float(self.total))
+    elif self.size and inBytes is not None:
+      frac = min(1.0, inBytes / float(self.size))
+    if done:
+      frac = 1.0
+    if frac is not None:
+      rec['fraction'] = round(frac, 6)
+      rec['eta'] = round(elapsed * (1 - frac) / frac, 1) if frac else None
+    if done:
+      rec['done'] = True
+    self.prof.writeProgress(rec)
+    return cur
+
+  def run(self):
+    '''
+    Sample progress until stopped.
+    '''
+    last = (self.start, 0, 0, 0)
+    while not self.stop.wait(self.prof.interval):
+      last = self.sample(last)
+
+  def __enter__(self):
+    self.start = time.time()
+    self.thread = threading.Thread(target=self.run)
+    self.thread.daemon = True
+    self.thread.start()
+    return self
+
+  def __exit__(self, *exc):
+    self.stop.set()
+    self.thread.join()
+    self.sample((self.start, 0, 0, 0), done=True)
+    return False
+
+class Profiler:
+  '''
+  Profiler: collects phase timings for a script run,
+    and writes them as a JSON record in finish().
+    When disabled (no output file), all methods are no-ops.
+  '''
+  def __init__(self, script, out=None, hot=0, mem=False, progress=None,
+      interval=10.0):
+    self.script = script
+    self.out = out
+    self.enabled = out is not None
+    self.progressOut = progress
+    self.progressFile = None
+    self.interval = interval
+    self.lock = threading.Lock()
+    self.hot = hot
+    self.mem = mem
+    self.phases = []
+    self.stack = []
+    self.records = self.bytes = 0
+    self.cprof = None
+    if not self.enabled:
+      return
+    self.wall = time.time()
+    self.cpu = cpuTime()
+    if hot:
+      import cProfile
+      self.cprof = cProfile.Profile()
+      self.cprof.enable()
+    if mem:
+      try:
+        import tracemalloc
+        tracemalloc.start()
+      except ImportError:
+        sys.stderr.write('Warning! tracemalloc not available; ' \
+          + 'ignoring --prof-mem\n')
+        self.mem = False
+
+  def phase(self, name):
+    '''
+    Return a context manager timing the named phase.
+    '''
+    if not self.enabled:
+      return NullPhase()
+    return Phase(self, name)
+
+  def progress(self, name, f=None, filename=None, total=0):
+    '''
+    Return a context manager reporting the progress
+      of a loop over the input file f (of the given
+      filename), or over total records.
+    '''
+    if self.progressOut is None:
+      return NullProgress()
+    return Progress(self, name, f, fileSize(filename) if filename else 0,
+      total)
+
+  def writeProgress(self, rec):
+    '''
+    Write a progress line.
+    '''
+    with self.lock:
+      if self.progressFile is None:
+        if self.progressOut == '-':
+          self.progressFile = sys.stderr
+        else:
+          try:
+            self.progressFile = open(self.progressOut, 'w')
+          except IOError:
+            sys.stderr.write('Error! Cannot open %s for writing\n' \
+              % self.progressOut)
+            sys.exit(-1)
+      rec['time'] = round(time.time(), 3)
+      self.progressFile.write(json.dumps(rec, sort_keys=True) + '\n')
+      self.progressFile.flush()
+
+  def count(self, records=0, nbytes=0):
+    '''
+    Add records/bytes processed to the current phase
+      (and to the totals).
+    '''
+    if not self.enabled:
+      return
+    self.records += records
+    self.bytes += nbytes
+    if self.stack:
+      self.stack[-1].records += records
+      self.stack[-1].bytes += nbytes
+
+  def hotFunctions(self):
+    '''
+    List the hottest functions (by internal time).
+    '''
+    import pstats
+    self.cprof.disable()
+    stats = pstats.Stats(self.cprof).stats
+    res = []
+    for key in sorted(stats, key=lambda k: stats[k][2],
+        reverse=True)[:self.hot]:
+      cc, nc, tt, ct = stats[key][:4]
+      res.append({'function': '%s:%d(%s)' % key, 'calls': nc,
+        'tottime': round(tt, 6), 'cumtime': round(ct, 6)})
+    return res
+
+  def topAllocations(self):
+    '''
+    List the top memory allocations (by line).
+    '''
+    import tracemalloc
+    current, peak = tracemalloc.get_traced_memory()
+    res = {'current': current, 'peak': peak, 'top': []}
+    stats = tracemalloc.take_snapshot().statistics('lineno')
+    for stat in stats[:self.hot or 10]:
+      frame = stat.traceback[0]
+      res['top'].append({'location': '%s:%d' % (frame.filename,
+        frame.lineno), 'size': stat.size, 'count': stat.count})
+    tracemalloc.stop()
+    return res
+
+  def finish(self):
+    '''
+    Write the JSON record of the run.
+    '''
+    if self.progressFile not in [None, sys.stderr]:
+      self.progressFile.close()
+    if not self.enabled:
+      return
+    rec = {'script': self.script, 'argv': sys.argv[1:],
+      'wall': round(time.time() - self.wall, 6),
+      'cpu': round(cpuTime() - self.cpu, 6),
+      'peakRSS': peakRSS(), 'records': self.records,
+      'bytes': self.bytes, 'phases': self.phases}
+    if self.cprof:
+      rec['hot'] = self.hotFunctions()
+    if self.mem:
+      rec['memory'] = self.topAllocations()
+    if self.out == '-':
+      f = sys.stderr
+    else:
+      try:
+        f = open(self.out, 'w')
+      except IOError:
+        sys.stderr.write('Error! Cannot open %s for writing\n' % self.out)
+        sys.exit(-1)
+    f.write(json.dumps(rec, sort_keys=True) + '\n')
+    if f != sys.stderr:
+      f.close()
+
+def fromArgs(script, args):
+  '''
+  Create a Profiler from the CL args (removing
+    the profiling options from args).
+  '''
+  out = popArg(args, '--prof')
+  hot = popNum(args, '--prof-hot', 0)
+  mem = popArg(args, '--prof-mem', False, value=False)
+  progress = popArg(args, '--progress')
+  interval = popNum(args, '--progress-interval', 10, float)
+  if (hot or mem) and out is None:
+    out = '-'
+  return Profiler(script, out, hot, mem, progress, interval)
+
+usage = '''  Profiling options:
+    --prof <out>      Write JSON record of phase timings to <out> ('-' for stderr)
+    --prof-hot <N>    Include the N hottest functions (cProfile)
+    --prof-mem        Include top memory allocations (tracemalloc)
+    --progress <out>  Write progress of long loops as JSON lines to <out>
+                        ('-' for stderr)
+    --progress-interval <sec>   Time between progress lines (def. 10)
+'''
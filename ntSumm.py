@@ -3,171 +3,247 @@
 # JMG 6/2018
 
 # Produce a summary of sequences in nt.
+#   With --base, only appended sequences (e.g. adapters2.fa,
+#   with their acc2taxid rows) are parsed, and their counts
+#   and lengths are added to those of an existing summary.
+#   The inputs of a summary (fasta and acc2taxid files; path,
+#   size, mtime) are recorded in <out>.inputs, so that a base
+#   summary is refused if those files have since changed
+#   (other than by appending the sequences being added).
 
 import sys
-import gzip
+import os
+import json
+import array
+import metaProf
+import taxTree
+from taxTree import np
+from metaIO import openRead, openWrite
 
-def openRead(filename):
-  '''
-  Open filename for reading. '-' indicates stdin.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdin
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'rb')
-    else:
-      f = open(filename, 'rU')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
-    sys.exit(-1)
-  return f
-
-def openWrite(filename):
-  '''
-  Open filename for writing. '-' indicates stdout.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdout
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'wb')
-    else:
-      f = open(filename, 'w')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
-    sys.exit(-1)
-  return f
-
-class Node:
-  '''
-  Node: contains parent node, taxonomic rank,
-    count (number of sequences in nt), and
-    length (length of sequences in nt).
-  '''
-  def __init__(self, parent, rank, count = 0, length = 0):
-    self.parent = parent
-    self.rank = rank
-    self.count = count
-    self.length = length
-
-def printOutput(f, d):
+def printOutput(f, tree):
   '''
   Print results.
   '''
-  for n in sorted(d, key=int):
-    f.write('\t|\t'.join(map(str, [n, d[n].parent,
-      d[n].rank, d[n].count, d[n].length])) + '\n')
-
-def addCount(length, node, d):
-  '''
-  Add counts to node and parents (recursively).
-  '''
-  node.count += 1
-  node.length += length
-  if node.parent and node.parent in d:
-    addCount(length, d[node.parent], d)
-
-def saveInfo(seq, length, acc2tax, d):
-  '''
-  Save info about seq.
-  '''
-  if seq in acc2tax and acc2tax[seq] in d:
-    addCount(length, d[acc2tax[seq]], d)
-  else:
-    d['0'].count += 1
-    d['0'].length += length
-
-def parseNT(f, acc2tax, d):
+  taxa = tree.taxa()
+  parent = tree.parent[taxa].tolist()
+  rank = tree.rank[taxa].tolist()
+  count = tree.count[taxa].tolist()
+  length = tree.length[taxa].tolist()
+  for i in range(len(taxa)):
+    f.write('%d\t|\t%s\t|\t%s\t|\t%d\t|\t%d\n' % (taxa[i],
+      parent[i] if parent[i] != -1 else 'None', tree.rankNames[rank[i]],
+      count[i], length[i]))
+
+def saveCounts(taxa, lengths, tree):
+  '''
+  Add counts and lengths of seqs to their taxa and
+    all parent taxa (seqs of unknown taxa to '0').
+  '''
+  taxa = np.frombuffer(taxa, 'l').astype(np.int64) if len(taxa) \
+    else np.zeros(0, np.int64)
+  lengths = np.frombuffer(lengths, 'l').astype(np.int64) if len(lengths) \
+    else np.zeros(0, np.int64)
+  taxa = np.where(tree.has(taxa), taxa, 0)
+  count = np.zeros(tree.order.size, np.int64)
+  length = np.zeros(tree.order.size, np.int64)
+  np.add.at(count, taxa, 1)
+  np.add.at(length, taxa, lengths)
+  tree.count = tree.subtreeSum(count)
+  tree.length = tree.subtreeSum(length)
+
+def parseNT(f, acc2tax, tree, prog=None):
   '''
   Parse nt: save seq info to each taxon.
   '''
-  total = totalLen = 0
+  if prog is None:
+    prog = metaProf.NullProgress()
+  taxa = array.array('l')
+  lengths = array.array('l')
   seq = ''
   length = 0
   for line in f:
     if line[0] == '>':
       if seq:
-        saveInfo(seq, length, acc2tax, d)
-        total += 1
-        totalLen += length
+        taxa.append(acc2tax.get(seq, 0))
+        lengths.append(length)
         length = 0
+        prog.records += 1
       seq = line.rstrip().split(' ')[0][1:]
     else:
       length += len(line) - 1
   if seq:
-    saveInfo(seq, length, acc2tax, d)
-    total += 1
-    totalLen += length
-  return total, totalLen
+    taxa.append(acc2tax.get(seq, 0))
+    lengths.append(length)
+    prog.records += 1
+  saveCounts(taxa, lengths, tree)
+  return len(taxa), sum(lengths)
+
+def addBase(f, tree):
+  '''
+  Add the counts and lengths of an existing summary
+    (.tree file) to those of the tree. Taxa with
+    sequences must have the same parents in both.
+  '''
+  base = taxTree.loadTree(f, counts=True)
+  taxa = base.taxa()
+  taxa = taxa[base.count[taxa] > 0]
+  missing = taxa[~tree.has(taxa)]
+  if missing.size:
+    sys.stderr.write('Error! Taxon %d of base summary ' % missing[0] \
+      + 'not in taxonomy tree\n')
+    sys.exit(-1)
+  moved = taxa[tree.parent[taxa] != base.parent[taxa]]
+  if moved.size:
+    sys.stderr.write('Error! Parent of taxon %d differs ' % moved[0] \
+      + 'from base summary (rerun without --base)\n')
+    sys.exit(-1)
+  tree.count[taxa] += base.count[taxa]
+  tree.length[taxa] += base.length[taxa]
+  return len(base)
+
+def fileStat(filename):
+  '''
+  Record of an input file: absolute path, size, mtime.
+  '''
+  st = os.stat(filename)
+  return {'path': os.path.abspath(filename), 'size': st.st_size,
+    'mtime': int(st.st_mtime)}
+
+def writeInputs(filename, inputs):
+  '''
+  Record the inputs of a summary (fasta, acc2taxid)
+    in <filename>.inputs.
+  '''
+  rec = {}
+  for key in inputs:
+    if inputs[key] != '-':
+      rec[key] = fileStat(inputs[key])
+  f = open(filename + '.inputs', 'w')
+  json.dump(rec, f, indent=1, sort_keys=True)
+  f.write('\n')
+  f.close()
+
+def checkBase(baseFile, deltas):
+  '''
+  Check that the inputs recorded for a base summary
+    are unchanged, or have grown by exactly the size
+    of the files being added (deltas).
+  '''
+  try:
+    f = open(baseFile + '.inputs')
+    rec = json.load(f)
+    f.close()
+  except (IOError, OSError, ValueError):
+    sys.stderr.write('Error! Cannot read inputs of base summary ' \
+      + '(%s.inputs); rebuild it\n' % baseFile)
+    sys.exit(-1)
+  for key in sorted(rec):
+    try:
+      cur = fileStat(rec[key]['path'])
+    except OSError:
+      sys.stderr.write('Error! Input %s of base summary ' % rec[key]['path'] \
+        + 'no longer exists; rebuild it\n')
+      sys.exit(-1)
+    same = cur['size'] == rec[key]['size'] \
+      and cur['mtime'] == rec[key]['mtime']
+    grown = key in deltas and deltas[key] != '-' \
+      and cur['size'] == rec[key]['size'] + metaProf.fileSize(deltas[key])
+    if not (same or grown):
+      sys.stderr.write('Error! Input %s has changed ' % rec[key]['path'] \
+        + 'since base summary %s was built; rebuild it\n' % baseFile)
+      sys.exit(-1)
 
 def loadTax(f):
   '''
   Load parents of each taxon from tree.
   '''
-  d = {}
-  for line in f:
-    spl = line.split('|')
-    if len(spl) < 3:
-      sys.stderr.write('Error! Improperly formatted tree file\n')
-      sys.exit(-1)
-    base = spl[0].strip()
-    if base == '1':
-      d[base] = Node(None, spl[2].strip())
-    else:
-      d[base] = Node(spl[1].strip(), spl[2].strip())
-  d['0'] = Node(None, 'no rank')  # node for seqs with unassigned taxonomy
-  return d
+  tree = taxTree.loadTree(f)
+  tree.setTaxon(0, -1, 'no rank')  # node for seqs with unassigned taxonomy
+  return tree
 
-def loadAcc(f):
+def loadAcc(f, prog=None):
   '''
   Load accession -> taxID info.
   '''
+  if prog is None:
+    prog = metaProf.NullProgress()
   d = {}
   for line in f:
+    prog.records += 1
     spl = line.rstrip().split('\t')
     if len(spl) < 2:
       sys.stderr.write('Error! Improperly formatted acc2taxid file\n')
       sys.exit(-1)
-    d[spl[0]] = spl[1]
+    d[spl[0]] = int(spl[1])
   return d
 
 def main():
   '''Main.'''
   args = sys.argv[1:]
+  prof = metaProf.fromArgs('ntSumm', args)
+  baseFile = metaProf.popArg(args, '--base')
   if len(args) < 4:
     sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
       + '<acc2taxid>  <taxTree>  \ \n' \
-      + '  <fasta>  <out>\n')
+      + '  <fasta>  <out>  [--base <tree>]\n' \
+      + '  --base  Summary (.tree) of the database before <fasta>\n' \
+      + '            was appended; only <fasta> is parsed (its\n' \
+      + '            recorded inputs must be unchanged, or have\n' \
+      + '            grown by <fasta> and <acc2taxid>)\n' \
+      + metaProf.usage)
     sys.exit(-1)
+  inputs = {'fasta': args[2], 'acc2taxid': args[0]}
+  if baseFile is not None:
+    checkBase(baseFile, inputs)
 
   # load acc2taxid
-  fAcc = openRead(args[0])
-  acc2tax = loadAcc(fAcc)
-  if fAcc != sys.stdin:
-    fAcc.close()
+  with prof.phase('loadAcc'):
+    fAcc = openRead(args[0])
+    with prof.progress('loadAcc', fAcc, args[0]) as prog:
+      acc2tax = loadAcc(fAcc, prog)
+    if fAcc != sys.stdin:
+      fAcc.close()
+    prof.count(len(acc2tax), metaProf.fileSize(args[0]))
 
   # load tax tree
-  fTax = openRead(args[1])
-  d = loadTax(fTax)
-  if fTax != sys.stdin:
-    fTax.close()
+  with prof.phase('loadTax'):
+    fTax = openRead(args[1])
+    tree = loadTax(fTax)
+    if fTax != sys.stdin:
+      fTax.close()
+    prof.count(len(tree), metaProf.fileSize(args[1]))
 
   # parse nt.fa
-  fIn = openRead(args[2])
-  total, totalLen = parseNT(fIn, acc2tax, d)
-  if fIn != sys.stdin:
-    fIn.close()
+  with prof.phase('parseNT'):
+    fIn = openRead(args[2])
+    with prof.progress('parseNT', fIn, args[2]) as prog:
+      total, totalLen = parseNT(fIn, acc2tax, tree, prog)
+    if fIn != sys.stdin:
+      fIn.close()
+    prof.count(total, metaProf.fileSize(args[2]))
   sys.stderr.write('Total seqs in %s: %d\n' % (args[2], total) \
     + '  Total length (bp): %d\n' % totalLen)
 
+  # add counts of existing summary
+  if baseFile is not None:
+    with prof.phase('addBase'):
+      fBase = openRead(baseFile)
+      prof.count(addBase(fBase, tree), metaProf.fileSize(baseFile))
+      if fBase != sys.stdin:
+        fBase.close()
+    sys.stderr.write('  Added to summary %s: %d seqs (%d bp)\n' \
+      % (baseFile, tree.count[1], tree.length[1]))
+
   # print output
-  fOut = openWrite(args[3])
-  printOutput(fOut, d)
-  if fOut != sys.stdout:
-    fOut.close()
+  with prof.phase('printOutput'):
+    fOut = openWrite(args[3])
+    printOutput(fOut, tree)
+    if fOut != sys.stdout:
+      fOut.close()
+      if baseFile is None:
+        writeInputs(args[3], inputs)
+    prof.count(len(tree))
+  prof.finish()
 
 if __name__ == '__main__':
   main()
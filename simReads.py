@@ -5,67 +5,55 @@
 # Simulate PE reads from nt sequences for a given taxon.
 
 import sys
-import gzip
+import os
 import random
+import mmap
+import string
+import metaProf
+import metaIO
+from metaIO import openRead, openWrite
 
-def openRead(filename):
-  '''
-  Open filename for reading. '-' indicates stdin.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdin
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'rb')
-    else:
-      f = open(filename, 'rU')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
-    sys.exit(-1)
-  return f
+try:
+  import numpy as np
+except ImportError:
+  np = None
 
-def openWrite(filename):
-  '''
-  Open filename for writing. '-' indicates stdout.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdout
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'wb')
-    else:
-      f = open(filename, 'w')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
-    sys.exit(-1)
-  return f
+# translation table for complementing (non-ACGTN -> '!')
+try:
+  _maketrans = string.maketrans
+except AttributeError:
+  _maketrans = str.maketrans
+_comp = ['!'] * 256
+for _a, _b in zip('ACGTNacgtn', 'TGCANTGCAN'):
+  _comp[ord(_a)] = _b
+COMP = _maketrans(''.join(map(chr, range(256))), ''.join(_comp))
 
 def revComp(seq):
-  rc = ''
-  comp = {'A':'T', 'C':'G', 'G':'C', 'T':'A', 'N':'N'}
-  for nuc in seq[::-1]:
-    if nuc.upper() not in comp:
-      return None
-    rc += comp[nuc.upper()]
+  '''
+  Reverse-complement a sequence (None if it has
+    non-ACGTN characters).
+  '''
+  rc = seq.translate(COMP)[::-1]
+  if '!' in rc:
+    return None
   return rc
 
-def printOutput(f1, f2, d, fragLen, readLen, number):
+def printOutput(f1, f2, lengths, fetch, fragLen, readLen, number):
   '''
   Randomly produce reads; print results.
+    Sequences are retrieved with fetch(acc, start, end).
   '''
-  acc = d.keys()
+  acc = sorted(lengths)
   for i in range(number):
     while True:
 
       # choose an nt sequence and position
       j = random.randint(0, len(acc)-1)
-      pos = random.randint(0, len(d[acc[j]])-fragLen)
+      pos = random.randint(0, lengths[acc[j]]-fragLen)
 
       # generate reads
-      seqR1 = d[acc[j]][pos:pos+readLen].upper()
-      seqR2 = revComp(d[acc[j]][pos+fragLen-readLen:pos+fragLen])
+      seqR1 = fetch(acc[j], pos, pos+readLen).upper()
+      seqR2 = revComp(fetch(acc[j], pos+fragLen-readLen, pos+fragLen))
       if not seqR2 or not revComp(seqR1):
         # if non-N ambiguous nucleotides, try again
         continue
@@ -80,16 +68,402 @@ def printOutput(f1, f2, d, fragLen, readLen, number):
         + seqR2 + '\n+\n' + 'I' * readLen + '\n')
       break
 
+def toStr(b):
+  '''
+  Convert bytes (from numpy) to str.
+  '''
+  if isinstance(b, str):
+    return b
+  return b.decode('ascii')
+
+class ReadSampler:
+  '''
+  ReadSampler: draws read pairs (numpy) from the sequences
+    in the byte array buf, using the (length, offset,
+    lineBases, lineWidth) arrays in info.
+  '''
+  def __init__(self, buf, info, fragLen, readLen, rng):
+    self.buf = buf
+    self.length, self.offset, self.lineBases, self.lineWidth = info
+    self.span = self.length - fragLen + 1
+    self.fragLen = fragLen
+    self.readLen = readLen
+    self.rng = rng
+
+    # lookup tables: valid bases, uppercase, complement
+    self.valid = np.zeros(256, dtype=bool)
+    self.valid[np.frombuffer(b'ACGTNacgtn', dtype=np.uint8)] = True
+    self.upper = np.arange(256, dtype=np.uint8)
+    self.upper[np.frombuffer(b'acgtn', dtype=np.uint8)] \
+      = np.frombuffer(b'ACGTN', dtype=np.uint8)
+    self.comp = np.arange(256, dtype=np.uint8)
+    self.comp[np.frombuffer(b'ACGTN', dtype=np.uint8)] \
+      = np.frombuffer(b'TGCAN', dtype=np.uint8)
+
+    # columns of R1 and R2 windows within a fragment
+    self.cols = np.concatenate((np.arange(readLen),
+      np.arange(fragLen - readLen, fragLen))).astype(np.int64)
+
+  def weights(self, cand):
+    '''
+    Probabilities of candidate accessions,
+      weighted by number of fragment positions.
+    '''
+    span = self.span[cand]
+    return span / float(span.sum())
+
+  def sample(self, cand, prob, m):
+    '''
+    Draw m fragments from candidate accessions (indexes
+      into info), chosen uniformly or with probabilities
+      prob. Return the accessions, positions, and R1/R2
+      sequences (as str) of the accepted read pairs.
+    '''
+    # choose nt sequences and positions
+    if prob is not None:
+      j = cand[self.rng.choice(len(cand), m, p=prob)]
+    else:
+      j = cand[self.rng.randint(0, len(cand), m)]
+    pos = (self.rng.random_sample(m) * self.span[j]).astype(np.int64)
+
+    # gather R1 and R2 windows
+    k = pos[:, None] + self.cols[None, :]
+    lb = self.lineBases[j][:, None]
+    win = self.buf[self.offset[j][:, None] \
+      + (k // lb) * self.lineWidth[j][:, None] + k % lb]
+
+    # reject non-N ambiguous nucleotides, more than 2 Ns
+    readLen = self.readLen
+    good = self.valid[win].all(axis=1)
+    win = self.upper[win]
+    isN = win == ord('N')
+    good &= isN[:, :readLen].sum(axis=1) <= 2
+    good &= isN[:, readLen:].sum(axis=1) <= 2
+    sel = np.nonzero(good)[0]
+    seqR1 = toStr(np.ascontiguousarray(win[sel, :readLen]).tobytes())
+    seqR2 = toStr(np.ascontiguousarray(
+      self.comp[win[sel, readLen:]][:, ::-1]).tobytes())
+    return j[sel], pos[sel], seqR1, seqR2
+
+# state of the batches (set in each worker by initBatch)
+_batch = {}
 
-def parseNT(f, acc, minLen):
+def initBatch(st):
+  '''
+  Set the state of the batches (in a worker process,
+    via Pool's initializer, so that it does not depend
+    on fork). With bufFile, the sequences are mapped
+    from the (uncompressed) fasta file, rather than
+    copied to each worker.
+  '''
+  _batch.clear()
+  _batch.update(st)
+  if st.get('bufFile') is not None:
+    f = open(st['bufFile'], 'rb')
+    _batch['buf'] = np.frombuffer(mmap.mmap(f.fileno(), 0,
+      access=mmap.ACCESS_READ), dtype=np.uint8)
+    f.close()
+
+def genChunk(k):
+  '''
+  Generate chunk k of the reads (numbered from k * batch),
+    with its own RNG stream (seed, k). Return R1 and R2
+    output strings.
+  '''
+  st = _batch
+  fragLen = st['fragLen']
+  readLen = st['readLen']
+  qual = 'I' * readLen
+  i = k * st['batch']
+  m = min(st['batch'], st['number'] - i)
+  rng = np.random.RandomState([st['seed'], k])
+  sampler = ReadSampler(st['buf'], st['info'], fragLen, readLen, rng)
+  slots = st['slots'][i:i+m]
+  out1 = [None] * m
+  out2 = [None] * m
+  for g in np.unique(slots):
+    idx = np.nonzero(slots == g)[0]
+    label = ''
+    if st['labels'] is not None:
+      label = ' taxid=%s' % st['labels'][g]
+    n = tries = 0
+    while n < len(idx):
+      j, pos, seqR1, seqR2 = sampler.sample(st['groups'][g],
+        st['prob'][g], max(len(idx) - n, 16))
+      if not len(j):
+        tries += 1
+        if tries >= 100:
+          sys.stderr.write('Error! Cannot generate valid reads ' \
+            + 'from sequences%s\n' % label)
+          sys.exit(-1)
+        continue
+
+      # save output
+      for t in range(min(len(j), len(idx) - n)):
+        r = idx[n]
+        p = pos[t]
+        head = '@read%d %s_%d-%d%s' % (i + r, st['acc'][j[t]], p,
+          p + fragLen, label)
+        out1[r] = '%s R1\n%s\n+\n%s\n' % (head,
+          seqR1[t*readLen:(t+1)*readLen], qual)
+        out2[r] = '%s R2\n%s\n+\n%s\n' % (head,
+          seqR2[t*readLen:(t+1)*readLen], qual)
+        n += 1
+  out1 = ''.join(out1)
+  out2 = ''.join(out2)
+  if st['compress'][0]:
+    out1 = metaIO.bgzfCompress(out1)
+  if st['compress'][1]:
+    out2 = metaIO.bgzfCompress(out2)
+  return out1, out2
+
+def printBatch(f1, f2, acc, buf, info, fragLen, readLen, number,
+    weighted=False, seed=0, batch=0, groups=None, slots=None,
+    labels=None, workers=1, compress=(False, False), prog=None,
+    bufFile=None):
+  '''
+  Randomly produce reads in batches (numpy); print results.
+    Sequences are gathered from the byte array buf, using
+    the (length, offset, lineBases, lineWidth) arrays in info.
+    Accessions are chosen uniformly, or weighted by the
+    number of fragment positions (weighted=True).
+    For multiple taxa, groups lists the accession indexes
+    of each taxon, slots gives the group of each read,
+    and labels (taxIDs) are added to the read headers.
+    Each batch has its own RNG stream derived from seed,
+    so output does not depend on the number of workers.
+    Outputs flagged in compress are written as BGZF
+    blocks of each batch (compressed by the workers).
+    If buf maps a fasta file, bufFile names it, for the
+    workers to map it too. Reads printed are added to
+    prog.records.
+  '''
+  if prog is None:
+    prog = metaProf.NullProgress()
+  if groups is None:
+    groups = [np.arange(len(acc))]
+  if slots is None:
+    slots = np.zeros(number, dtype=np.int64)
+  prob = [None] * len(groups)
+  if weighted:
+    span = info[0] - fragLen + 1
+    prob = [span[g] / float(span[g].sum()) for g in groups]
+  if not batch:
+    batch = max(1, (1 << 21) // (2 * readLen))
+  st = {'acc': acc, 'buf': buf, 'info': info,
+    'fragLen': fragLen, 'readLen': readLen, 'number': number,
+    'seed': seed, 'batch': batch, 'groups': groups, 'slots': slots,
+    'prob': prob, 'labels': labels, 'compress': compress}
+
+  # generate chunks (in parallel), print in order
+  chunks = range((number + batch - 1) // batch)
+  pool = None
+  if workers > 1:
+    import multiprocessing
+    if bufFile is not None:
+      st = dict(st, buf=None, bufFile=bufFile)
+    pool = multiprocessing.Pool(workers, initializer=initBatch,
+      initargs=(st,))
+    res = pool.imap(genChunk, chunks)
+  else:
+    initBatch(st)
+    res = (genChunk(k) for k in chunks)
+  for out1, out2 in res:
+    f1.write(out1)
+    f2.write(out2)
+    prog.records = min(number, prog.records + batch)
+  if pool:
+    pool.close()
+    pool.join()
+  _batch.clear()
+
+class BgWriter:
+  '''
+  BgWriter: writes BGZF output (compressing each
+    write to its own blocks, unless already compressed)
+    in a background thread, so that compression runs
+    alongside read generation.
+  '''
+  def __init__(self, f, compress=False, size=8):
+    try:
+      import Queue as queue
+    except ImportError:
+      import queue
+    import threading
+    self.f = f
+    self.compress = compress
+    self.q = queue.Queue(size)
+    self.thread = threading.Thread(target=self.run)
+    self.thread.daemon = True
+    self.thread.start()
+
+  def run(self):
+    while True:
+      s = self.q.get()
+      if s is None:
+        break
+      if self.compress:
+        s = metaIO.bgzfCompress(s)
+      self.f.write(s)
+
+  def write(self, s):
+    self.q.put(s)
+
+  def close(self):
+    self.q.put(None)
+    self.thread.join()
+    self.f.write(metaIO.BGZF_EOF)
+    self.f.close()
+
+def seqArrays(idx, mm):
+  '''
+  Produce sorted accessions, the byte array, and the
+    (length, offset, lineBases, lineWidth) arrays for
+    printBatch(), from an index and memory map.
+  '''
+  acc = sorted(idx)
+  info = np.array([idx[a] for a in acc], dtype=np.int64).reshape(-1, 4)
+  buf = np.frombuffer(mm, dtype=np.uint8)
+  return acc, buf, tuple(info[:, c] for c in range(4))
+
+def memArrays(d):
+  '''
+  Produce inputs for printBatch() from a dict of
+    in-memory sequences (concatenated into one array).
+  '''
+  acc = sorted(d)
+  idx = {}
+  offset = 0
+  for a in acc:
+    n = len(d[a])
+    idx[a] = (n, offset, n + 1, n + 1)
+    offset += n
+  seqs = ''.join(d[a] for a in acc)
+  if not isinstance(seqs, bytes):
+    seqs = seqs.encode()
+  return seqArrays(idx, seqs)
+
+class IndexedFasta:
+  '''
+  IndexedFasta: random access to the sequences of an
+    (uncompressed) fasta file, via a faidx-style index
+    (name, length, offset, line bases, line width)
+    and a memory-mapped view of the file.
+  '''
+  def __init__(self, filename, idx):
+    self.idx = idx
+    self.f = open(filename, 'rb')
+    self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+
+  def fetch(self, acc, start, end):
+    '''
+    Return the subsequence [start, end) of acc.
+    '''
+    length, offset, lineBases, lineWidth = self.idx[acc]
+    end = min(end, length)
+    if start >= end:
+      return ''
+    first = offset + (start // lineBases) * lineWidth + start % lineBases
+    last = offset + (end // lineBases) * lineWidth + end % lineBases
+    seq = self.mm[first:last]
+    if not isinstance(seq, str):
+      seq = seq.decode()
+    return seq.replace('\n', '').replace('\r', '')
+
+  def close(self):
+    self.mm.close()
+    self.f.close()
+
+def buildIndex(filename, faiFile):
+  '''
+  Build a faidx-style index of a fasta file
+    (same format as `samtools faidx`). The index
+    is written to a temporary file and renamed when
+    complete. Return False (without an index) if the
+    line lengths of a sequence differ.
+  '''
+  f = open(filename, 'rb')
+  tmpFile = faiFile + '.tmp'
+  fOut = openWrite(tmpFile)
+  rec = None   # [name, length, offset, lineBases, lineWidth]
+  short = False  # a line shorter than lineBases was seen
+  pos = 0
+  for line in f:
+    if line[:1] in ('>', b'>'):
+      if rec:
+        fOut.write('%s\t%d\t%d\t%d\t%d\n' % tuple(rec))
+      name = line[1:].split()[0]
+      if not isinstance(name, str):
+        name = name.decode()
+      pos += len(line)
+      rec = [name, 0, pos, 0, 0]
+      short = False
+      continue
+    pos += len(line)
+    if not rec:
+      continue
+    bases = len(line.rstrip())
+    if not bases:
+      continue
+    if short or (rec[3] and (bases > rec[3] \
+        or (bases == rec[3] and len(line) != rec[4]))):
+      sys.stderr.write('Warning! Different line lengths in sequence ' \
+        + '%s; cannot index %s\n' % (rec[0], filename))
+      f.close()
+      fOut.close()
+      os.remove(tmpFile)
+      return False
+    if not rec[3]:
+      rec[3] = bases
+      rec[4] = len(line)
+    elif bases < rec[3]:
+      short = True
+    rec[1] += bases
+  if rec:
+    fOut.write('%s\t%d\t%d\t%d\t%d\n' % tuple(rec))
+  f.close()
+  fOut.close()
+  if os.path.exists(faiFile):
+    os.remove(faiFile)
+  os.rename(tmpFile, faiFile)
+  return True
+
+def loadIndex(filename, acc, minLen):
+  '''
+  Load (and build, if necessary) the faidx-style index
+    of a fasta file, for given accessions only.
+    Return None if the file cannot be indexed.
+  '''
+  faiFile = filename + '.fai'
+  if not os.path.exists(faiFile) \
+      or os.path.getmtime(faiFile) < os.path.getmtime(filename):
+    sys.stderr.write('Building index %s\n' % faiFile)
+    if not buildIndex(filename, faiFile):
+      return None
+  idx = {}
+  f = openRead(faiFile)
+  for line in f:
+    spl = line.rstrip().split('\t')
+    if len(spl) < 5:
+      sys.stderr.write('Error! Improperly formatted index %s\n' % faiFile)
+      sys.exit(-1)
+    if spl[0] in acc and int(spl[1]) >= minLen:
+      idx[spl[0]] = tuple(map(int, spl[1:5]))
+  f.close()
+  return idx
+
+def parseNT(f, acc, minLen, prog=None):
   '''
   Parse nt: save seqs of given accessions.
   '''
+  if prog is None:
+    prog = metaProf.NullProgress()
   d = {}
   head = seq = ''
   save = False
   for line in f:
     if line[0] == '>':
+      prog.records += 1
       if save and len(seq) >= minLen:
         d[head] = seq
       head = line.rstrip().split(' ')[0][1:]
@@ -103,62 +477,283 @@ def parseNT(f, acc, minLen):
     d[head] = seq
   return d
 
-def loadAcc(f, taxon):
+def loadAcc(f, taxa, prog=None):
   '''
-  Load accessions for given taxon.
+  Load accessions for given taxa (dict of
+    taxon -> label [e.g. clade root]).
   '''
+  if prog is None:
+    prog = metaProf.NullProgress()
   acc = {}
   for line in f:
+    prog.records += 1
     spl = line.rstrip().split('\t')
     if len(spl) < 2:
       sys.stderr.write('Error! Improperly formatted acc2taxid file\n')
       sys.exit(-1)
-    if spl[1] == taxon:
-      acc[spl[0]] = 1
+    if spl[1] in taxa:
+      acc[spl[0]] = taxa[spl[1]]
   return acc
 
+def loadTree(f):
+  '''
+  Load a taxonomy tree (e.g. nt.tree, nodes.dmp)
+    to a TaxTree (requires numpy).
+  '''
+  import taxTree
+  return taxTree.loadTree(f)
+
+def expandClades(tree, roots):
+  '''
+  Map each taxon in the clades of the given roots
+    to its root.
+  '''
+  ids = [int(r) for r in roots if r.isdigit() and tree.has(int(r))]
+  isRoot = np.zeros(tree.order.size, bool)
+  isRoot[ids] = True
+  outer = tree.nearest(ids, isRoot)
+  for i in range(len(ids)):
+    if outer[i] >= 0:
+      sys.stderr.write('Error! Taxon %d is in clades ' % ids[i] \
+        + 'of both %d and %d\n' % (outer[i], ids[i]))
+      sys.exit(-1)
+  taxa = dict((root, root) for root in roots)
+  nodes = tree.taxa()
+  label = tree.nearest(nodes, isRoot, inclusive=True)
+  for taxon, root in zip(nodes[label >= 0].tolist(),
+      label[label >= 0].tolist()):
+    taxa[str(taxon)] = str(root)
+  return taxa
+
+def loadProfile(f, number):
+  '''
+  Load abundance profile of a mock community (taxon,
+    and fraction or number of reads). Return list of
+    (taxon, number of reads).
+  '''
+  prof = []
+  for line in f:
+    if line[0] == '#' or not line.strip():
+      continue
+    spl = line.split()
+    if len(spl) < 2:
+      sys.stderr.write('Error! Improperly formatted abundance profile\n')
+      sys.exit(-1)
+    prof.append((spl[0], spl[1]))
+  if not prof:
+    sys.stderr.write('Error! Empty abundance profile\n')
+    sys.exit(-1)
+  if all(val.isdigit() for taxon, val in prof):
+    return [(taxon, int(val)) for taxon, val in prof]
+
+  # convert fractions to read counts (largest remainder)
+  total = sum(float(val) for taxon, val in prof)
+  exact = [float(val) / total * number for taxon, val in prof]
+  counts = [int(x) for x in exact]
+  order = sorted(range(len(prof)), key=lambda i: counts[i] - exact[i])
+  for i in order[:number - sum(counts)]:
+    counts[i] += 1
+  return [(prof[i][0], counts[i]) for i in range(len(prof))]
+
+def printTruth(f, prof, groups, number):
+  '''
+  Print the truth table of a mock community.
+  '''
+  f.write('taxon\treads\tpercent\tsequences\n')
+  for i in range(len(prof)):
+    f.write('%s\t%d\t%.4f\t%d\n' % (prof[i][0], prof[i][1],
+      100.0 * prof[i][1] / number, len(groups[i])))
+
 def main():
   '''Main.'''
   args = sys.argv[1:]
+  prof = metaProf.fromArgs('simReads', args)
+  weighted = metaProf.popArg(args, '--weighted', False, value=False)
+  truth = metaProf.popArg(args, '--truth')
+  seed = metaProf.popArg(args, '--seed')
+  workers = int(metaProf.popArg(args, '--workers', 1))
+  tree = metaProf.popArg(args, '--tree')
   if len(args) < 8:
     sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
       + '''<acc2taxid>  <taxon>  <fasta>
     <len1>  <len2>  <num>  <outR1>  <outR2>
   <acc2taxid>  File listing accessions and taxonomic IDs
-  <taxon>      Taxonomic ID of interest
-  <fasta>      Reference fasta file (e.g. nt.fa)
+  <taxon>      Taxonomic ID of interest, or file of taxonomic IDs
+                 and abundances (fractions or numbers of reads)
+                 for a mock community (requires numpy)
+  <fasta>      Reference fasta file (e.g. nt.fa); an uncompressed
+                 file is accessed via its index (<fasta>.fai,
+                 built if necessary)
   <len1>       Length of simulated DNA fragments
   <len2>       Length of simulated reads
-  <num>        Number of simulated read pairs
-  <outR1>      Output file for R1 reads
-  <outR2>      Output file for R2 reads
-''')
+  <num>        Number of simulated read pairs (for abundances
+                 given as fractions)
+  <outR1>      Output file for R1 reads ('.gz' for compression)
+  <outR2>      Output file for R2 reads ('.gz' for compression)
+  Options:
+    --weighted       Choose sequences weighted by length (def.
+                       uniformly; requires numpy)
+    --truth <file>   Output file for the truth table of a mock
+                       community (def. stderr)
+    --seed <int>     Random seed (output is identical for a given
+                       seed, regardless of --workers)
+    --workers <int>  Number of processes generating reads (def. 1;
+                       requires numpy)
+    --tree <file>    Taxonomy tree (e.g. nt.tree, nodes.dmp): simulate
+                       reads from the whole clade of each <taxon>
+''' + metaProf.usage)
     sys.exit(-1)
 
-  # load accessions for given taxon
-  fAcc = openRead(args[0])
-  acc = loadAcc(fAcc, args[1])
-  if fAcc != sys.stdin:
-    fAcc.close()
-  sys.stderr.write('Accessions for taxon %s in %s: %d\n' \
-    % (args[1], args[0], len(acc)))
-
-  # save nt sequences
-  fIn = openRead(args[2])
-  d = parseNT(fIn, acc, int(args[3]))
-  if fIn != sys.stdin:
-    fIn.close()
-  sys.stderr.write('Sequences loaded from %s: %d\n' % (args[2], len(d)))
-
-  # print output
-  fOut1 = openWrite(args[6])
-  fOut2 = openWrite(args[7])
-  printOutput(fOut1, fOut2, d, int(args[3]), \
-    int(args[4]), int(args[5]))
-  if fOut1 != sys.stdout:
-    fOut1.close()
-  if fOut2 != sys.stdout:
-    fOut2.close()
+  # set random seed
+  if seed is None:
+    seed = random.SystemRandom().randint(0, 2**32 - 1)
+    sys.stderr.write('Random seed: %d\n' % seed)
+  seed = int(seed)
+  random.seed(seed)
+
+  # load abundance profile (for a mock community)
+  number = int(args[5])
+  mock = not args[1].isdigit() and os.path.isfile(args[1])
+  if mock:
+    if np is None:
+      sys.stderr.write('Error! Mock community simulation requires numpy\n')
+      sys.exit(-1)
+    f = openRead(args[1])
+    community = loadProfile(f, number)
+    if f != sys.stdin:
+      f.close()
+    number = sum(n for taxon, n in community)
+  else:
+    community = [(args[1], number)]
+  taxa = dict((taxon, taxon) for taxon, n in community)
+  if len(taxa) < len(community):
+    sys.stderr.write('Error! Duplicate taxa in %s\n' % args[1])
+    sys.exit(-1)
+
+  # expand taxa to their clades
+  if tree:
+    with prof.phase('loadTree'):
+      fTree = openRead(tree)
+      taxonomy = loadTree(fTree)
+      if fTree != sys.stdin:
+        fTree.close()
+      taxa = expandClades(taxonomy, [taxon for taxon, n in community])
+      prof.count(len(taxa), metaProf.fileSize(tree))
+    sys.stderr.write('Taxa in clade(s) of %s: %d\n' % (args[1], len(taxa)))
+
+  # load accessions for given taxa
+  with prof.phase('loadAcc'):
+    fAcc = openRead(args[0])
+    with prof.progress('loadAcc', fAcc, args[0]) as prog:
+      acc = loadAcc(fAcc, taxa, prog)
+    if fAcc != sys.stdin:
+      fAcc.close()
+    prof.count(len(acc), metaProf.fileSize(args[0]))
+  if mock:
+    sys.stderr.write('Accessions for %d taxa in %s: %d\n' \
+      % (len(community), args[0], len(acc)))
+  else:
+    sys.stderr.write('Accessions for taxon %s in %s: %d\n' \
+      % (args[1], args[0], len(acc)))
+
+  # save nt sequences (or index them, for an uncompressed fasta
+  #   with regular line lengths)
+  indexed = args[2] != '-' and args[2][-3:] != '.gz'
+  with prof.phase('parseNT'):
+    if indexed:
+      idx = loadIndex(args[2], acc, int(args[3]))
+      indexed = idx is not None
+    if indexed:
+      fasta = IndexedFasta(args[2], idx)
+      lengths = dict((a, idx[a][0]) for a in idx)
+      fetch = fasta.fetch
+    else:
+      fIn = openRead(args[2])
+      with prof.progress('parseNT', fIn, args[2]) as prog:
+        d = parseNT(fIn, acc, int(args[3]), prog)
+      if fIn != sys.stdin:
+        fIn.close()
+      lengths = dict((a, len(d[a])) for a in d)
+      fetch = lambda a, start, end: d[a][start:end]
+    prof.count(len(lengths), metaProf.fileSize(args[2]))
+  sys.stderr.write('Sequences loaded from %s: %d\n' \
+    % (args[2], len(lengths)))
+
+  if not lengths:
+    sys.stderr.write('Error! No sequences of length >= %s ' % args[3] \
+      + 'for taxon %s\n' % args[1])
+    sys.exit(-1)
+
+  # print output (BGZF-compressed by the workers, or
+  #   in background threads)
+  with prof.phase('printOutput'):
+    gz = [out[-3:] == '.gz' and np is not None for out in args[6:8]]
+    fOut = []
+    for i in range(2):
+      if gz[i]:
+        try:
+          f = open(args[6+i], 'wb')
+        except IOError:
+          sys.stderr.write('Error! Cannot open %s for writing\n' \
+            % args[6+i])
+          sys.exit(-1)
+        f = BgWriter(f, workers < 2)
+      else:
+        f = openWrite(args[6+i])
+      fOut.append(f)
+    fOut1, fOut2 = fOut
+    if np is not None:
+      if indexed:
+        accs, buf, info = seqArrays(idx, fasta.mm)
+      else:
+        accs, buf, info = memArrays(d)
+      groups = slots = labels = None
+      if mock:
+        # assign (shuffled) reads to taxa (seqs grouped in one pass)
+        byTaxon = {}
+        for i in range(len(accs)):
+          byTaxon.setdefault(acc[accs[i]], []).append(i)
+        groups = []
+        for taxon, n in community:
+          groups.append(np.array(byTaxon.get(taxon, []), dtype=np.int64))
+          if n and not len(groups[-1]):
+            sys.stderr.write('Error! No sequences of length >= %s ' \
+              % args[3] + 'for taxon %s\n' % taxon)
+            sys.exit(-1)
+        slots = np.repeat(np.arange(len(community)),
+          [n for taxon, n in community])
+        np.random.RandomState(seed).shuffle(slots)
+        labels = [taxon for taxon, n in community]
+      with prof.progress('printOutput', total=number) as prog:
+        printBatch(fOut1, fOut2, accs, buf, info, int(args[3]),
+          int(args[4]), number, weighted, seed, groups=groups,
+          slots=slots, labels=labels, workers=workers,
+          compress=(gz[0] and workers > 1, gz[1] and workers > 1),
+          prog=prog, bufFile=args[2] if indexed else None)
+      del buf  # release the view of the memory map
+    else:
+      if weighted or workers > 1:
+        sys.stderr.write('Warning! numpy not available; ' \
+          + 'ignoring --weighted/--workers\n')
+      printOutput(fOut1, fOut2, lengths, fetch, int(args[3]), \
+        int(args[4]), number)
+    if fOut1 != sys.stdout:
+      fOut1.close()
+    if fOut2 != sys.stdout:
+      fOut2.close()
+    if indexed:
+      fasta.close()
+    prof.count(number)
+
+  # print truth table
+  if mock:
+    fTruth = sys.stderr
+    if truth:
+      fTruth = openWrite(truth)
+    printTruth(fTruth, community, groups, number)
+    if fTruth != sys.stderr:
+      fTruth.close()
+  prof.finish()
 
 if __name__ == '__main__':
   main()
@@ -0,0 +1,166 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Subsample reads from fastq files (e.g. the comma-joined
+#   lanes of a sample, as in centrifugeWrap.sh), keeping
+#   R1/R2 pairs together:
+#   - a fraction of the reads (--fraction), or
+#   - a fixed number of reads (--reads; reservoir sampling)
+#   with a seeded RNG, so the sample is reproducible.
+#   The numbers of reads (input and sampled) are written
+#   to a JSON file (--stats), for centSumm3.py --sample.
+
+import sys
+import math
+import json
+import random
+import metaProf
+from metaIO import openRead, openWrite
+
+def readName(head):
+  '''
+  Name of a read (1st token of header, without /1 or /2).
+  '''
+  name = head.split(None, 1)[0] if head.strip() else ''
+  if name[-2:] in ['/1', '/2']:
+    name = name[:-2]
+  return name
+
+def fastqRecords(files):
+  '''
+  Yield fastq records (4 lines) of a list of files.
+  '''
+  for filename in files:
+    f = openRead(filename)
+    lines = iter(f)
+    for head in lines:
+      rec = head + next(lines, '') + next(lines, '') + next(lines, '')
+      if head[0] != '@' or rec.count('\n') < 3:
+        sys.stderr.write('Error! Improperly formatted fastq record ' \
+          + 'in %s:\n%s' % (filename, rec))
+        sys.exit(-1)
+      yield rec
+    if f != sys.stdin:
+      f.close()
+
+def pairedRecords(files1, files2):
+  '''
+  Yield (R1, R2) records (R2 None for SE reads),
+    checking that read names match.
+  '''
+  if not files2:
+    for rec in fastqRecords(files1):
+      yield rec, None
+    return
+  it2 = fastqRecords(files2)
+  for rec1 in fastqRecords(files1):
+    rec2 = next(it2, None)
+    if rec2 is None:
+      sys.stderr.write('Error! Fewer R2 reads than R1 reads\n')
+      sys.exit(-1)
+    if readName(rec1) != readName(rec2):
+      sys.stderr.write('Error! Read names do not match:\n  ' \
+        + rec1.split('\n', 1)[0] + '\n  ' + rec2.split('\n', 1)[0] + '\n')
+      sys.exit(-1)
+    yield rec1, rec2
+  if next(it2, None) is not None:
+    sys.stderr.write('Error! More R2 reads than R1 reads\n')
+    sys.exit(-1)
+
+def sampleFraction(recs, fOut1, fOut2, frac, rng):
+  '''
+  Write each read (pair) with probability frac.
+    Return the numbers of reads and reads sampled.
+  '''
+  total = kept = 0
+  for rec1, rec2 in recs:
+    total += 1
+    if rng.random() < frac:
+      fOut1.write(rec1)
+      if rec2 is not None:
+        fOut2.write(rec2)
+      kept += 1
+  return total, kept
+
+def sampleReservoir(recs, fOut1, fOut2, k, rng):
+  '''
+  Write k reads (pairs) chosen uniformly (reservoir
+    sampling, Algorithm L), in input order.
+    Return the numbers of reads and reads sampled.
+  '''
+  res = []
+  total = 0
+  if k > 0:
+    w = math.exp(math.log(rng.random() or 1e-300) / k)
+    nxt = k + int(math.log(rng.random() or 1e-300) / math.log(1 - w))
+  for rec1, rec2 in recs:
+    if total < k:
+      res.append((total, rec1, rec2))
+    elif k > 0 and total == nxt:
+      res[int(rng.random() * k)] = (total, rec1, rec2)
+      w *= math.exp(math.log(rng.random() or 1e-300) / k)
+      nxt += int(math.log(rng.random() or 1e-300) / math.log(1 - w)) + 1
+    total += 1
+  res.sort()
+  for i, rec1, rec2 in res:
+    fOut1.write(rec1)
+    if rec2 is not None:
+      fOut2.write(rec2)
+  return total, len(res)
+
+def main():
+  '''Main.'''
+  args = sys.argv[1:]
+  frac = metaProf.popArg(args, '--fraction')
+  reads = metaProf.popArg(args, '--reads')
+  seed = int(metaProf.popArg(args, '--seed', 0))
+  stats = metaProf.popArg(args, '--stats')
+  if len(args) < 3 or (frac is None) == (reads is None) \
+      or (args[1] != 'None' and len(args) < 4):
+    sys.stderr.write('Usage: python %s  ' % sys.argv[0] \
+      + '<R1>  <R2>  <out1>  [<out2>]  (--fraction <float> | \\\n' \
+      + '    --reads <int>)  [--seed <int>]  [--stats <file>]\n' \
+      + '  <R1>        Input fastq file(s) of R1 reads (comma-separated)\n' \
+      + '  <R2>        Input fastq file(s) of R2 reads; use "None" for SE\n' \
+      + '  <out1>      Output fastq file of R1 reads\n' \
+      + '  <out2>      Output fastq file of R2 reads (PE only)\n' \
+      + '  --fraction  Fraction of reads to sample\n' \
+      + '  --reads     Number of reads to sample\n' \
+      + '  --seed      Seed of random number generator (def. 0)\n' \
+      + '  --stats     Output JSON file of sampling stats\n')
+    sys.exit(-1)
+
+  files1 = args[0].split(',')
+  files2 = args[1].split(',') if args[1] != 'None' else []
+  if files2 and len(files2) != len(files1):
+    sys.stderr.write('Error! Different numbers of R1 and R2 files\n')
+    sys.exit(-1)
+  fOut1 = openWrite(args[2])
+  fOut2 = openWrite(args[3]) if files2 else None
+
+  # sample reads
+  rng = random.Random(seed)
+  recs = pairedRecords(files1, files2)
+  if frac is not None:
+    total, kept = sampleFraction(recs, fOut1, fOut2, float(frac), rng)
+  else:
+    total, kept = sampleReservoir(recs, fOut1, fOut2, int(reads), rng)
+  for f in [fOut1, fOut2]:
+    if f is not None and f != sys.stdout:
+      f.close()
+
+  res = {'inputs': files1 + files2, 'paired': bool(files2),
+    'mode': 'fraction' if frac is not None else 'reads',
+    'seed': seed, 'reads': total, 'sampled': kept,
+    'fraction': kept / float(total) if total else 0.0}
+  if stats is not None:
+    f = openWrite(stats)
+    f.write(json.dumps(res, sort_keys=True) + '\n')
+    if f != sys.stdout:
+      f.close()
+  sys.stderr.write('Reads in %d file(s): %d\n' % (len(files1), total) \
+    + '  Sampled: %d (%.4f%%)\n' % (kept, 100 * res['fraction']))
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,433 @@
+#!/usr/bin/python
+
+# JMG 10/2026
+
+# Taxonomy tree in numpy arrays indexed by (integer) taxID,
+#   shared by the scripts that load a tree (nodes.dmp,
+#   centrifuge-inspect --taxonomy-tree, or .tree from ntSumm.py):
+#   parent, rank (uint8 codes), order in the tree file, and
+#   count/length of nt sequences, with vectorized ancestor,
+#   canonical-rank, and subtree-sum operations.
+# LCAIndex: lowest common ancestor queries (batched, O(1) each)
+#   by range minimum over the depth-first order of the tree,
+#   saved alongside the tree file (<tree>.lca.npz).
+
+import sys
+import os
+
+try:
+  import numpy as np
+except ImportError:
+  sys.stderr.write('Error! The numpy module is required ' \
+    + 'for taxonomy trees\n')
+  sys.exit(-1)
+
+CANONICAL = ['superkingdom', 'kingdom', 'phylum', 'class', 'order',
+  'family', 'genus', 'species']
+
+class TaxTree:
+  '''
+  TaxTree: arrays indexed by taxID (of size max.
+    taxID + 1) of parent (-1 for root/none), rank
+    (code into rankNames), order (line in the tree
+    file; -1 for absent taxa), count and length
+    (nt sequences, if loaded); names (dict).
+  '''
+  def __init__(self, taxa, parent, rank, rankNames, count=None,
+      length=None):
+    taxa = np.asarray(taxa, np.int64)
+    size = int(taxa.max()) + 1 if taxa.size else 1
+    self.parent = np.full(size, -1, np.int32)
+    self.parent[taxa] = parent
+    self.rank = np.zeros(size, np.uint8)
+    self.rank[taxa] = rank
+    self.rankNames = rankNames
+    self.order = np.full(size, -1, np.int32)
+    self.order[taxa] = np.arange(taxa.size, dtype=np.int32)
+    self.count = np.zeros(size, np.int64)
+    self.length = np.zeros(size, np.int64)
+    if count is not None:
+      self.count[taxa] = count
+      self.length[taxa] = length
+    self.name = {}
+    self.reset()
+
+  def reset(self):
+    '''
+    Clear cached traversal arrays (after editing
+      parents).
+    '''
+    self._up = self._levels = self._child = None
+
+  def __len__(self):
+    return int((self.order >= 0).sum())
+
+  def has(self, taxa):
+    '''
+    Check if taxa are in the tree (vectorized).
+    '''
+    taxa = np.asarray(taxa)
+    ok = (taxa >= 0) & (taxa < self.order.size)
+    res = np.zeros(taxa.shape, bool)
+    res[ok] = self.order[taxa[ok]] >= 0
+    return res
+
+  def taxa(self):
+    '''
+    TaxIDs in the tree, in increasing order.
+    '''
+    return np.nonzero(self.order >= 0)[0]
+
+  def setTaxon(self, taxon, parent, rank):
+    '''
+    Add (or replace) a taxon.
+    '''
+    if taxon >= self.order.size:
+      sys.stderr.write('Error! Cannot add taxon %d to tree\n' % taxon)
+      sys.exit(-1)
+    if self.order[taxon] < 0:
+      self.order[taxon] = self.order.max() + 1
+    self.parent[taxon] = parent
+    self.rank[taxon] = self.rankCode(rank)
+    self.reset()
+
+  def rankCode(self, rank):
+    '''
+    Code of a rank (added if new).
+    '''
+    if rank not in self.rankNames:
+      self.rankNames.append(rank)
+    return self.rankNames.index(rank)
+
+  def rankName(self, taxon):
+    '''
+    Rank of a taxon ('' if not in tree).
+    '''
+    if not self.has(taxon):
+      return ''
+    return self.rankNames[self.rank[taxon]]
+
+  def up(self):
+    '''
+    Parents for traversal: -1 for the root, and
+      for taxa whose parents are not in the tree.
+    '''
+    if self._up is None:
+      up = self.parent.astype(np.int64)
+      ok = self.has(up) & (up != np.arange(up.size))
+      up[~ok] = -1
+      self._up = up
+    return self._up
+
+  def children(self, taxon=None):
+    '''
+    Children of a taxon, in the order of the tree file.
+      With no taxon, return the children of all taxa
+      (sorted by parent) and the start of each taxon's.
+    '''
+    if self._child is None:
+      up = self.up()
+      nodes = self.taxa()
+      nodes = nodes[up[nodes] >= 0]
+      nodes = nodes[np.lexsort((self.order[nodes], up[nodes]))]
+      starts = np.searchsorted(up[nodes], np.arange(self.order.size + 1))
+      self._child = (nodes, starts)
+    nodes, starts = self._child
+    if taxon is None:
+      return nodes, starts
+    if not 0 <= taxon < self.order.size:
+      return nodes[:0]
+    return nodes[starts[taxon]:starts[taxon+1]]
+
+  def levels(self):
+    '''
+    Taxa grouped by depth (roots at 0), found
+      breadth-first from the roots.
+    '''
+    if self._levels is None:
+      nodes, starts = self.children()
+      cur = self.taxa()
+      cur = cur[self.up()[cur] < 0]
+      self._levels = []
+      while cur.size:
+        self._levels.append(cur)
+        lo = starts[cur]
+        num = starts[cur + 1] - lo
+        total = int(num.sum())
+        # indexes of all children of cur (concatenated ranges)
+        offset = np.repeat(lo - np.cumsum(num) + num, num)
+        cur = nodes[offset + np.arange(total)]
+    return self._levels
+
+  def nearest(self, taxa, mask, inclusive=False):
+    '''
+    For each taxon, the nearest ancestor (or the taxon
+      itself, if inclusive) for which mask is True
+      (-1 if none).
+    '''
+    up = self.up()
+    taxa = np.asarray(taxa, np.int64)
+    res = np.full(taxa.shape, -1, np.int64)
+    idx = np.arange(taxa.size)
+    cur = np.where(self.has(taxa), taxa, -1)
+    if not inclusive:
+      cur[cur >= 0] = up[cur[cur >= 0]]
+    while idx.size:
+      valid = cur >= 0
+      found = np.zeros(cur.shape, bool)
+      found[valid] = mask[cur[valid]]
+      res[idx[found]] = cur[found]
+      keep = valid & ~found
+      idx = idx[keep]
+      cur = up[cur[keep]]
+    return res
+
+  def ancestors(self, taxa):
+    '''
+    Mask of the given taxa and all their ancestors.
+    '''
+    up = self.up()
+    mask = np.zeros(self.order.size, bool)
+    taxa = np.asarray(taxa, np.int64)
+    cur = np.unique(taxa[self.has(taxa)])
+    while cur.size:
+      mask[cur] = True
+      cur = up[cur]
+      cur = np.unique(cur[cur >= 0])
+      cur = cur[~mask[cur]]
+    return mask
+
+  def canonical(self, extra=()):
+    '''
+    Canonical (DKPCOFGS) parent of each canonical
+      taxon (also counting taxa in extra as canonical):
+      -1 if none, -2 for non-canonical taxa.
+    '''
+    codes = [i for i in range(len(self.rankNames))
+      if self.rankNames[i] in CANONICAL]
+    level = np.isin(self.rank, codes) & (self.order >= 0)
+    extra = np.array([x for x in extra if self.has(x)], np.int64)
+    level[extra] = True
+    nodes = np.nonzero(level)[0]
+    canon = np.full(self.order.size, -2, np.int64)
+    canon[nodes] = self.nearest(nodes, level)
+    return canon
+
+  def subtreeSum(self, values):
+    '''
+    Sum values of each taxon and all taxa below it.
+    '''
+    up = self.up()
+    total = np.array(values)
+    for nodes in self.levels()[:0:-1]:
+      np.add.at(total, up[nodes], total[nodes])
+    return total
+
+  def preorder(self):
+    '''
+    Position of each taxon in a depth-first (pre-order)
+      traversal, with children in file order (-1 for
+      absent taxa).
+    '''
+    up = self.up()
+    size = self.subtreeSum((self.order >= 0).astype(np.int64))
+    pos = np.full(self.order.size, -1, np.int64)
+    for cur in self.levels():
+      # offset of each taxon among its siblings
+      s = size[cur]
+      before = np.cumsum(s) - s
+      par = up[cur]
+      first = np.ones(cur.size, bool)
+      first[1:] = par[1:] != par[:-1]
+      start = np.maximum.accumulate(np.where(first, np.arange(cur.size), 0))
+      offset = before - before[start]
+      pos[cur] = np.where(par >= 0, pos[np.maximum(par, 0)] + 1, 0) + offset
+    return pos
+
+class LCAIndex:
+  '''
+  LCAIndex: lowest common ancestors of taxa. With
+    taxa in depth-first order, the LCA of u and v
+    (pos[u] < pos[v]) is the parent of the shallowest
+    taxon in positions (pos[u], pos[v]]. Range minima
+    are found by a sparse table over blocks of BLOCK
+    positions, plus prefix/suffix minima in each block.
+  '''
+  BLOCK = 32
+
+  def __init__(self, arrays):
+    self.pos = arrays['pos']        # position of each taxID (-1 if absent)
+    self.parent = arrays['parent']  # parent of the taxon at each position
+    self.key = arrays['key']        # depth << 32 | position
+    self.prefix = arrays['prefix']  # min. key from block start
+    self.suffix = arrays['suffix']  # min. key to block end
+    self.table = arrays['table']    # min. key of 2^k blocks
+
+  def save(self, filename):
+    '''
+    Save the index (npz).
+    '''
+    f = open(filename, 'wb')
+    np.savez(f, pos=self.pos, parent=self.parent, key=self.key,
+      prefix=self.prefix, suffix=self.suffix, table=self.table)
+    f.close()
+
+  def rangeMin(self, lo, hi):
+    '''
+    Minimum key in positions lo..hi (inclusive; vectorized).
+    '''
+    B = self.BLOCK
+    bl = lo // B
+    br = hi // B
+    res = np.minimum(self.suffix[lo], self.prefix[hi])
+
+    # full blocks in between
+    mid = np.nonzero(br - bl > 1)[0]
+    if mid.size:
+      a = bl[mid] + 1
+      b = br[mid] - 1
+      k = np.floor(np.log2(b - a + 1)).astype(np.int64)
+      res[mid] = np.minimum(res[mid], np.minimum(self.table[k, a],
+        self.table[k, b - (1 << k) + 1]))
+
+    # both ends in the same block: scan it
+    same = np.nonzero(bl == br)[0]
+    if same.size:
+      m = np.full(same.size, np.iinfo(np.int64).max, np.int64)
+      l = lo[same]
+      h = hi[same]
+      for off in range(B):
+        p = bl[same] * B + off
+        ok = (p >= l) & (p <= h)
+        m[ok] = np.minimum(m[ok], self.key[p[ok]])
+      res[same] = m
+    return res
+
+  def query(self, a, b):
+    '''
+    LCAs of pairs of taxa (vectorized). As in centrifuge-
+      kreport, taxon 0 (unclassified) yields the other
+      taxon, and taxa not in the tree or in different
+      trees yield the root (1).
+    '''
+    a = np.asarray(a, np.int64)
+    b = np.asarray(b, np.int64)
+    res = np.ones(a.shape, np.int64)
+    n = self.pos.size
+    pa = np.where((a >= 0) & (a < n), self.pos[np.clip(a, 0, n - 1)], -1)
+    pb = np.where((b >= 0) & (b < n), self.pos[np.clip(b, 0, n - 1)], -1)
+    sel = np.nonzero((pa >= 0) & (pb >= 0) & (pa != pb))[0]
+    if sel.size:
+      lo = np.minimum(pa[sel], pb[sel]) + 1
+      hi = np.maximum(pa[sel], pb[sel])
+      par = self.parent[self.rangeMin(lo, hi) & 0xffffffff]
+      res[sel] = np.where(par >= 0, par, 1)
+    res = np.where(a == b, a, res)
+    res = np.where(b == 0, a, res)
+    return np.where(a == 0, b, res)
+
+def buildLCA(tree):
+  '''
+  Build the LCA index of a tree.
+  '''
+  B = LCAIndex.BLOCK
+  up = tree.up()
+  pos = tree.preorder()
+  taxa = tree.taxa()
+  n = taxa.size
+  node = np.zeros(n, np.int64)
+  node[pos[taxa]] = taxa
+  depth = np.zeros(n, np.int64)
+  levels = tree.levels()
+  for d in range(len(levels)):
+    depth[pos[levels[d]]] = d
+  arrays = {'pos': pos.astype(np.int32),
+    'parent': up[node].astype(np.int32)}
+
+  # keys, padded to full blocks
+  nb = max(1, (n + B - 1) // B)
+  key = np.full(nb * B, np.iinfo(np.int64).max, np.int64)
+  key[:n] = (depth << 32) | np.arange(n, dtype=np.int64)
+  blocks = key.reshape(nb, B)
+  arrays['key'] = key
+  arrays['prefix'] = np.minimum.accumulate(blocks, axis=1).ravel()
+  arrays['suffix'] = np.minimum.accumulate(blocks[:, ::-1],
+    axis=1)[:, ::-1].ravel()
+
+  # sparse table of block minima
+  table = [blocks.min(axis=1)]
+  k = 1
+  while (1 << k) <= nb:
+    prev = table[-1]
+    row = prev.copy()
+    half = 1 << (k - 1)
+    row[:nb - half] = np.minimum(prev[:nb - half], prev[half:])
+    table.append(row)
+    k += 1
+  arrays['table'] = np.array(table)
+  return LCAIndex(arrays)
+
+def loadLCA(treeFile, tree=None):
+  '''
+  Load the LCA index saved alongside a tree file
+    (<tree>.lca.npz), or build (and save) it if
+    missing or older than the tree.
+  '''
+  idxFile = treeFile + '.lca.npz'
+  if os.path.exists(idxFile) and treeFile != '-' \
+      and os.path.getmtime(idxFile) >= os.path.getmtime(treeFile):
+    npz = np.load(idxFile)
+    arrays = dict((k, npz[k]) for k in npz.files)
+    npz.close()
+    return LCAIndex(arrays)
+  if tree is None:
+    f = open(treeFile)
+    tree = loadTree(f)
+    f.close()
+  idx = buildLCA(tree)
+  if treeFile != '-':
+    try:
+      idx.save(idxFile)
+    except (IOError, OSError):
+      sys.stderr.write('Warning! Cannot save LCA index %s\n' % idxFile)
+  return idx
+
+def loadTree(f, counts=False):
+  '''
+  Load a taxonomy tree (nodes.dmp, centrifuge-inspect
+    --taxonomy-tree, or a .tree file produced by
+    ntSumm.py [with counts/lengths of nt sequences]).
+  '''
+  taxa = []
+  parent = []
+  rank = []
+  count = []
+  length = []
+  rankNames = []
+  code = {}
+  for line in f:
+    spl = line.split('|')
+    if len(spl) < 3 or (counts and len(spl) < 5):
+      sys.stderr.write('Error! Improperly formatted tree file\n')
+      sys.exit(-1)
+    taxon = int(spl[0])
+    par = spl[1].strip()
+    taxa.append(taxon)
+    if taxon == 1 or par == 'None':
+      parent.append(-1)
+    else:
+      parent.append(int(par))
+    r = spl[2].strip()
+    if r not in code:
+      code[r] = len(rankNames)
+      rankNames.append(r)
+    rank.append(code[r])
+    if counts:
+      count.append(int(spl[3]))
+      length.append(int(spl[4]))
+  if len(rankNames) > 255:
+    sys.stderr.write('Error! Too many taxonomic ranks in tree\n')
+    sys.exit(-1)
+  if counts:
+    return TaxTree(taxa, parent, rank, rankNames, count, length)
+  return TaxTree(taxa, parent, rank, rankNames)
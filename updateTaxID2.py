@@ -2,70 +2,52 @@
 
 # JMG 12/2017
 # Update merged and deleted taxonomic IDs.
+#   With --md5, verify each input against <in>.md5 while
+#   reading it (output is removed if one fails).
 
 import sys
-import gzip
-
-def openRead(filename):
-  '''
-  Open filename for reading. '-' indicates stdin.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdin
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'rb')
-    else:
-      f = open(filename, 'rU')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for reading\n' % filename)
-    sys.exit(-1)
-  return f
-
-def openWrite(filename):
-  '''
-  Open filename for writing. '-' indicates stdout.
-    '.gz' suffix indicates gzip compression.
-  '''
-  if filename == '-':
-    return sys.stdout
-  try:
-    if filename[-3:] == '.gz':
-      f = gzip.open(filename, 'wb')
-    else:
-      f = open(filename, 'w')
-  except IOError:
-    sys.stderr.write('Error! Cannot open %s for writing\n' % filename)
-    sys.exit(-1)
-  return f
+import os
+import metaProf
+import metaIO
+from metaIO import openRead, openWrite
 
 def main():
   args = sys.argv[1:]
+  prof = metaProf.fromArgs('updateTaxID2', args)
+  md5 = metaProf.popArg(args, '--md5', False, value=False)
   if len(args) < 4:
     sys.stderr.write('Usage: python updateTaxID2.py  <mergedIDs>  ' \
-      + '<deletedIDs>  <out>  [<in>]+\n')
+      + '<deletedIDs>  <out>  [<in>]+  [--md5]\n' \
+      + '  --md5   Verify each <in> against <in>.md5\n' + metaProf.usage)
     sys.exit(-1)
+  expected = {}
+  if md5:
+    for arg in args[3:]:
+      expected[arg] = metaIO.expectedMd5(arg)
 
   # load merged taxIDs to dict
   d = dict()
-  f = openRead(args[0])
-  for line in f:
-    spl = line.rstrip().split('|')
-    if len(spl) < 2:
-      sys.stderr.write('Error! Poorly formatted record in merged file\n')
-      sys.exit(-1)
-    d[spl[0].strip()] = spl[1].strip()
-  if f != sys.stdin:
-    f.close()
+  with prof.phase('loadMerged'):
+    f = openRead(args[0])
+    for line in f:
+      spl = line.rstrip().split('|')
+      if len(spl) < 2:
+        sys.stderr.write('Error! Poorly formatted record in merged file\n')
+        sys.exit(-1)
+      d[spl[0].strip()] = spl[1].strip()
+    if f != sys.stdin:
+      f.close()
+    prof.count(len(d), metaProf.fileSize(args[0]))
 
   # load deleted taxIDs to dict
-  f2 = openRead(args[1])
-  for line in f2:
-    spl = line.rstrip().split('|')
-    d[spl[0].strip()] = '0'  # assign deleted to tax ID '0'
-  if f != sys.stdin:
-    f2.close()
+  with prof.phase('loadDeleted'):
+    f2 = openRead(args[1])
+    for line in f2:
+      spl = line.rstrip().split('|')
+      d[spl[0].strip()] = '0'  # assign deleted to tax ID '0'
+    if f != sys.stdin:
+      f2.close()
+    prof.count(0, metaProf.fileSize(args[1]))
 
   # open output file
   merge = printed = 0
@@ -73,33 +55,44 @@ def main():
 
   # parse input files, write output on the fly
   for arg in args[3:]:
-    fIn = openRead(arg)
+    with prof.phase('updateAcc'):
+      fIn = openRead(arg, md5)
 
-    # parse header
-    accIdx = taxIdx = -1
-    spl = fIn.readline().rstrip().split('\t')
-    try:
-      accIdx = spl.index('accession.version')
-      taxIdx = spl.index('taxid')
-    except ValueError:
-      sys.stderr.write('Error! Cannot find header value '
-        + '(\'accession.version\' or \'taxid\')')
-      sys.exit(-1)
+      # parse header
+      accIdx = taxIdx = -1
+      spl = fIn.readline().rstrip().split('\t')
+      try:
+        accIdx = spl.index('accession.version')
+        taxIdx = spl.index('taxid')
+      except ValueError:
+        sys.stderr.write('Error! Cannot find header value '
+          + '(\'accession.version\' or \'taxid\')')
+        sys.exit(-1)
 
-    # parse input file, produce output
-    for line in fIn:
-      spl = line.rstrip().split('\t')
-      if spl[taxIdx] in d:
-        spl[taxIdx] = d[spl[taxIdx]]
-        merge += 1
-      fOut.write(spl[accIdx] + '\t' + spl[taxIdx] + '\n')
-      printed += 1
-    if fIn != sys.stdin:
-      fIn.close()
+      # parse input file, produce output
+      start = printed
+      with prof.progress('updateAcc', fIn, arg) as prog:
+        for line in fIn:
+          spl = line.rstrip().split('\t')
+          if spl[taxIdx] in d:
+            spl[taxIdx] = d[spl[taxIdx]]
+            merge += 1
+          fOut.write(spl[accIdx] + '\t' + spl[taxIdx] + '\n')
+          printed += 1
+          prog.records += 1
+      if md5 and not metaIO.verifyMd5(fIn, arg, expected[arg]):
+        fOut.close()
+        if args[2] != '-':
+          os.remove(args[2])
+        sys.exit(-1)
+      if fIn != sys.stdin:
+        fIn.close()
+      prof.count(printed - start, metaProf.fileSize(arg))
 
   fOut.close()
   sys.stderr.write('Records written: %d\n' % printed)
   sys.stderr.write('  Updated: %d\n' % merge)
+  prof.finish()
 
 if __name__ == '__main__':
   main()